@@ -0,0 +1,67 @@
+import math
+import threading
+import time
+
+# Priority lanes, lower value is served first by the batch scheduler
+PRIORITIES = {'interactive': 0, 'bulk': 1}
+
+
+class DeadlineExceeded(Exception):
+    """Queued work whose caller's deadline passed before inference started"""
+
+
+class AdmissionController:
+    """Bounds how many detection requests are admitted (queued or running) at once.
+
+    Up to ``max_pending`` interactive requests are admitted; bulk requests are
+    only admitted while fewer than ``bulk_fraction`` of those slots are taken,
+    which keeps headroom for interactive traffic. A rejected request should be
+    answered with 429 and ``retry_after()``, an estimate based on how long
+    admitted requests have recently been holding their slots.
+    """
+
+    def __init__(self, max_pending, bulk_fraction=0.5):
+        self.max_pending = max(1, int(max_pending))
+        self.limits = {
+            'interactive': self.max_pending,
+            'bulk': max(1, int(self.max_pending * bulk_fraction))
+        }
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._avg_hold = None  # EWMA of seconds a slot is held
+        self._counters = {lane: {'admitted': 0, 'rejected': 0} for lane in PRIORITIES}
+
+    def try_acquire(self, lane):
+        """Take a slot in ``lane``; returns a token for ``release()``, or None if full"""
+        with self._lock:
+            if self._pending >= self.limits[lane]:
+                self._counters[lane]['rejected'] += 1
+                return None
+            self._pending += 1
+            self._counters[lane]['admitted'] += 1
+        return time.monotonic()
+
+    def release(self, token):
+        held = time.monotonic() - token
+        with self._lock:
+            self._pending -= 1
+            self._avg_hold = held if self._avg_hold is None else 0.8 * self._avg_hold + 0.2 * held
+
+    def retry_after(self):
+        """Whole seconds a rejected client should wait before retrying"""
+        with self._lock:
+            avg_hold = self._avg_hold or 1.0
+        return min(60, max(1, math.ceil(avg_hold)))
+
+    def pending(self):
+        with self._lock:
+            return self._pending
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pending': self._pending,
+                'limits': dict(self.limits),
+                'avg_hold_seconds': self._avg_hold,
+                'lanes': {lane: dict(counters) for lane, counters in self._counters.items()}
+            }
@@ -1,62 +1,528 @@
+import time
+PROCESS_START = time.perf_counter()  # Taken before the remaining imports so cold-start time includes them
+
 import numpy as np
-from flask import Flask, request, jsonify
+from flask import Flask, Request, Response, g, request, jsonify, stream_with_context
 import logging
-from ultralytics import YOLO
-import tempfile
+import atexit
+import functools
+import io
 import os
+import shutil
+import tempfile
+import threading
 import json
 from datetime import datetime
 from pathlib import Path
+from admission import PRIORITIES, AdmissionController, DeadlineExceeded
+from batching import BatchScheduler
+from persistence import ResultWriter
+from cache import DetectionCache
+from models import ModelRegistry
+from backends import BACKENDS, backend_id, load_model
+from workers import InferenceWorkerPool
+from results_index import ResultsIndex, RESULTS_SUFFIX, IMAGE_SUFFIX
+from exporting import CONTENT_TYPES, EXPORT_FORMATS, available_formats, iter_export
+from rendering import RenderCache, render_detections, render_etag, resize_rendered
+from storage import ResultStore
+from streaming import (prefetch, ordered_inference, iter_video_frames, iter_uploaded_frames,
+                       iter_uploaded_images, iter_decoded_images, iter_archive_images)
+from imaging import decode_image, decode_image_reduced
+from tiling import tile_windows, detect_tiled
+from metrics import MetricsRegistry, StageTimer
+from serialization import (RESPONSE_FORMATS, box_arrays, detections_from_arrays, columnar_from_arrays,
+                           columnar_from_detections, detections_from_columnar, BINARY_CONTENT_TYPE, encode_binary)
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+class BudgetedSpool(tempfile.SpooledTemporaryFile):
+    """Upload part kept in memory while the request's shared budget lasts, then rolled over to disk
+    
+    ``budget`` is a one-item list holding the bytes the request may still keep
+    in memory; every part of the request draws from it, so many parts can't
+    add up past the limit. A part that rolls over gives its bytes back.
+    """
+    def __init__(self, budget):
+        super().__init__()
+        self._budget = budget
+        self._in_memory = 0
+    
+    def write(self, data):
+        if self._in_memory is not None:
+            if len(data) <= self._budget[0]:
+                self._budget[0] -= len(data)
+                self._in_memory += len(data)
+            else:
+                self.rollover()
+                self._budget[0] += self._in_memory
+                self._in_memory = None
+        return super().write(data)
+
+class InMemoryRequest(Request):
+    """Keep image-sized multipart uploads in memory instead of spooling them to a temp file
+    
+    At most UPLOAD_MEMORY_LIMIT_MB of a request's file parts are held in
+    memory, summed over all its parts; the rest (e.g. videos, long frame or
+    image sequences) spills to disk so memory stays bounded.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        limit = int(UPLOAD_MEMORY_LIMIT_MB * 1024 * 1024)
+        if total_content_length is not None and total_content_length <= limit:
+            return io.BytesIO()
+        if not hasattr(self, '_spool_budget'):
+            self._spool_budget = [limit]
+        return BudgetedSpool(self._spool_budget)
+
 app = Flask(__name__)
+app.request_class = InMemoryRequest
 
 # Configuration
 CONFIDENCE_THRESHOLD = 0.25
 OUTPUT_DIR = "output"  # Directory to save results
+BATCH_MAX_SIZE = int(os.getenv('BATCH_MAX_SIZE', 8))  # Images per forward pass
+BATCH_MAX_WAIT_MS = float(os.getenv('BATCH_MAX_WAIT_MS', 10))  # Max time a request waits for a batch to fill
+PERSIST_MODES = ('none', 'json', 'full')
+DEFAULT_PERSIST = os.getenv('DEFAULT_PERSIST', 'full')
+WRITER_QUEUE_SIZE = int(os.getenv('WRITER_QUEUE_SIZE', 256))  # Pending writes before new ones are dropped (bulk requests wait instead)
+WRITER_THREADS = int(os.getenv('WRITER_THREADS', 2))
+DEFAULT_MODEL = os.getenv('DEFAULT_MODEL', 'yolo11x')  # Used when a request doesn't pass model=
+MODEL_MEMORY_BUDGET_MB = float(os.getenv('MODEL_MEMORY_BUDGET_MB', 1024))  # Resident model budget before LRU eviction
+INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'torch')  # torch, onnx (ONNX Runtime CPU), openvino or fake (benchmarking)
+INFERENCE_INT8 = os.getenv('INFERENCE_INT8', 'false').lower() == 'true'  # Use an INT8-quantized onnx/openvino model
+INT8_CALIBRATION_DATA = os.getenv('INT8_CALIBRATION_DATA', 'coco128.yaml')  # Dataset used to calibrate OpenVINO INT8
+INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', 0))  # Forked inference processes for the default model; 0 runs in-process
+THREADS_PER_WORKER = int(os.getenv('THREADS_PER_WORKER', max(1, (os.cpu_count() or 1) // max(INFERENCE_WORKERS, 1))))
+WORKER_TASK_TIMEOUT = float(os.getenv('WORKER_TASK_TIMEOUT', 120))  # Longest wait for a worker batch when its requests have no deadline
+TORCH_THREADS = int(os.getenv('TORCH_THREADS', 0))  # Intra-op threads for in-process inference; 0 keeps the torch default
+WSGI_THREADS = int(os.getenv('WSGI_THREADS', 16))  # Request threads when served by waitress
+PORT = int(os.getenv('PORT', 5001))
+RESULTS_INDEX_FILE = 'results_index.sqlite3'  # Kept inside OUTPUT_DIR
+RESULTS_PAGE_SIZE = 100
+RESULTS_MAX_PAGE_SIZE = 1000
+RESULTS_RETENTION_DAYS = int(os.getenv('RESULTS_RETENTION_DAYS', 0))  # Delete saved results older than this many days; 0 keeps them
+RESULTS_MAX_MB = float(os.getenv('RESULTS_MAX_MB', 0))  # Delete the oldest days of saved results beyond this size; 0 is unlimited
+RESULTS_COMPACT_AFTER_DAYS = int(os.getenv('RESULTS_COMPACT_AFTER_DAYS', 1))  # Pack a day's JSON into one compressed segment once it is this old
+RESULTS_MAINTENANCE_INTERVAL = float(os.getenv('RESULTS_MAINTENANCE_INTERVAL', 3600))  # Seconds between compaction/retention runs
+RENDER_CACHE_MB = float(os.getenv('RENDER_CACHE_MB', 64))  # Annotated images rendered on request, kept in an in-memory LRU
+RENDER_JPEG_QUALITY = int(os.getenv('RENDER_JPEG_QUALITY', 85))  # Default JPEG quality of rendered images
+RENDER_MAX_AGE = int(os.getenv('RENDER_MAX_AGE', 86400))  # Cache-Control max-age (seconds) of rendered images
+CACHE_MAX_MB = float(os.getenv('CACHE_MAX_MB', 64))  # In-memory result cache budget; 0 disables caching
+CACHE_DISK = os.getenv('CACHE_DISK', 'false').lower() == 'true'  # Also keep cache entries under OUTPUT_DIR/cache
+CACHE_ENTRY_VERSION = 2  # Part of every cache key; bump when the shape of cached entries changes
+UPLOAD_MEMORY_LIMIT_MB = float(os.getenv('UPLOAD_MEMORY_LIMIT_MB', 64))  # Larger uploads are spooled to disk
+MAX_UPLOAD_MB = float(os.getenv('MAX_UPLOAD_MB', 4096))  # Request bodies above this get a 413; 0 disables the limit
+STREAM_PREFETCH_ITEMS = int(os.getenv('STREAM_PREFETCH_ITEMS', 16))  # Decoded frames/images buffered ahead of inference
+STREAM_INFLIGHT_ITEMS = int(os.getenv('STREAM_INFLIGHT_ITEMS', BATCH_MAX_SIZE * 2))  # Streamed items submitted to the scheduler at once
+MAX_PENDING_REQUESTS = int(os.getenv('MAX_PENDING_REQUESTS', 64))  # Admitted (queued + running) detection requests before 429s
+BULK_ADMISSION_FRACTION = float(os.getenv('BULK_ADMISSION_FRACTION', 0.5))  # Share of those slots bulk requests may take
+PRIORITY_HEADER = 'X-Request-Priority'  # interactive (default for /detect) or bulk (default for /detect/video and /detect/batch)
+DEADLINE_HEADER = 'X-Request-Timeout-Ms'  # Caller's remaining time budget; work still queued when it runs out is dropped
+DEFAULT_IMGSZ = int(os.getenv('DEFAULT_IMGSZ', 640))  # Model input size (longer side, px) when a request doesn't pass imgsz=
+MIN_IMGSZ = int(os.getenv('MIN_IMGSZ', 160))  # Smallest imgsz a request may ask for
+MAX_IMGSZ = int(os.getenv('MAX_IMGSZ', 1280))  # Largest imgsz a request may ask for
+MODEL_STRIDE = 32  # imgsz is rounded up to a multiple of the model stride
+REDUCED_DECODE = os.getenv('REDUCED_DECODE', 'true').lower() == 'true'  # Decode large JPEG uploads at about imgsz (DCT scaling)
+TILE_SIZE = int(os.getenv('TILE_SIZE', 640))  # Default tile edge (px) for tiled=true
+TILE_OVERLAP = float(os.getenv('TILE_OVERLAP', 0.2))  # Default fraction of a tile shared with its neighbours
+TILE_BATCH_SIZE = int(os.getenv('TILE_BATCH_SIZE', BATCH_MAX_SIZE))  # Tiles of one image submitted for inference at once
+TILE_NMS_IOU = float(os.getenv('TILE_NMS_IOU', 0.5))  # IoU above which boxes from overlapping tiles are merged
+TILE_FULL_IMAGE = os.getenv('TILE_FULL_IMAGE', 'true').lower() == 'true'  # Also run the whole image to catch objects larger than a tile
+MAX_TILES = int(os.getenv('MAX_TILES', 256))  # Tiles allowed per image
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() == 'true'  # Return per-stage /detect timings in a Server-Timing header
+WARMUP_IMAGE_SIZES = os.getenv('WARMUP_IMAGE_SIZES', '640x640')  # WIDTHxHEIGHT,... dummy images run before reporting ready
+WARMUP_RUNS = int(os.getenv('WARMUP_RUNS', 2))  # Warmup inferences per size; 0 skips warmup
+
+app.config['MAX_CONTENT_LENGTH'] = int(MAX_UPLOAD_MB * 1024 * 1024) or None
 
 # Create output directory if it doesn't exist
 Path(OUTPUT_DIR).mkdir(exist_ok=True)
 
-# Load YOLO model
-try:
-    model = YOLO('yolo11x.pt')
-    logger.info("YOLO model loaded successfully")
-except Exception as e:
-    logger.error(f"Failed to load YOLO model: {e}")
-    model = None
+# Models load lazily on first use (exported to the configured backend if needed)
+# and are evicted (LRU) beyond the memory budget
+if INFERENCE_BACKEND not in BACKENDS:
+    raise ValueError(f"INFERENCE_BACKEND must be one of {', '.join(BACKENDS)}")
+MODEL_BACKEND = backend_id(INFERENCE_BACKEND, INFERENCE_INT8)
+model_registry = ModelRegistry(
+    functools.partial(load_model, backend=INFERENCE_BACKEND, int8=INFERENCE_INT8,
+                      max_batch=BATCH_MAX_SIZE, calibration_data=INT8_CALIBRATION_DATA),
+    memory_budget=MODEL_MEMORY_BUDGET_MB * 1024 * 1024
+)
+
+# The default model is loaded and warmed up in the background (see load_and_warm_up) so
+# the server can bind right away; /readyz reports when it can take traffic
+worker_pool = None  # Forked inference workers for the default model, if INFERENCE_WORKERS > 0
+startup = {'state': 'loading', 'error': None, 'cold_start_seconds': None, 'first_request_seconds': None}
+startup_lock = threading.Lock()
+model_ready = threading.Event()
+
+# Saved results are indexed so /results never has to scan OUTPUT_DIR
+index_path = Path(OUTPUT_DIR) / RESULTS_INDEX_FILE
+index_is_new = not index_path.exists()
+results_index = ResultsIndex(index_path, OUTPUT_DIR)
+
+# Results are stored in date/hash shards; old days are compacted and expired in the background
+result_store = ResultStore(
+    OUTPUT_DIR, results_index,
+    retention_days=RESULTS_RETENTION_DAYS,
+    max_bytes=RESULTS_MAX_MB * 1024 * 1024,
+    compact_after_days=RESULTS_COMPACT_AFTER_DAYS
+)
+
+def maintain_results():
+    """Background loop: migrate flat files, compact old days and apply retention"""
+    if index_is_new or results_index.needs_backfill:
+        results_index.rebuild(result_store.scan())
+    while True:
+        try:
+            result_store.maintain()
+        except Exception as e:
+            logger.error(f"Result storage maintenance failed: {e}")
+        time.sleep(RESULTS_MAINTENANCE_INTERVAL)
+
+threading.Thread(target=maintain_results, name='results-maintenance', daemon=True).start()
+
+# Image and JSON outputs are written off the request path
+result_writer = ResultWriter(max_queue=WRITER_QUEUE_SIZE, workers=WRITER_THREADS)
+atexit.register(result_writer.close)
+
+# Annotated images are only rendered when requested; rendered variants are kept by ETag
+render_cache = RenderCache(RENDER_CACHE_MB * 1024 * 1024)
+
+# Content-addressed cache of detection results
+detection_cache = None
+if CACHE_MAX_MB > 0:
+    detection_cache = DetectionCache(
+        max_bytes=CACHE_MAX_MB * 1024 * 1024,
+        disk_dir=os.path.join(OUTPUT_DIR, 'cache') if CACHE_DISK else None
+    )
+
+# Requests are funnelled through one scheduler per model so concurrent uploads share forward passes
+schedulers = {}
+schedulers_lock = threading.Lock()
+
+def get_scheduler(model_name):
+    """Return the batch scheduler for a model, creating it on first use"""
+    with schedulers_lock:
+        if model_name not in schedulers:
+            if worker_pool is not None and model_name == DEFAULT_MODEL:
+                # One batch in flight per worker process
+                predict = functools.partial(model_registry.predict, model_name, runner=worker_pool.predict)
+                concurrency = worker_pool.num_workers
+                pass_deadline = True
+            else:
+                predict = functools.partial(model_registry.predict, model_name)
+                concurrency = 1
+                pass_deadline = False
+            schedulers[model_name] = BatchScheduler(
+                predict,
+                max_batch_size=BATCH_MAX_SIZE,
+                max_wait=BATCH_MAX_WAIT_MS / 1000,
+                concurrency=concurrency,
+                pass_deadline=pass_deadline
+            )
+        return schedulers[model_name]
+
+# Bounded admission: beyond MAX_PENDING_REQUESTS requests are turned away with 429 instead of queueing invisibly
+admission = AdmissionController(MAX_PENDING_REQUESTS, BULK_ADMISSION_FRACTION)
+
+# Prometheus metrics served on /metrics
+metrics = MetricsRegistry()
+request_latency = metrics.histogram('ai_http_request_duration_seconds', 'Time to response headers by endpoint', ('endpoint', 'method', 'status'))
+stage_latency = metrics.histogram('ai_detect_stage_duration_seconds', 'Latency of each /detect stage', ('stage',))
+write_latency = metrics.histogram('ai_write_stage_duration_seconds', 'Latency of each background persistence stage', ('stage',))
+requests_in_flight = metrics.gauge('ai_requests_in_flight', 'Requests currently being handled')
+metrics.gauge('ai_batch_queue_depth', 'Images waiting for a forward pass', ('model',),
+              callback=lambda: {(name,): model_scheduler.queue_depth() for name, model_scheduler in list(schedulers.items())})
+metrics.gauge('ai_writer_queue_depth', 'Result writes waiting for the background writer', callback=result_writer.queue_depth)
+metrics.counter('ai_writer_dropped_total', 'Result writes dropped because the writer queue was full',
+                callback=lambda: result_writer.stats()['dropped'])
+metrics.gauge('ai_worker_pending_batches', 'Batches queued or running on inference worker processes',
+              callback=lambda: worker_pool.pending() if worker_pool is not None else None)
+metrics.gauge('ai_model_resident_bytes', 'Estimated memory of each loaded model', ('model',),
+              callback=lambda: {(name,): size for name, size in model_registry.resident_sizes().items()})
+metrics.gauge('ai_model_memory_budget_bytes', 'Resident model budget before LRU eviction',
+              callback=lambda: model_registry.memory_budget)
+metrics.counter('ai_cache_hits_total', 'Detection cache hits (memory and disk)',
+                callback=lambda: detection_cache.stats()['hits'] if detection_cache is not None else None)
+metrics.counter('ai_cache_misses_total', 'Detection cache misses',
+                callback=lambda: detection_cache.stats()['misses'] if detection_cache is not None else None)
+metrics.gauge('ai_admission_pending', 'Detection requests admitted and not yet finished', callback=admission.pending)
+metrics.counter('ai_admission_rejected_total', 'Detection requests rejected with 429', ('lane',),
+                callback=lambda: {(lane,): counts['rejected'] for lane, counts in admission.stats()['lanes'].items()})
+metrics.counter('ai_render_cache_hits_total', 'Annotated image requests served from the render cache',
+                callback=lambda: render_cache.stats()['hits'])
+metrics.counter('ai_render_cache_misses_total', 'Annotated image requests that had to be rendered',
+                callback=lambda: render_cache.stats()['misses'])
+deadline_expired = metrics.counter('ai_deadline_expired_total', 'Requests dropped because their deadline passed before inference', ('stage',))
+
+# Ultralytics speed keys (ms, per image) -> /detect stage names
+INFERENCE_STAGES = {'queue': 'queue', 'preprocess': 'preprocess', 'inference': 'inference', 'postprocess': 'nms'}
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.received_at = time.monotonic()
+    g.stage_timer = StageTimer(stage_latency)
+    requests_in_flight.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    request_latency.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+    if request.endpoint == 'detect_objects' and response.status_code == 200 and startup['first_request_seconds'] is None:
+        with startup_lock:
+            if startup['first_request_seconds'] is None:
+                startup['first_request_seconds'] = elapsed
+                logger.info(f"First /detect request served in {elapsed * 1000:.1f}ms")
+    if SERVER_TIMING and g.stage_timer.stages:
+        response.headers['Server-Timing'] = f"{g.stage_timer.server_timing()}, total;dur={elapsed * 1000:.2f}"
+    # A streamed body is produced after the view (and its teardown) has returned, so
+    # the request only counts as finished once the server closes the response
+    g.request_finished = True
+    response.call_on_close(functools.partial(finish_request, g.pop('admission_token', None)))
+    return response
+
+def finish_request(admission_token):
+    """Leave the in-flight gauge and free the request's admission slot, exactly once per request"""
+    requests_in_flight.dec()
+    if admission_token is not None:
+        admission.release(admission_token)
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    # Only for requests that never got a response; teardown runs again when a
+    # streamed body finishes (stream_with_context), hence the flag
+    if not g.get('request_finished'):
+        g.request_finished = True
+        finish_request(g.pop('admission_token', None))
+
+def record_inference_stages(timer, result):
+    """Record queue wait, preprocess, inference and NMS time from a result's speed dict"""
+    for key, stage in INFERENCE_STAGES.items():
+        if (result.speed or {}).get(key) is not None:
+            timer.record(stage, result.speed[key] / 1000)
+
+def parse_image_sizes(spec):
+    """'640x640,1280x720' -> [(640, 640), (1280, 720)]; a bare '640' means square"""
+    sizes = []
+    for part in spec.split(','):
+        if part.strip():
+            width, _, height = part.strip().lower().partition('x')
+            sizes.append((int(width), int(height or width)))
+    return sizes
+
+def start_worker_pool():
+    """Optionally serve the default model from forked worker processes, each with its own thread/core slice"""
+    global worker_pool
+    if INFERENCE_WORKERS <= 0:
+        return
+    if INFERENCE_BACKEND != 'torch':
+        logger.warning(f"INFERENCE_WORKERS is only supported with the torch backend, running {MODEL_BACKEND} in-process")
+        return
+    worker_pool = InferenceWorkerPool(
+        model_registry.get(DEFAULT_MODEL),
+        num_workers=INFERENCE_WORKERS,
+        threads_per_worker=THREADS_PER_WORKER,
+        task_timeout=WORKER_TASK_TIMEOUT,
+        warmup_image=np.zeros((640, 640, 3), dtype=np.uint8)
+    )
+    atexit.register(worker_pool.close)
+    logger.info(f"Started {INFERENCE_WORKERS} inference workers x {THREADS_PER_WORKER} threads for {DEFAULT_MODEL}")
+
+def warm_up():
+    """Run dummy inferences through the default model's scheduler at each warmup size
+    
+    This pays for lazy predictor setup, layer fusion and kernel selection
+    before real traffic arrives instead of on the first requests.
+    """
+    scheduler = get_scheduler(DEFAULT_MODEL)
+    for width, height in parse_image_sizes(WARMUP_IMAGE_SIZES):
+        image = np.zeros((height, width, 3), dtype=np.uint8)
+        start = time.perf_counter()
+        for _ in range(WARMUP_RUNS):
+            scheduler.infer(image, CONFIDENCE_THRESHOLD, imgsz=DEFAULT_IMGSZ)
+        logger.info(f"Warmup at {width}x{height}: {WARMUP_RUNS} runs in {time.perf_counter() - start:.2f}s")
+
+def load_and_warm_up():
+    """Load the default model, start inference workers and warm up (runs in a background thread)"""
+    try:
+        load_start = time.perf_counter()
+        model_registry.get(DEFAULT_MODEL)
+        logger.info(f"YOLO model loaded successfully in {time.perf_counter() - load_start:.2f}s")
+        start_worker_pool()
+        if TORCH_THREADS > 0:
+            import torch
+            torch.set_num_threads(TORCH_THREADS)
+    except Exception as e:
+        logger.error(f"Failed to load YOLO model: {e}")
+        startup.update(state='failed', error=str(e))
+        return
+    
+    if WARMUP_RUNS > 0:
+        startup['state'] = 'warming'
+        try:
+            warm_up()
+        except Exception as e:
+            logger.warning(f"Warmup failed, serving cold: {e}")
+    
+    cold_start = time.perf_counter() - PROCESS_START
+    startup.update(state='ready', cold_start_seconds=cold_start)
+    model_ready.set()
+    logger.info(f"Ready to serve after a {cold_start:.2f}s cold start")
+
+def not_ready_response():
+    """503 while the default model is still loading or warming up, else None"""
+    if model_ready.is_set() or startup['state'] == 'failed':
+        # A failed startup falls back to loading the model lazily on request
+        return None
+    return jsonify({'error': f"Model is {startup['state']}, not ready yet"}), 503, {'Retry-After': '5'}
+
+threading.Thread(target=load_and_warm_up, name='model-startup', daemon=True).start()
+
+def admit_request(default_lane):
+    """Resolve the request's priority lane and take an admission slot in it
+    
+    Returns (lane, None) once admitted - the slot is released when the response
+    closes, so a streamed body holds it until the stream ends - or
+    (None, error_response) for a bad lane or a full queue (429).
+    """
+    lane = request.headers.get(PRIORITY_HEADER, default_lane).lower()
+    if lane not in PRIORITIES:
+        return None, (jsonify({'error': f"{PRIORITY_HEADER} must be one of {', '.join(PRIORITIES)}"}), 400)
+    
+    token = admission.try_acquire(lane)
+    if token is None:
+        retry_after = admission.retry_after()
+        logger.warning(f"Rejecting {lane} request: {admission.pending()} requests already admitted")
+        return None, (jsonify({'error': 'Server is at capacity, retry later'}), 429, {'Retry-After': str(retry_after)})
+    g.admission_token = token
+    return lane, None
+
+def request_deadline():
+    """time.monotonic() deadline from the caller's time budget header, or None
+    
+    The budget is counted from when the request arrived. Raises ValueError for
+    a malformed header.
+    """
+    budget_ms = request.headers.get(DEADLINE_HEADER)
+    if budget_ms is None:
+        return None
+    return g.received_at + float(budget_ms) / 1000
+
+def deadline_exceeded_response(stage):
+    deadline_expired.inc(stage=stage)
+    logger.warning(f"Dropping request: deadline exceeded before inference ({stage})")
+    return jsonify({'error': 'Deadline exceeded before inference started'}), 504
 
-def save_detection_results(image_filename, results, output_image_path, json_output_path):
-    """Save detection results as image with bounding boxes and JSON file"""
+def requested_imgsz():
+    """Model input size from the request form, rounded up to the model stride; raises ValueError"""
+    imgsz = int(request.form.get('imgsz', DEFAULT_IMGSZ))
+    if not MIN_IMGSZ <= imgsz <= MAX_IMGSZ:
+        raise ValueError(f'imgsz must be between {MIN_IMGSZ} and {MAX_IMGSZ}')
+    return -(-imgsz // MODEL_STRIDE) * MODEL_STRIDE
+
+def requested_tiling():
+    """(tile_size, overlap) from the request form if tiled=true, else None; raises ValueError"""
+    if request.form.get('tiled', 'false').lower() != 'true':
+        return None
+    tile_size = int(request.form.get('tile_size', TILE_SIZE))
+    overlap = float(request.form.get('tile_overlap', TILE_OVERLAP))
+    if not 64 <= tile_size <= 4096:
+        raise ValueError('tile_size must be between 64 and 4096')
+    if not 0 <= overlap < 0.9:
+        raise ValueError('tile_overlap must be >= 0 and < 0.9')
+    return tile_size, overlap
+
+def requested_source_size():
+    """(width, height) of the image an upload was downsized from (source_width/source_height), or None; raises ValueError"""
+    if 'source_width' not in request.form and 'source_height' not in request.form:
+        return None
+    size = (int(request.form.get('source_width', 0)), int(request.form.get('source_height', 0)))
+    if not all(1 <= side <= 65535 for side in size):
+        raise ValueError('source_width and source_height must be between 1 and 65535')
+    return size
+
+def requested_model():
+    """Model name from the request form, or None if it isn't a known model"""
+    model_name = request.form.get('model', DEFAULT_MODEL)
+    return model_name if model_name in model_registry.weights else None
+
+def unknown_model_response():
+    return jsonify({'error': f"model must be one of {', '.join(model_registry.names)}"}), 400
+
+def write_detection_outputs(source_bytes, source_path, json_data, json_output_path):
+    """Count the detections into the /stats aggregates, then keep the original upload
+    and/or write the JSON file (runs on the background writer)
+    
+    The annotated image is not rendered here; GET /results/<name>/image draws
+    it from the source and the stored detections when it is first requested.
+    """
+    results_index.record_detections(json_data['timestamp'], json_data['detections'])
+    
+    if source_bytes is not None:
+        start = time.perf_counter()
+        Path(source_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(source_path, 'wb') as f:
+            f.write(source_bytes)
+        write_latency.observe(time.perf_counter() - start, stage='source')
+        logger.info(f"Source image saved: {source_path}")
+    
+    if json_output_path is not None:
+        start = time.perf_counter()
+        result_store.write_json(json_data, json_output_path)
+        write_latency.observe(time.perf_counter() - start, stage='json')
+        logger.info(f"JSON results saved: {json_output_path}")
+        
+        start = time.perf_counter()
+        name = os.path.basename(json_output_path)[:-len(RESULTS_SUFFIX)]
+        results_index.add(name, json_data, json_output_path, source_path if source_bytes is not None else None)
+        write_latency.observe(time.perf_counter() - start, stage='index')
+
+def queue_detection_outputs(json_data, output_name, image_filename, source_bytes=None, persist='full', block=False):
+    """Queue a result's JSON (and, for persist='full', its source image) for background saving
+    
+    'json' skips the source image and 'none' skips the files, though the
+    write still counts the detections into the /stats aggregates. Returns the
+    output files that were queued.
+    """
+    output_files = {}
+    if persist == 'none':
+        result_writer.submit(write_detection_outputs, None, None, json_data, None, block=block)
+    else:
+        json_output_path = result_store.json_path(output_name)
+        source_path = result_store.source_path(output_name, image_filename)
+        keep_source = source_bytes if persist == 'full' else None
+        if result_writer.submit(write_detection_outputs, keep_source, source_path, json_data, json_output_path, block=block):
+            if keep_source is not None:
+                output_files['source'] = source_path
+                output_files['image_url'] = f'/results/{output_name}/image'
+            output_files['json'] = json_output_path
+    return output_files
+
+def save_detection_results(image_filename, results, output_name, source_bytes=None, response_format='list', persist='full', scale=None, block=False, image_size=None):
+    """Build detection results and queue the source image/JSON outputs for background saving
     
-    # Process results for JSON output
+    ``output_name`` is the stored result's name and ``source_bytes`` the
+    uploaded image, kept for on-demand rendering when persist is 'full'.
+    ``scale`` maps boxes from a reduced-size decode back to original image
+    coordinates, whose ``(width, height)`` is recorded as ``image_size`` when
+    given (rendering scales boxes from it to the stored source). ``block`` waits for room in the writer queue instead of
+    dropping the write when it is full (bulk requests). Returns the JSON data
+    and the output files that were queued for writing.
+    """
+    
+    # Process results for JSON output (one bulk transfer of all boxes)
     detections = []
+    columns = None
     if len(results) > 0:
         result = results[0]
-        if result.boxes is not None and len(result.boxes) > 0:
-            boxes = result.boxes
-            for i in range(len(boxes)):
-                box = boxes[i]
-                detection = {
-                    'bbox': {
-                        'x1': float(box.xyxy[0][0].item()),
-                        'y1': float(box.xyxy[0][1].item()),
-                        'x2': float(box.xyxy[0][2].item()),
-                        'y2': float(box.xyxy[0][3].item())
-                    },
-                    'confidence': float(box.conf[0].item()),
-                    'class_id': int(box.cls[0].item()),
-                    'class_name': result.names[int(box.cls[0].item())]
-                }
-                detections.append(detection)
-    
-    # Save the result image with bounding boxes
-    if len(results) > 0:
-        results[0].save(filename=output_image_path)
-        logger.info(f"Output image saved: {output_image_path}")
+        arrays = box_arrays(result, scale)
+        detections = detections_from_arrays(arrays, result.names)
+        if response_format == 'columnar':
+            columns = columnar_from_arrays(arrays, result.names)
     
     # Prepare JSON data
     json_data = {
@@ -66,25 +532,79 @@ def save_detection_results(image_filename, results, output_image_path, json_outp
         'detection_count': len(detections),
         'success': True
     }
+    if image_size is not None:
+        json_data['image_size'] = {'width': image_size[0], 'height': image_size[1]}
+    
+    output_files = queue_detection_outputs(json_data, output_name, image_filename, source_bytes, persist, block)
     
-    # Save JSON file
-    with open(json_output_path, 'w') as f:
-        json.dump(json_data, f, indent=2)
+    if columns is not None:
+        # The saved file always uses the list format; only the response is columnar
+        json_data = {**json_data, 'detections': columns, 'format': 'columnar'}
+    return json_data, output_files
+
+def cached_detection_response(cached, image_filename, output_name, source_bytes, response_format, persist, conf_threshold, model_name, imgsz, start_time):
+    """Build a /detect response from a cache entry (no inference)
     
-    logger.info(f"JSON results saved: {json_output_path}")
+    The result is persisted like a miss would be, and the response carries
+    the same fields (image/decoded size and tiling come from the entry).
+    """
+    columns = cached['columns']
+    json_data = {
+        'image_filename': image_filename,
+        'timestamp': datetime.now().isoformat(),
+        'detections': detections_from_columnar(columns),
+        'detection_count': len(columns['confidence']),
+        'success': True,
+        'image_size': cached['image_size']
+    }
+    output_files = queue_detection_outputs(json_data, output_name, image_filename, source_bytes, persist)
+    if response_format == 'columnar':
+        json_data = {**json_data, 'detections': columns, 'format': 'columnar'}
     
-    return json_data
+    processing_time = (datetime.now() - start_time).total_seconds()
+    logger.info(f"Cache hit: {len(columns['confidence'])} objects for {image_filename} in {processing_time * 1000:.2f}ms")
+    return {
+        **json_data,
+        'output_files': output_files,
+        'persist': persist,
+        'processing_time': processing_time,
+        'decode_time': 0.0,
+        'confidence_threshold': conf_threshold,
+        'model': model_name,
+        'imgsz': imgsz,
+        **{key: value for key, value in cached.items() if key != 'columns'},
+        'cache_hit': True
+    }
+
+def wants_binary():
+    """Whether the caller's Accept header prefers packed binary detections over JSON"""
+    return request.accept_mimetypes.best_match(['application/json', BINARY_CONTENT_TYPE]) == BINARY_CONTENT_TYPE
+
+def detection_response(response, binary):
+    """Encode a /detect response as JSON or, for binary callers, packed arrays (columnar detections)"""
+    if binary:
+        encoded = Response(encode_binary(response), content_type=BINARY_CONTENT_TYPE)
+    else:
+        encoded = jsonify(response)
+    encoded.vary.add('Accept')
+    return encoded
 
 @app.route('/detect', methods=['POST'])
 def detect_objects():
     """Endpoint for object detection with output saving"""
-    if model is None:
-        return jsonify({'error': 'Model not loaded'}), 500
+    not_ready = not_ready_response()
+    if not_ready is not None:
+        return not_ready
+    
+    model_name = requested_model()
+    if model_name is None:
+        return unknown_model_response()
     
     if 'image' not in request.files:
         return jsonify({'error': 'No image file provided'}), 400
     
     start_time = datetime.now()
+    timer = g.stage_timer
     
     try:
         image_file = request.files['image']
@@ -94,56 +614,145 @@ def detect_objects():
         # Get confidence threshold from request (optional)
         conf_threshold = float(request.form.get('confidence', CONFIDENCE_THRESHOLD))
         
+        # Response shape: 'list' of detection dicts (default) or 'columnar' parallel arrays
+        response_format = request.form.get('format', 'list')
+        if response_format not in RESPONSE_FORMATS:
+            return jsonify({'error': f"format must be one of {', '.join(RESPONSE_FORMATS)}"}), 400
+        
+        # Accept: application/vnd.yolo.detections gets packed float32 arrays instead of JSON (built from columns)
+        binary = wants_binary()
+        if binary:
+            response_format = 'columnar'
+        
+        # What to write to OUTPUT_DIR: 'none', 'json' or 'full' (JSON plus the upload, for rendering on request)
+        persist = request.form.get('persist', DEFAULT_PERSIST)
+        if persist not in PERSIST_MODES:
+            return jsonify({'error': f"persist must be one of {', '.join(PERSIST_MODES)}"}), 400
+        
+        # Model input size (imgsz) and opt-in sliced inference for very large images: tiled=true, tile_size, tile_overlap
+        try:
+            imgsz = requested_imgsz()
+            tiling = requested_tiling()
+            source_size = requested_source_size()
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        tile_params = {'tile_size': tiling[0], 'tile_overlap': tiling[1]} if tiling is not None else {}
+        
         # Generate unique filename based on timestamp
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         base_filename = Path(original_filename).stem
         output_filename = f"{timestamp}_{base_filename}"
         
-        # Create temporary file for processing
-        file_ext = os.path.splitext(original_filename)[1].lower()
-        if not file_ext:
-            file_ext = '.jpg'
+        with timer.stage('read'):
+            image_bytes = image_file.read()
         
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            image_file.save(temp_file.name)
-            temp_file_path = temp_file.name
+        # Identical uploads with identical settings are answered from the cache
+        cache_key = None
+        if detection_cache is not None:
+            with timer.stage('cache'):
+                cache_key = DetectionCache.make_key(image_bytes, f"{model_registry.weights[model_name]}:{MODEL_BACKEND}", conf=conf_threshold, imgsz=imgsz, entry=CACHE_ENTRY_VERSION, source_size=source_size, **tile_params)
+                cached = detection_cache.get(cache_key)
+            if cached is not None:
+                return detection_response(cached_detection_response(
+                    cached, original_filename, output_filename, image_bytes, response_format, persist,
+                    conf_threshold, model_name, imgsz, start_time
+                ), binary)
         
         try:
-            # Run detection with confidence threshold
-            results = model(temp_file_path, conf=conf_threshold)
-            
-            # Define output paths
-            output_image_path = os.path.join(OUTPUT_DIR, f"{output_filename}_detected.jpg")
-            json_output_path = os.path.join(OUTPUT_DIR, f"{output_filename}_results.json")
-            
-            # Save results
-            json_data = save_detection_results(
+            deadline = request_deadline()
+        except ValueError:
+            return jsonify({'error': f'{DEADLINE_HEADER} must be a number of milliseconds'}), 400
+        
+        lane, rejected = admit_request('interactive')
+        if rejected is not None:
+            return rejected
+        if deadline is not None and time.monotonic() >= deadline:
+            return deadline_exceeded_response('admission')
+        
+        # Decode the upload straight from memory - no temporary file round-trip. Large JPEGs are
+        # decoded at about imgsz unless tiling needs full resolution; boxes are scaled back after
+        decode_start = time.perf_counter()
+        try:
+            if REDUCED_DECODE and tiling is None:
+                image, original_size = decode_image_reduced(image_bytes, imgsz)
+            else:
+                image = decode_image(image_bytes)
+                original_size = (image.shape[1], image.shape[0])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        decode_time = time.perf_counter() - decode_start
+        timer.record('decode', decode_time)
+        if source_size is not None:
+            # The upload was downsized by a proxy: report and store boxes in the source image's coordinates
+            original_size = source_size
+        decoded_size = (image.shape[1], image.shape[0])
+        scale = None
+        if decoded_size != original_size:
+            scale = (original_size[0] / decoded_size[0], original_size[1] / decoded_size[1])
+        
+        # Run detection with confidence threshold (batched with concurrent requests)
+        tiles = None
+        try:
+            if tiling is not None:
+                if len(tile_windows(image.shape[1], image.shape[0], *tiling)) > MAX_TILES:
+                    return jsonify({'error': f'Image needs more than {MAX_TILES} tiles, use a larger tile_size'}), 400
+                submit = functools.partial(get_scheduler(model_name).submit, conf=conf_threshold,
+                                           priority=PRIORITIES[lane], deadline=deadline, imgsz=imgsz)
+                result, tiles = detect_tiled(image, submit, *tiling, window=TILE_BATCH_SIZE,
+                                             iou_threshold=TILE_NMS_IOU, full_image=TILE_FULL_IMAGE)
+                results = [result]
+            else:
+                results = [get_scheduler(model_name).infer(image, conf_threshold, priority=PRIORITIES[lane],
+                                                           deadline=deadline, imgsz=imgsz)]
+        except DeadlineExceeded:
+            return deadline_exceeded_response('queue')
+        record_inference_stages(timer, results[0])
+        
+        # Save results (written in the background)
+        with timer.stage('serialize'):
+            json_data, output_files = save_detection_results(
                 original_filename, 
                 results, 
-                output_image_path, 
-                json_output_path
+                output_filename, 
+                image_bytes,
+                response_format,
+                persist,
+                scale,
+                image_size=original_size
             )
-            
-            processing_time = (datetime.now() - start_time).total_seconds()
-            
-            # Add file paths to response
-            response = {
-                **json_data,
-                'output_files': {
-                    'image': output_image_path,
-                    'json': json_output_path
-                },
-                'processing_time': processing_time,
-                'confidence_threshold': conf_threshold
-            }
-            
-            logger.info(f"Detection completed: {len(json_data['detections'])} objects found in {processing_time:.2f}s")
-            return jsonify(response)
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_file_path):
-                os.unlink(temp_file_path)
+        
+        # Response fields that depend on the image, also kept in the cache entry so hits return them
+        image_fields = {
+            'image_size': {'width': original_size[0], 'height': original_size[1]},
+            'decoded_size': {'width': decoded_size[0], 'height': decoded_size[1]}
+        }
+        if tiling is not None:
+            image_fields['tiling'] = {'tile_size': tiling[0], 'tile_overlap': tiling[1], 'inferences': tiles}
+        
+        if cache_key is not None:
+            with timer.stage('cache_store'):
+                columns = json_data['detections'] if response_format == 'columnar' else columnar_from_detections(json_data['detections'])
+                detection_cache.put(cache_key, {'columns': columns, **image_fields})
+        
+        processing_time = (datetime.now() - start_time).total_seconds()
+        
+        # Add file paths to response
+        response = {
+            **json_data,
+            'output_files': output_files,
+            'persist': persist,
+            'processing_time': processing_time,
+            'decode_time': decode_time,
+            'confidence_threshold': conf_threshold,
+            'model': model_name,
+            'imgsz': imgsz,
+            **image_fields,
+            'cache_hit': False
+        }
+        
+        logger.info(f"Detection completed: {json_data['detection_count']} objects found in {processing_time:.2f}s (decode {decode_time * 1000:.1f}ms at {decoded_size[0]}x{decoded_size[1]})")
+        with timer.stage('encode'):
+            return detection_response(response, binary)
         
     except Exception as e:
         logger.error(f"Detection error: {str(e)}")
@@ -151,48 +760,348 @@ def detect_objects():
         logger.error(traceback.format_exc())
         return jsonify({'error': str(e)}), 500
 
+def frame_detections(result, response_format):
+    """Serialise one frame's detections in the requested response format"""
+    arrays = box_arrays(result)
+    if response_format == 'columnar':
+        return columnar_from_arrays(arrays, result.names)
+    return detections_from_arrays(arrays, result.names)
+
+def detach_upload_stream(file_storage):
+    """Take ownership of an upload's stream so it outlives the view
+    
+    Flask closes request files as soon as the view returns, which is before a
+    streamed response has finished reading them.
+    """
+    stream = file_storage.stream
+    file_storage.stream = io.BytesIO()
+    return stream
+
+@app.route('/detect/video', methods=['POST'])
+def detect_video():
+    """Endpoint for detection over a video file or a sequence of frame images
+    
+    Accepts either a 'video' file or one or more 'frames' image files, plus
+    optional confidence, stride (process every Nth frame), imgsz and format. Frames are
+    decoded ahead of inference in a bounded producer thread, batched through the
+    scheduler and streamed back as NDJSON - one line per processed frame,
+    followed by a summary line. Nothing is persisted.
+    """
+    not_ready = not_ready_response()
+    if not_ready is not None:
+        return not_ready
+    
+    model_name = requested_model()
+    if model_name is None:
+        return unknown_model_response()
+    
+    video_file = request.files.get('video')
+    frame_files = request.files.getlist('frames')
+    if video_file is None and not frame_files:
+        return jsonify({'error': 'Provide a "video" file or one or more "frames" image files'}), 400
+    
+    try:
+        conf_threshold = float(request.form.get('confidence', CONFIDENCE_THRESHOLD))
+        stride = int(request.form.get('stride', 1))
+        if stride < 1:
+            raise ValueError('stride must be >= 1')
+        imgsz = requested_imgsz()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response_format = request.form.get('format', 'list')
+    if response_format not in RESPONSE_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(RESPONSE_FORMATS)}"}), 400
+    
+    lane, rejected = admit_request('bulk')
+    if rejected is not None:
+        return rejected
+    
+    temp_video_path = None
+    frame_streams = []
+    if video_file is not None:
+        # OpenCV can only open videos by path, so the upload is copied to one temp file
+        file_ext = os.path.splitext(video_file.filename or '')[1].lower() or '.mp4'
+        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
+            shutil.copyfileobj(video_file.stream, temp_file, 1024 * 1024)
+            temp_video_path = temp_file.name
+        frames = iter_video_frames(temp_video_path, stride)
+        source = video_file.filename
+    else:
+        # Frames are read one at a time by the producer, from streams that outlive the view
+        frame_streams = [detach_upload_stream(frame_file) for frame_file in frame_files]
+        frames = iter_uploaded_frames(frame_streams, stride)
+        source = f'{len(frame_files)} frames'
+    
+    logger.info(f"Streaming detection for {source} (stride {stride})")
+    
+    def generate():
+        start = time.perf_counter()
+        processed = 0
+        detected = 0
+        try:
+            decoded = prefetch(frames, STREAM_PREFETCH_ITEMS)
+            submit = functools.partial(get_scheduler(model_name).submit, conf=conf_threshold,
+                                       priority=PRIORITIES[lane], imgsz=imgsz)
+            for (index, timestamp), result in ordered_inference(decoded, submit, STREAM_INFLIGHT_ITEMS):
+                if isinstance(result, Exception):
+                    yield json.dumps({'frame': index, 'timestamp': timestamp, 'error': str(result)}) + '\n'
+                    continue
+                detections = frame_detections(result, response_format)
+                count = len(result.boxes) if result.boxes is not None else 0
+                processed += 1
+                detected += count
+                yield json.dumps({
+                    'frame': index,
+                    'timestamp': timestamp,
+                    'detections': detections,
+                    'detection_count': count
+                }) + '\n'
+            
+            elapsed = time.perf_counter() - start
+            logger.info(f"Streaming detection completed: {processed} frames, {detected} objects in {elapsed:.2f}s")
+            yield json.dumps({'summary': {
+                'source': source,
+                'frames_processed': processed,
+                'detection_count': detected,
+                'stride': stride,
+                'processing_time': elapsed,
+                'frames_per_second': processed / elapsed if elapsed > 0 else 0.0,
+                'confidence_threshold': conf_threshold,
+                'model': model_name,
+                'success': True
+            }}) + '\n'
+        except Exception as e:
+            logger.error(f"Streaming detection error after {processed} frames: {str(e)}")
+            yield json.dumps({'error': str(e), 'frames_processed': processed}) + '\n'
+        finally:
+            for stream in frame_streams:
+                stream.close()
+            if temp_video_path and os.path.exists(temp_video_path):
+                os.unlink(temp_video_path)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/detect/batch', methods=['POST'])
+def detect_batch():
+    """Endpoint for bulk detection over many images or a zip/tar archive
+    
+    Accepts one or more 'images' files or a single 'archive' file, plus optional
+    confidence, imgsz, format and persist. Entries are decoded in memory by a bounded
+    producer thread, batched through the scheduler and streamed back as NDJSON,
+    one line per image followed by a summary line with aggregate throughput.
+    A bad entry only produces an error line for that entry.
+    """
+    not_ready = not_ready_response()
+    if not_ready is not None:
+        return not_ready
+    
+    model_name = requested_model()
+    if model_name is None:
+        return unknown_model_response()
+    
+    archive_file = request.files.get('archive')
+    image_files = request.files.getlist('images')
+    if archive_file is None and not image_files:
+        return jsonify({'error': 'Provide one or more "images" files or an "archive" (zip/tar) file'}), 400
+    
+    try:
+        conf_threshold = float(request.form.get('confidence', CONFIDENCE_THRESHOLD))
+        imgsz = requested_imgsz()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    response_format = request.form.get('format', 'list')
+    if response_format not in RESPONSE_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(RESPONSE_FORMATS)}"}), 400
+    
+    persist = request.form.get('persist', DEFAULT_PERSIST)
+    if persist not in PERSIST_MODES:
+        return jsonify({'error': f"persist must be one of {', '.join(PERSIST_MODES)}"}), 400
+    
+    lane, rejected = admit_request('bulk')
+    if rejected is not None:
+        return rejected
+    
+    # Uploads are detached from the request and read entry by entry by the producer
+    archive_stream = None
+    image_streams = []
+    if archive_file is not None:
+        archive_stream = detach_upload_stream(archive_file)
+        payloads = iter_archive_images(archive_stream)
+        source = archive_file.filename
+    else:
+        image_streams = [(image_file.filename, detach_upload_stream(image_file)) for image_file in image_files]
+        payloads = iter_uploaded_images(image_streams)
+        source = f'{len(image_streams)} images'
+    
+    batch_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    logger.info(f"Bulk detection for {source}")
+    
+    def generate():
+        start = time.perf_counter()
+        stats = {'images': 0, 'errors': 0, 'detections': 0, 'bytes': 0}
+        
+        def measured(items):
+            for name, data in items:
+                stats['bytes'] += len(data)
+                yield name, data
+        
+        try:
+            decoded = prefetch(iter_decoded_images(measured(payloads)), STREAM_PREFETCH_ITEMS)
+            submit = functools.partial(get_scheduler(model_name).submit, conf=conf_threshold,
+                                       priority=PRIORITIES[lane], imgsz=imgsz)
+            for (index, name, data), result in ordered_inference(decoded, submit, STREAM_INFLIGHT_ITEMS):
+                if isinstance(result, Exception):
+                    stats['errors'] += 1
+                    yield json.dumps({'index': index, 'image_filename': name, 'error': str(result), 'success': False}) + '\n'
+                    continue
+                
+                output_filename = f"{batch_timestamp}_{index:06d}_{Path(name).stem}"
+                json_data, output_files = save_detection_results(
+                    name,
+                    [result],
+                    output_filename,
+                    data,
+                    response_format,
+                    persist,
+                    block=True  # Backpressure: a full writer queue slows the stream instead of losing results
+                )
+                stats['images'] += 1
+                stats['detections'] += json_data['detection_count']
+                yield json.dumps({'index': index, **json_data, 'output_files': output_files}) + '\n'
+            
+            elapsed = time.perf_counter() - start
+            logger.info(f"Bulk detection completed: {stats['images']} images ({stats['errors']} errors) in {elapsed:.2f}s")
+            yield json.dumps({'summary': {
+                'source': source,
+                'images_processed': stats['images'],
+                'errors': stats['errors'],
+                'detection_count': stats['detections'],
+                'processing_time': elapsed,
+                'images_per_second': stats['images'] / elapsed if elapsed > 0 else 0.0,
+                'megabytes_per_second': stats['bytes'] / 1024 / 1024 / elapsed if elapsed > 0 else 0.0,
+                'confidence_threshold': conf_threshold,
+                'model': model_name,
+                'persist': persist,
+                'success': True
+            }}) + '\n'
+        except Exception as e:
+            logger.error(f"Bulk detection error after {stats['images']} images: {str(e)}")
+            yield json.dumps({'error': str(e), 'images_processed': stats['images']}) + '\n'
+        finally:
+            if archive_stream is not None:
+                archive_stream.close()
+            for _, stream in image_streams:
+                stream.close()
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/results', methods=['GET'])
 def list_results():
-    """Endpoint to list all saved results"""
+    """Endpoint to list saved results (newest first) from the results index
+    
+    Query parameters: cursor (next_cursor of the previous page), limit,
+    since/until (ISO timestamps) and class_name.
+    """
     try:
+        limit = min(max(int(request.args.get('limit', RESULTS_PAGE_SIZE)), 1), RESULTS_MAX_PAGE_SIZE)
+        filters = {
+            'since': request.args.get('since'),
+            'until': request.args.get('until'),
+            'class_name': request.args.get('class_name')
+        }
+        rows, next_cursor = results_index.query(cursor=request.args.get('cursor'), limit=limit, **filters)
+        
         image_files = []
         json_files = []
-        
-        for file in Path(OUTPUT_DIR).iterdir():
-            if file.suffix.lower() in ['.jpg', '.jpeg', '.png'] and '_detected' in file.name:
+        for row in rows:
+            if row['image_file']:
                 image_files.append({
-                    'filename': file.name,
-                    'path': str(file),
-                    'size': file.stat().st_size
-                })
-            elif file.suffix.lower() == '.json' and '_results' in file.name:
-                json_files.append({
-                    'filename': file.name,
-                    'path': str(file),
-                    'size': file.stat().st_size
+                    'filename': os.path.basename(row['image_file']),
+                    'path': os.path.join(OUTPUT_DIR, row['image_file']),
+                    'size': row['image_size'],
+                    'url': f"/results/{row['name']}/image"
                 })
+            # Compacted results live in a day's segment log; GET /results/<filename> resolves either
+            json_files.append({
+                'filename': f"{row['name']}{RESULTS_SUFFIX}",
+                'path': os.path.join(OUTPUT_DIR, row['json_file']),
+                'compacted': row['json_offset'] is not None,
+                'size': row['json_size'],
+                'timestamp': row['timestamp'],
+                'detection_count': row['detection_count']
+            })
         
         return jsonify({
-            'image_files': sorted(image_files, key=lambda x: x['filename'], reverse=True),
-            'json_files': sorted(json_files, key=lambda x: x['filename'], reverse=True),
-            'total_results': len(image_files)
+            'image_files': image_files,
+            'json_files': json_files,
+            'total_results': results_index.count(**filters),
+            'next_cursor': next_cursor
         })
     
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
     except Exception as e:
         logger.error(f"Error listing results: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/results/export', methods=['GET'])
+def export_results():
+    """Endpoint to stream detections as a columnar file, one row per box
+    
+    Query parameters: format (npz, or parquet/arrow when pyarrow is
+    installed), since/until (ISO timestamps) and class_name. Rows are read
+    from the index's detections table, never from the result files.
+    """
+    fmt = request.args.get('format', 'npz')
+    filters = {
+        'since': request.args.get('since'),
+        'until': request.args.get('until'),
+        'class_name': request.args.get('class_name')
+    }
+    try:
+        chunks = iter_export(results_index, fmt, **filters)
+    except ValueError as e:
+        return jsonify({'error': str(e), 'available_formats': available_formats()}), 400
+    
+    filename = f"detections_{datetime.now().strftime('%Y%m%d_%H%M%S')}.{fmt}"
+    logger.info(f"Exporting detections as {fmt} ({', '.join(f'{k}={v}' for k, v in filters.items() if v) or 'all'})")
+    return Response(stream_with_context(chunks), content_type=CONTENT_TYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename="{filename}"'})
+
+@app.route('/results/reindex', methods=['POST'])
+def reindex_results():
+    """Endpoint to rebuild the results index from the files in OUTPUT_DIR"""
+    try:
+        start = time.perf_counter()
+        # Let queued result writes land first, so they are in the rebuilt index
+        result_writer.flush()
+        indexed = results_index.rebuild(result_store.scan())
+        return jsonify({'indexed': indexed, 'rebuild_time': time.perf_counter() - start})
+    except Exception as e:
+        logger.error(f"Error rebuilding results index: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/results/maintenance', methods=['POST'])
+def maintain_results_now():
+    """Endpoint to run result compaction and retention now instead of waiting for the background run"""
+    try:
+        return jsonify(result_store.maintain())
+    except Exception as e:
+        logger.error(f"Error running result storage maintenance: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/results/<filename>', methods=['GET'])
 def get_result(filename):
-    """Endpoint to get specific result JSON"""
+    """Endpoint to get specific result JSON, wherever the result store currently keeps it"""
     try:
-        json_path = os.path.join(OUTPUT_DIR, filename)
-        
-        if not os.path.exists(json_path):
+        if not filename.endswith(RESULTS_SUFFIX):
             return jsonify({'error': 'Result file not found'}), 404
         
-        with open(json_path, 'r') as f:
-            result_data = json.load(f)
+        result_data = result_store.read_json(filename[:-len(RESULTS_SUFFIX)])
+        if result_data is None:
+            return jsonify({'error': 'Result file not found'}), 404
         
         return jsonify(result_data)
     
@@ -200,28 +1109,200 @@ def get_result(filename):
         logger.error(f"Error reading result file: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/results/<name>/image', methods=['GET'])
+def get_result_image(name):
+    """Endpoint to get a result's annotated image, rendered from its source on first request
+    
+    Query parameters: max_width (thumbnail width in px) and quality (JPEG,
+    1-100). Rendered variants are cached in memory and served with an ETag,
+    so revalidation with If-None-Match gets a 304 without rendering.
+    """
+    try:
+        max_width = request.args.get('max_width')
+        max_width = int(max_width) if max_width else None
+        quality = int(request.args.get('quality', RENDER_JPEG_QUALITY))
+        if max_width is not None and max_width < 16:
+            raise ValueError('max_width must be >= 16')
+        if not 1 <= quality <= 100:
+            raise ValueError('quality must be between 1 and 100')
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+    
+    try:
+        row = results_index.get(name)
+        if row is None or row['image_file'] is None:
+            return jsonify({'error': 'Result image not found'}), 404
+        
+        etag = render_etag(name, row['timestamp'], row['image_size'], max_width, quality)
+        headers = {'Cache-Control': f'public, max-age={RENDER_MAX_AGE}'}
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+        
+        rendered = render_cache.get(etag)
+        headers['X-Render-Cache'] = 'hit' if rendered is not None else 'miss'
+        if rendered is None:
+            start = time.perf_counter()
+            with open(os.path.join(OUTPUT_DIR, row['image_file']), 'rb') as f:
+                image_bytes = f.read()
+            if row['image_file'].endswith(IMAGE_SUFFIX):
+                # Saved before lazy rendering: the detections are already drawn on it
+                rendered = resize_rendered(image_bytes, max_width, quality)
+            else:
+                rendered = render_detections(image_bytes, result_store.read_json(name) or {}, max_width, quality)
+            render_cache.put(etag, rendered)
+            logger.info(f"Rendered {name} (max_width {max_width}, quality {quality}) in {(time.perf_counter() - start) * 1000:.1f}ms")
+        
+        response = Response(rendered, mimetype='image/jpeg', headers=headers)
+        response.set_etag(etag)
+        return response
+    
+    except FileNotFoundError:
+        return jsonify({'error': 'Result image not found'}), 404
+    except Exception as e:
+        logger.error(f"Error rendering result image: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/stats', methods=['GET'])
+def detection_stats():
+    """Endpoint for detection analytics over a time window, e.g. dogs per hour today
+    
+    Query parameters: since/until (ISO timestamps, truncated to the hour;
+    since defaults to today's midnight), bucket (hour or day) and
+    class_name. Served from the index's hourly aggregates, which count every
+    completed detection (cache hits and persist=none included, writes dropped
+    by a full writer queue excepted), so the cost depends on the window and
+    not on how many results are stored.
+    """
+    try:
+        since = request.args.get('since') or datetime.now().strftime('%Y-%m-%dT00')
+        until = request.args.get('until')
+        bucket = request.args.get('bucket', 'hour')
+        class_name = request.args.get('class_name')
+        if bucket not in ('hour', 'day'):
+            raise ValueError('bucket must be hour or day')
+        for value in (since, until):
+            if value:
+                datetime.fromisoformat(value if len(value) != 13 else f'{value}:00')
+        
+        images, classes = results_index.aggregates(since, until, class_name, bucket)
+        
+        def summarize(image_count, detection_count, class_totals):
+            return {
+                'images': image_count,
+                'detections': detection_count,
+                'detections_per_image': detection_count / image_count if image_count else 0.0,
+                'classes': {
+                    name: {
+                        'images': class_images,
+                        'detections': class_detections,
+                        'detections_per_image': class_detections / image_count if image_count else 0.0,
+                        'avg_confidence': confidence_sum / class_detections
+                    }
+                    for name, (class_images, class_detections, confidence_sum) in sorted(class_totals.items())
+                }
+            }
+        
+        totals = {}
+        for bucket_classes in classes.values():
+            for name, values in bucket_classes.items():
+                totals[name] = tuple(a + b for a, b in zip(totals.get(name, (0, 0, 0.0)), values))
+        
+        return jsonify({
+            'since': since,
+            'until': until,
+            'bucket': bucket,
+            'class_name': class_name,
+            **summarize(sum(n for n, _ in images.values()), sum(d for _, d in images.values()), totals),
+            'buckets': [
+                {'start': key, **summarize(*images[key], classes.get(key, {}))}
+                for key in images
+            ]
+        })
+    
+    except ValueError as e:
+        return jsonify({'error': f'Invalid query parameter: {e}'}), 400
+    except Exception as e:
+        logger.error(f"Error computing detection stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/livez', methods=['GET'])
+def liveness():
+    """Liveness: the process is up and serving requests (the model may still be loading)"""
+    return jsonify({'status': 'alive', 'uptime': time.perf_counter() - PROCESS_START})
+
+@app.route('/readyz', methods=['GET'])
+def readiness():
+    """Readiness: the default model is loaded and warmed up, so detection requests won't pay for it"""
+    ready = model_ready.is_set()
+    return jsonify({'ready': ready, **startup}), 200 if ready else 503
+
 @app.route('/health', methods=['GET'])
 def health_check():
     return jsonify({
         'status': 'healthy', 
-        'model_loaded': model is not None,
+        'ready': model_ready.is_set(),
+        'startup': startup,
+        'model_loaded': model_registry.is_resident(DEFAULT_MODEL),
+        'default_model': DEFAULT_MODEL,
+        'backend': MODEL_BACKEND,
+        'models': model_registry.stats(),
+        'workers': worker_pool.stats() if worker_pool is not None else {'workers': 0},
         'service': 'YOLO Object Detection',
         'output_directory': OUTPUT_DIR,
+        'batching': {name: model_scheduler.stats() for name, model_scheduler in list(schedulers.items())},
+        'writer': result_writer.stats(),
+        'storage': result_store.stats(),
+        'render_cache': render_cache.stats(),
+        'cache': detection_cache.stats() if detection_cache is not None else {'enabled': False},
+        'admission': admission.stats(),
         'timestamp': datetime.now().isoformat()
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
 @app.route('/', methods=['GET'])
 def home():
+    model_stats = model_registry.stats()
     return jsonify({
         'message': 'YOLO Object Detection Service with Output Saving',
         'endpoints': {
-            'POST /detect': 'Upload an image for object detection (saves output image and JSON)',
-            'GET /results': 'List all saved results',
+            'POST /detect': f'Upload an image for object detection (saves the upload and JSON in the background; the annotated image is rendered on request); model=yolo11n|s|m|l|x, persist=none|json|full, format=columnar returns parallel arrays, Accept: {BINARY_CONTENT_TYPE} returns them as packed float32 binary; 429 with Retry-After when at capacity, X-Request-Priority=interactive|bulk, X-Request-Timeout-Ms drops work whose caller has given up; imgsz sets the model input size (large JPEGs are decoded at about that size, boxes stay in original coordinates); source_width/source_height give the size of the image a proxy downsized the upload from, boxes are then in its coordinates; tiled=true (tile_size, tile_overlap) slices very large images into overlapping tiles',
+            'POST /detect/video': 'Upload a video (or a sequence of frames) and stream per-frame detections as NDJSON',
+            'POST /detect/batch': 'Upload many images or a zip/tar archive and stream per-image detections as NDJSON',
+            'GET /results': 'List saved results (cursor, limit, since, until, class_name)',
+            'GET /results/export': f"Stream detections as a columnar file, one row per box (format={'|'.join(EXPORT_FORMATS)}, since, until, class_name)",
+            'POST /results/reindex': 'Rebuild the results index from OUTPUT_DIR',
+            'POST /results/maintenance': 'Run result compaction and retention now',
             'GET /results/<filename>': 'Get specific result JSON',
-            'GET /health': 'Service health check'
+            'GET /results/<name>/image': 'Get the annotated image, rendered on first request (max_width, quality; ETag/If-None-Match)',
+            'GET /stats': 'Detection analytics from incrementally maintained hourly aggregates: images, detections per image and per-class counts/average confidence (since, until, bucket=hour|day, class_name)',
+            'GET /health': 'Service health check',
+            'GET /livez': 'Liveness probe (process is up)',
+            'GET /readyz': 'Readiness probe (default model loaded and warmed up; 503 until then)',
+            'GET /metrics': 'Prometheus metrics (per-stage latency histograms, queue depths, model memory)'
+        },
+        'models': {
+            'available': model_registry.names,
+            'default': DEFAULT_MODEL,
+            'backend': MODEL_BACKEND,
+            'resident': model_stats['resident_models'],
+            'latency_ms': {name: stats['batch_latency_ms'] for name, stats in model_stats['models'].items()}
         },
         'output_directory': OUTPUT_DIR
     })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=False)
+    try:
+        from waitress import serve
+    except ImportError:
+        serve = None
+    
+    if serve is not None:
+        logger.info(f"Serving with waitress ({WSGI_THREADS} threads)")
+        serve(app, host='0.0.0.0', port=PORT, threads=WSGI_THREADS)
+    else:
+        app.run(host='0.0.0.0', port=PORT, debug=False, threaded=True)
@@ -0,0 +1,121 @@
+import logging
+import os
+import time
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ('torch', 'onnx', 'openvino', 'fake')
+
+# The 'fake' backend stands in for a model in offline benchmarks: no weights, no downloads
+FAKE_LATENCY_MS = float(os.getenv('FAKE_LATENCY_MS', 25))  # Simulated forward pass per 640x640 image
+FAKE_DETECTIONS = int(os.getenv('FAKE_DETECTIONS', 10))  # Candidate boxes per image before the confidence filter
+
+
+def backend_id(backend, int8=False):
+    """Short identifier for a backend variant, e.g. 'onnx-int8'"""
+    return f'{backend}-int8' if int8 and backend in ('onnx', 'openvino') else backend
+
+
+def export_onnx(weights, imgsz=640, max_batch=8):
+    """Export PyTorch weights to a dynamic-batch ONNX model next to them (reused if present)"""
+    onnx_path = Path(weights).with_suffix('.onnx')
+    if not onnx_path.exists():
+        from ultralytics import YOLO
+        logger.info(f"Exporting {weights} to ONNX")
+        onnx_path = Path(YOLO(weights).export(format='onnx', imgsz=imgsz, dynamic=True, batch=max_batch, simplify=True))
+    return onnx_path
+
+
+def quantize_onnx(onnx_path):
+    """Create a dynamically INT8-quantized copy of an ONNX model (weights INT8, no calibration data)"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = onnx_path.with_name(f'{onnx_path.stem}_int8.onnx')
+    if not int8_path.exists():
+        logger.info(f"Quantizing {onnx_path} to INT8")
+        quantize_dynamic(str(onnx_path), str(int8_path), weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+def export_openvino(weights, imgsz=640, int8=False, calibration_data=None):
+    """Export PyTorch weights to an OpenVINO model directory (reused if present)"""
+    stem = Path(weights).stem
+    model_dir = Path(weights).with_name(f"{stem}{'_int8' if int8 else ''}_openvino_model")
+    if not model_dir.exists():
+        from ultralytics import YOLO
+        logger.info(f"Exporting {weights} to OpenVINO{' INT8' if int8 else ''}")
+        kwargs = {'int8': True, 'data': calibration_data} if int8 else {}
+        exported = Path(YOLO(weights).export(format='openvino', imgsz=imgsz, dynamic=True, **kwargs))
+        if exported != model_dir:
+            os.replace(exported, model_dir)
+    return model_dir
+
+
+class FakeDetector:
+    """Weight-free stand-in for a YOLO model, for offline load testing.
+
+    Sleeps ``latency_ms`` per 640x640 image (scaled by pixel count) in place
+    of the forward pass, then returns ultralytics ``Results`` with
+    ``detections`` pseudo-random boxes seeded from the image content, so the
+    same image always gets the same detections.
+    """
+
+    names = {i: f'class_{i}' for i in range(80)}
+
+    def __init__(self, latency_ms=FAKE_LATENCY_MS, detections=FAKE_DETECTIONS):
+        self.latency_ms = latency_ms
+        self.detections = detections
+
+    def __call__(self, images, conf=0.25, verbose=False, **kwargs):
+        import torch
+        from ultralytics.engine.results import Results
+
+        images = images if isinstance(images, (list, tuple)) else [images]
+        pixels = sum(image.shape[0] * image.shape[1] for image in images)
+        start = time.perf_counter()
+        time.sleep(self.latency_ms / 1000 * pixels / (640 * 640))
+        per_image_ms = (time.perf_counter() - start) * 1000 / len(images)
+
+        results = []
+        for image in images:
+            h, w = image.shape[:2]
+            rng = np.random.default_rng(int(image[::max(h // 8, 1), ::max(w // 8, 1)].sum()))
+            xy = rng.uniform(0, 0.8, (self.detections, 2)) * (w, h)
+            wh = rng.uniform(0.05, 0.2, (self.detections, 2)) * (w, h)
+            data = np.column_stack([
+                xy, np.minimum(xy + wh, (w, h)),
+                rng.uniform(0.05, 1.0, self.detections),
+                rng.integers(0, len(self.names), self.detections)
+            ]).astype(np.float32)
+            result = Results(image, path='', names=self.names, boxes=torch.from_numpy(data[data[:, 4] >= conf]))
+            result.speed = {'preprocess': 0.0, 'inference': per_image_ms, 'postprocess': 0.0}
+            results.append(result)
+        return results
+
+
+def load_model(weights, backend='torch', int8=False, imgsz=640, max_batch=8, calibration_data=None):
+    """Load a detection model behind the requested inference backend.
+
+    Every backend is wrapped in an ultralytics ``YOLO`` object, so callers keep
+    using ``model(images, conf=...)`` and get identical pre/post-processing
+    (letterboxing, NMS, ``Results``) regardless of which runtime does the
+    forward pass. ONNX models run on ONNX Runtime's CPU execution provider.
+    The ``fake`` backend ignores the weights and returns a ``FakeDetector``.
+    """
+    from ultralytics import YOLO
+
+    if backend == 'fake':
+        return FakeDetector()
+    if backend == 'torch':
+        return YOLO(weights)
+    if backend == 'onnx':
+        path = export_onnx(weights, imgsz, max_batch)
+        if int8:
+            path = quantize_onnx(path)
+        return YOLO(str(path), task='detect')
+    if backend == 'openvino':
+        return YOLO(str(export_openvino(weights, imgsz, int8, calibration_data)), task='detect')
+    raise ValueError(f"Unknown inference backend '{backend}', expected one of {', '.join(BACKENDS)}")
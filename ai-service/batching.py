@@ -0,0 +1,186 @@
+import itertools
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from admission import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+_STOP_PRIORITY = float('inf')  # Shutdown sentinels sort after all real work
+
+
+class _PendingRequest:
+    """A single image waiting in the scheduler queue"""
+
+    __slots__ = ('image', 'conf', 'future', 'enqueued_at', 'deadline', 'imgsz')
+
+    def __init__(self, image, conf, deadline=None, imgsz=None):
+        self.image = image
+        self.conf = conf
+        self.future = Future()
+        self.enqueued_at = time.monotonic()
+        self.deadline = deadline
+        self.imgsz = imgsz
+
+
+class BatchScheduler:
+    """Groups concurrent detection requests into shared forward passes.
+
+    Requests are queued by ``submit()`` and a background thread flushes them
+    through ``predict(images, conf)`` once ``max_batch_size`` requests are
+    waiting or the oldest one has waited ``max_wait`` seconds. The batch is run
+    at the lowest confidence threshold it contains and each result is then
+    filtered back down to its own request's threshold. With ``concurrency``
+    above one, that many batches can be in flight at once (e.g. one per
+    inference worker process). Each result's ``speed`` dict gains a ``queue``
+    entry with the milliseconds its request waited to be batched.
+
+    Requests are taken in ``priority`` order (lower first, FIFO within a
+    priority), so interactive requests jump ahead of queued bulk work. A
+    request whose ``deadline`` (``time.monotonic()`` value) has passed by the
+    time its batch is about to run is dropped and its Future fails with
+    ``DeadlineExceeded``.
+
+    A forward pass runs at a single input size, so only requests with the
+    same ``imgsz`` share a batch (passed on as ``predict(..., imgsz=imgsz)``);
+    requests at other sizes keep their place in the queue for a later batch.
+
+    With ``pass_deadline`` the batch's deadline (the latest of its requests',
+    or None if any request has none) is passed on as
+    ``predict(..., deadline=deadline)`` so the predictor can stop waiting for
+    a result nobody needs any more.
+    """
+
+    def __init__(self, predict, max_batch_size=8, max_wait=0.01, concurrency=1, pass_deadline=False):
+        self.predict = predict
+        self.pass_deadline = pass_deadline
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._images = 0
+        self._expired = 0
+        self._closed = False
+
+        self._threads = [
+            threading.Thread(target=self._run, name=f'batch-scheduler-{i}', daemon=True)
+            for i in range(max(1, int(concurrency)))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, image, conf, priority=0, deadline=None, imgsz=None):
+        """Queue an image for detection and return a Future for its result"""
+        if self._closed:
+            raise RuntimeError('Batch scheduler is closed')
+        request = _PendingRequest(image, conf, deadline, imgsz)
+        self._queue.put((priority, next(self._sequence), request))
+        return request.future
+
+    def infer(self, image, conf, timeout=None, priority=0, deadline=None, imgsz=None):
+        """Submit an image and block until its result is available"""
+        return self.submit(image, conf, priority, deadline, imgsz).result(timeout=timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            batches, images, expired = self._batches, self._images, self._expired
+        return {
+            'max_batch_size': self.max_batch_size,
+            'concurrency': len(self._threads),
+            'max_wait_ms': self.max_wait * 1000,
+            'queue_depth': self.queue_depth(),
+            'batches': batches,
+            'images': images,
+            'avg_batch_size': images / batches if batches else 0.0,
+            'expired': expired
+        }
+
+    def close(self, timeout=None):
+        """Stop accepting work and let the worker drain what is already queued"""
+        self._closed = True
+        for _ in self._threads:
+            self._queue.put((_STOP_PRIORITY, next(self._sequence), None))
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _collect(self):
+        """Block for the first request, then gather more at its imgsz until size or wait is hit"""
+        first = self._queue.get()[2]
+        if first is None:
+            return None
+
+        batch = [first]
+        deferred = []  # Entries at another imgsz, put back once the batch is complete
+        flush_at = first.enqueued_at + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = flush_at - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            request = entry[2]
+            if request is None:
+                # Re-queue the sentinel so the worker exits after this batch
+                self._queue.put(entry)
+                break
+            if request.imgsz != first.imgsz:
+                deferred.append(entry)
+                continue
+            batch.append(request)
+        for entry in deferred:
+            self._queue.put(entry)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._flush(batch)
+
+    def _flush(self, batch):
+        # Drop work nobody is waiting for any more before paying for inference
+        now = time.monotonic()
+        expired = [request for request in batch if request.deadline is not None and request.deadline <= now]
+        if expired:
+            with self._lock:
+                self._expired += len(expired)
+            for request in expired:
+                request.future.set_exception(DeadlineExceeded('Deadline exceeded before inference started'))
+            batch = [request for request in batch if request.deadline is None or request.deadline > now]
+            if not batch:
+                return
+
+        batch_conf = min(request.conf for request in batch)
+        kwargs = {'imgsz': batch[0].imgsz} if batch[0].imgsz is not None else {}
+        if self.pass_deadline:
+            deadlines = [request.deadline for request in batch]
+            kwargs['deadline'] = None if None in deadlines else max(deadlines)
+        dequeued_at = time.monotonic()
+        try:
+            results = self.predict([request.image for request in batch], batch_conf, **kwargs)
+        except Exception as e:
+            logger.error(f"Batch inference failed for {len(batch)} images: {e}")
+            for request in batch:
+                request.future.set_exception(e)
+            return
+
+        with self._lock:
+            self._batches += 1
+            self._images += len(batch)
+
+        for request, result in zip(batch, results):
+            if request.conf > batch_conf and result.boxes is not None:
+                result = result[result.boxes.conf >= request.conf]
+            # Time spent waiting for the batch, alongside ultralytics' per-stage speed (ms)
+            result.speed = {**(result.speed or {}), 'queue': (dequeued_at - request.enqueued_at) * 1000}
+            request.future.set_result(result)
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+class DetectionCache:
+    """Content-addressed cache of detection results.
+
+    Entries live in a memory-bounded LRU tier and, optionally, on disk under
+    ``disk_dir`` so they survive restarts. Keys are derived from the image
+    bytes plus everything else that changes the model output (see
+    ``make_key``), so a hit is always safe to return as-is.
+    """
+
+    def __init__(self, max_bytes, disk_dir=None):
+        self.max_bytes = int(max_bytes)
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+        self._entries = OrderedDict()  # key -> (value, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+
+    @staticmethod
+    def make_key(image_bytes, model_id, **params):
+        """Hash the image bytes together with the model identity and inference parameters"""
+        digest = hashlib.sha256(memoryview(image_bytes))
+        digest.update(model_id.encode())
+        for name in sorted(params):
+            digest.update(f'|{name}={params[name]!r}'.encode())
+        return digest.hexdigest()
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters['hits'] += 1
+                return entry[0]
+
+        value = self._read_disk(key)
+        with self._lock:
+            if value is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['hits'] += 1
+            self._counters['disk_hits'] += 1
+        self._insert(key, value, json.dumps(value))
+        return value
+
+    def put(self, key, value):
+        """Store a JSON-serialisable value in memory (and on disk if enabled)"""
+        encoded = json.dumps(value)
+        self._insert(key, value, encoded)
+        if self.disk_dir is not None:
+            self._write_disk(key, encoded)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters['hits'] + self._counters['misses']
+            return {
+                **self._counters,
+                'hit_rate': self._counters['hits'] / lookups if lookups else 0.0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'disk_enabled': self.disk_dir is not None
+            }
+
+    def _insert(self, key, value, encoded):
+        # The encoded JSON length is a cheap, stable stand-in for the entry's memory footprint
+        size = len(encoded)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters['evictions'] += 1
+
+    def _disk_path(self, key):
+        return self.disk_dir / key[:2] / f'{key}.json'
+
+    def _read_disk(self, key):
+        if self.disk_dir is None:
+            return None
+        try:
+            with open(self._disk_path(key), 'r') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {e}")
+            return None
+
+    def _write_disk(self, key, encoded):
+        path = self._disk_path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            tmp_path = path.with_suffix(f'.tmp{threading.get_ident()}')
+            with open(tmp_path, 'w') as f:
+                f.write(encoded)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write cache entry {key}: {e}")
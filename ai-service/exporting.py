@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Columnar export of detection history, one row per box.
+
+Rows come from the ``detections`` table of the results index, where each
+result's boxes are stored as packed arrays when it is saved, so an export
+never re-reads the result files and unpacks whole chunks with numpy.
+Columns: name (result), timestamp, x1, y1, x2, y2, confidence, class_id and
+class_name, with numeric columns typed (float32/int16, datetime64[us]).
+
+Formats: ``npz`` (numpy, always available), ``parquet`` and ``arrow``
+(Arrow IPC stream), which need pyarrow and are written one row group/record
+batch per chunk. All three stream in bounded memory; npz spills each
+column to a temporary file first, since its entries are stored one column
+after the other.
+
+Also usable as a CLI against a service's OUTPUT_DIR:
+  python exporting.py --output-dir output --format parquet --since 2025-01-01 -o detections.parquet
+"""
+
+import argparse
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+import zipfile
+
+import numpy as np
+
+from results_index import ResultsIndex
+
+EXPORT_FORMATS = ('npz', 'parquet', 'arrow')
+CONTENT_TYPES = {
+    'npz': 'application/octet-stream',
+    'parquet': 'application/vnd.apache.parquet',
+    'arrow': 'application/vnd.apache.arrow.stream'
+}
+CHUNK_SIZE = 4096  # Results per read from the index (and per Parquet row group / Arrow batch)
+COLUMNS = ('name', 'timestamp', 'x1', 'y1', 'x2', 'y2', 'confidence', 'class_id', 'class_name')
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional: only needed for parquet/arrow exports
+    pyarrow = None
+
+
+def available_formats():
+    return [fmt for fmt in EXPORT_FORMATS if fmt == 'npz' or pyarrow is not None]
+
+
+def detection_columns(rows, class_name=None):
+    """Unpack ``ResultsIndex.iter_detections`` rows into typed numpy columns, one entry per box"""
+    counts = np.array([len(confidence) // 4 for _, _, _, confidence, _, _ in rows], dtype=np.int64)
+    boxes = np.frombuffer(b''.join(row[2] for row in rows), dtype=np.float32).reshape(-1, 4)
+    class_names = [name for row in rows if row[5] for name in row[5].split('\n')]
+    columns = {
+        'name': np.repeat(np.array([row[0] for row in rows], dtype=str), counts),
+        'timestamp': np.repeat(np.array([row[1] for row in rows], dtype='datetime64[us]'), counts),
+        'x1': boxes[:, 0],
+        'y1': boxes[:, 1],
+        'x2': boxes[:, 2],
+        'y2': boxes[:, 3],
+        'confidence': np.frombuffer(b''.join(row[3] for row in rows), dtype=np.float32),
+        'class_id': np.frombuffer(b''.join(row[4] for row in rows), dtype=np.int16),
+        'class_name': np.array(class_names, dtype=str)
+    }
+    if class_name is not None:
+        keep = columns['class_name'] == class_name
+        columns = {column: values[keep] for column, values in columns.items()}
+    return columns
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are handed out (and dropped) chunk by chunk"""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _arrow_table(columns):
+    arrays = {name: pyarrow.array(values) for name, values in columns.items()}
+    arrays['class_name'] = arrays['class_name'].dictionary_encode()
+    return pyarrow.table(arrays)
+
+
+def _iter_arrow(chunks, fmt, class_name):
+    sink = _ChunkSink()
+    writer = None
+    try:
+        for rows in chunks:
+            table = _arrow_table(detection_columns(rows, class_name))
+            if writer is None:
+                if fmt == 'parquet':
+                    writer = pyarrow.parquet.ParquetWriter(sink, table.schema, compression='zstd')
+                else:
+                    writer = pyarrow.ipc.new_stream(sink, table.schema)
+            writer.write_table(table)
+            yield sink.drain()
+        if writer is None:
+            # No rows: still produce a valid, empty file with the right schema
+            table = _arrow_table(detection_columns([]))
+            writer = (pyarrow.parquet.ParquetWriter(sink, table.schema) if fmt == 'parquet'
+                      else pyarrow.ipc.new_stream(sink, table.schema))
+    finally:
+        if writer is not None:
+            writer.close()
+    yield sink.drain()
+
+
+def _iter_npz(chunks, class_name):
+    """Write an ``np.savez_compressed``-compatible archive one column at a time
+
+    Each chunk's columns are first appended to one temporary file per column,
+    then every column is copied into its ``.npy`` entry behind a header with
+    the final length (and string width), so no more than a chunk is ever in
+    memory and the archive is handed out as it is compressed.
+    """
+    with contextlib.ExitStack() as stack:
+        spills = {name: stack.enter_context(tempfile.TemporaryFile()) for name in COLUMNS}
+        dtypes, lengths, parts = {}, dict.fromkeys(COLUMNS, 0), 0
+        for rows in itertools.chain(chunks, [[]]):
+            if rows or not parts:
+                for name, values in detection_columns(rows, class_name).items():
+                    np.save(spills[name], values, allow_pickle=False)
+                    dtypes[name] = np.promote_types(dtypes[name], values.dtype) if name in dtypes else values.dtype
+                    lengths[name] += len(values)
+                parts += 1
+
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for name in COLUMNS:
+                spill = spills[name]
+                spill.seek(0)
+                with archive.open(f'{name}.npy', 'w', force_zip64=True) as entry:
+                    np.lib.format.write_array_header_1_0(entry, {
+                        'descr': np.lib.format.dtype_to_descr(dtypes[name]),
+                        'fortran_order': False,
+                        'shape': (lengths[name],)
+                    })
+                    for _ in range(parts):
+                        entry.write(np.load(spill, allow_pickle=False).astype(dtypes[name], copy=False).tobytes())
+                        data = sink.drain()
+                        if data:
+                            yield data
+        yield sink.drain()
+
+
+def iter_export(index, fmt, since=None, until=None, class_name=None, chunk_size=CHUNK_SIZE):
+    """Yield the bytes of an export of ``index``'s detections in ``fmt``
+
+    Raises ValueError for an unknown format, or one whose optional
+    dependency is not installed.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    if fmt not in available_formats():
+        raise ValueError(f'{fmt} export requires pyarrow')
+    chunks = index.iter_detections(since=since, until=until, class_name=class_name, chunk_size=chunk_size)
+    if fmt == 'npz':
+        return _iter_npz(chunks, class_name)
+    return _iter_arrow(chunks, fmt, class_name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output-dir', default='output', help="The service's OUTPUT_DIR")
+    parser.add_argument('--format', default='parquet' if pyarrow is not None else 'npz', choices=EXPORT_FORMATS)
+    parser.add_argument('--since', default=None, help='ISO timestamp (inclusive)')
+    parser.add_argument('--until', default=None, help='ISO timestamp (exclusive)')
+    parser.add_argument('--class-name', default=None)
+    parser.add_argument('-o', '--output', required=True, help='File to write')
+    args = parser.parse_args()
+
+    index_path = os.path.join(args.output_dir, 'results_index.sqlite3')
+    if not os.path.exists(index_path):
+        sys.exit(f"No results index at {index_path}")
+    index = ResultsIndex(index_path, args.output_dir)
+    if index.needs_backfill:
+        sys.exit("The results index needs a rebuild; start the service (or POST /results/reindex) first")
+
+    try:
+        chunks = iter_export(index, args.format, args.since, args.until, args.class_name)
+        written = 0
+        with open(args.output, 'wb') as f:
+            for data in chunks:
+                f.write(data)
+                written += len(data)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(f"Exported detections to {args.output} ({written / 1024 / 1024:.2f} MB, {args.format})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+import io
+import math
+
+import numpy as np
+from PIL import Image, ImageOps
+
+try:
+    import cv2
+except ImportError:  # ultralytics normally pulls in OpenCV
+    cv2 = None
+
+EXIF_ORIENTATION = 0x0112
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}  # EXIF orientations that rotate the image by 90 degrees
+
+
+def decode_image(data):
+    """Decode encoded image bytes into a BGR numpy array without touching disk.
+
+    Returns an ``HxWx3`` uint8 array in the same channel order ultralytics uses
+    for images it reads from disk. Raises ``ValueError`` if the bytes are not a
+    decodable image.
+    """
+    buffer = np.frombuffer(memoryview(data), dtype=np.uint8)
+    if buffer.size == 0:
+        raise ValueError('Empty image upload')
+
+    if cv2 is not None:
+        image = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError('Could not decode image')
+        return image
+
+    try:
+        with Image.open(io.BytesIO(buffer)) as pil_image:
+            rgb = np.asarray(pil_image.convert('RGB'))
+    except Exception as e:
+        raise ValueError(f'Could not decode image: {e}')
+    return np.ascontiguousarray(rgb[:, :, ::-1])
+
+
+def decode_image_reduced(data, target_size):
+    """Decode an image at roughly ``target_size`` (longer side) instead of full resolution.
+
+    JPEGs use PIL's draft mode, which has libjpeg scale the DCT by 1/2, 1/4 or
+    1/8 while decoding, so a 24 MP photo is never materialised at full size.
+    The smallest scale whose longer side is still at least ``target_size`` is
+    used, so the model (which letterboxes to ``target_size`` anyway) sees the
+    same detail. Other formats, and JPEGs too small to reduce, go through
+    ``decode_image``. Returns the BGR array and the ``(width, height)`` of the
+    full-resolution image, for mapping detections back to it.
+    """
+    try:
+        pil_image = Image.open(io.BytesIO(memoryview(data)))
+    except Exception:
+        pil_image = None
+    if pil_image is None or pil_image.format != 'JPEG' or max(pil_image.size) < 2 * target_size:
+        image = decode_image(data)
+        return image, (image.shape[1], image.shape[0])
+
+    with pil_image:
+        width, height = pil_image.size
+        scale = target_size / max(width, height)
+        try:
+            orientation = pil_image.getexif().get(EXIF_ORIENTATION, 1)
+            pil_image.draft('RGB', (math.ceil(width * scale), math.ceil(height * scale)))
+            # Match cv2.imdecode, which applies the EXIF orientation
+            rgb = np.asarray(ImageOps.exif_transpose(pil_image).convert('RGB'))
+        except Exception as e:
+            raise ValueError(f'Could not decode image: {e}')
+    if orientation in _TRANSPOSED_ORIENTATIONS:
+        width, height = height, width
+    return np.ascontiguousarray(rgb[:, :, ::-1]), (width, height)
+
+
+def image_size(data):
+    """Full-resolution ``(width, height)`` of encoded image bytes as decoded (EXIF orientation applied)
+
+    Only the header is parsed. Returns None if PIL cannot read the image.
+    """
+    try:
+        with Image.open(io.BytesIO(memoryview(data))) as pil_image:
+            width, height = pil_image.size
+            orientation = pil_image.getexif().get(EXIF_ORIENTATION, 1)
+    except Exception:
+        return None
+    return (height, width) if orientation in _TRANSPOSED_ORIENTATIONS else (width, height)
@@ -0,0 +1,177 @@
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Model name accepted by the API -> weights file
+MODEL_WEIGHTS = {
+    'yolo11n': 'yolo11n.pt',
+    'yolo11s': 'yolo11s.pt',
+    'yolo11m': 'yolo11m.pt',
+    'yolo11l': 'yolo11l.pt',
+    'yolo11x': 'yolo11x.pt'
+}
+
+LATENCY_WINDOW = 256  # Recent batches kept per model for latency percentiles
+
+
+def estimate_model_bytes(model, weights):
+    """Approximate resident size of a loaded model from its parameters and buffers"""
+    module = getattr(model, 'model', None)
+    if module is not None and hasattr(module, 'parameters'):
+        tensors = list(module.parameters()) + list(module.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+    # Exported/non-torch models: the weights file is the best available estimate
+    return os.path.getsize(weights) if os.path.exists(weights) else 0
+
+
+class _ModelStats:
+    def __init__(self):
+        self.loads = 0
+        self.evictions = 0
+        self.load_time = 0.0
+        self.batches = 0
+        self.images = 0
+        self.batch_latencies = deque(maxlen=LATENCY_WINDOW)
+        self.image_latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def as_dict(self):
+        batch = np.array(self.batch_latencies) * 1000
+        image = np.array(self.image_latencies) * 1000
+        return {
+            'loads': self.loads,
+            'evictions': self.evictions,
+            'last_load_time': self.load_time,
+            'batches': self.batches,
+            'images': self.images,
+            'batch_latency_ms': {
+                'mean': float(batch.mean()) if batch.size else 0.0,
+                'p50': float(np.percentile(batch, 50)) if batch.size else 0.0,
+                'p95': float(np.percentile(batch, 95)) if batch.size else 0.0
+            },
+            'per_image_latency_ms': float(image.mean()) if image.size else 0.0
+        }
+
+
+class ModelRegistry:
+    """Lazily loaded, memory-bounded set of detection models.
+
+    Models are loaded on first use with ``loader(weights)`` and kept in LRU
+    order. When the estimated resident size of all loaded models exceeds
+    ``memory_budget`` bytes, the least recently used models are evicted (the
+    model just requested is never evicted, even if it alone exceeds the
+    budget).
+    """
+
+    def __init__(self, loader, weights=None, memory_budget=None):
+        self.loader = loader
+        self.weights = dict(weights or MODEL_WEIGHTS)
+        self.memory_budget = memory_budget
+
+        self._models = OrderedDict()  # name -> (model, size_bytes)
+        self._lock = threading.Lock()
+        self._load_locks = {name: threading.Lock() for name in self.weights}
+        self._stats = {name: _ModelStats() for name in self.weights}
+
+    @property
+    def names(self):
+        return list(self.weights)
+
+    def is_resident(self, name):
+        with self._lock:
+            return name in self._models
+
+    def get(self, name):
+        """Return the loaded model for ``name``, loading (and evicting others) if needed"""
+        if name not in self.weights:
+            raise KeyError(f"Unknown model '{name}'")
+
+        with self._lock:
+            entry = self._models.get(name)
+            if entry is not None:
+                self._models.move_to_end(name)
+                return entry[0]
+
+        # One loader per model name; concurrent requests for the same model wait for it
+        with self._load_locks[name]:
+            with self._lock:
+                entry = self._models.get(name)
+                if entry is not None:
+                    return entry[0]
+
+            start = time.perf_counter()
+            model = self.loader(self.weights[name])
+            load_time = time.perf_counter() - start
+            size = estimate_model_bytes(model, self.weights[name])
+            logger.info(f"Loaded model {name} ({size / 1024 / 1024:.1f} MB) in {load_time:.2f}s")
+
+            with self._lock:
+                self._models[name] = (model, size)
+                stats = self._stats[name]
+                stats.loads += 1
+                stats.load_time = load_time
+                self._evict_over_budget(keep=name)
+            return model
+
+    def predict(self, name, images, conf, runner=None, **kwargs):
+        """Run one forward pass of model ``name`` and record its latency
+
+        ``runner`` replaces the in-process call, e.g. to dispatch the batch to
+        an inference worker pool that holds its own copy of the model.
+        """
+        start = time.perf_counter()
+        if runner is not None:
+            results = runner(images, conf, **kwargs)
+        else:
+            results = self.get(name)(images, conf=conf, **kwargs)
+        elapsed = time.perf_counter() - start
+
+        with self._lock:
+            stats = self._stats[name]
+            stats.batches += 1
+            stats.images += len(images)
+            stats.batch_latencies.append(elapsed)
+            stats.image_latencies.append(elapsed / max(len(images), 1))
+        return results
+
+    def resident_sizes(self):
+        """Estimated bytes of each currently loaded model"""
+        with self._lock:
+            return {name: size for name, (_, size) in self._models.items()}
+
+    def stats(self):
+        with self._lock:
+            resident = {name: size for name, (_, size) in self._models.items()}
+            per_model = {
+                name: {
+                    'resident': name in resident,
+                    'memory_mb': resident.get(name, 0) / 1024 / 1024,
+                    **stats.as_dict()
+                }
+                for name, stats in self._stats.items()
+            }
+        return {
+            'resident_models': list(resident),
+            'resident_mb': sum(resident.values()) / 1024 / 1024,
+            'memory_budget_mb': self.memory_budget / 1024 / 1024 if self.memory_budget else None,
+            'models': per_model
+        }
+
+    def _evict_over_budget(self, keep):
+        if not self.memory_budget:
+            return
+        total = sum(size for _, size in self._models.values())
+        for name in list(self._models):
+            if total <= self.memory_budget:
+                break
+            if name == keep:
+                continue
+            _, size = self._models.pop(name)
+            total -= size
+            self._stats[name].evictions += 1
+            logger.info(f"Evicted model {name} to stay within the {self.memory_budget / 1024 / 1024:.0f} MB model budget")
@@ -0,0 +1,83 @@
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ResultWriter:
+    """Bounded background writer that keeps result persistence off the request path.
+
+    Jobs are plain callables run by a small pool of daemon threads. When the
+    queue is full new jobs are dropped (and counted) rather than blocking the
+    request that produced them, unless they are submitted with ``block=True``
+    (bulk work, which should be slowed down by backpressure rather than lose
+    results).
+    """
+
+    def __init__(self, max_queue=256, workers=2):
+        self._queue = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._counters = {'submitted': 0, 'written': 0, 'dropped': 0, 'failed': 0}
+        self._threads = [
+            threading.Thread(target=self._run, name=f'result-writer-{i}', daemon=True)
+            for i in range(max(1, int(workers)))
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, fn, *args, block=False, **kwargs):
+        """Queue a write job; returns False if it was dropped because the queue is full
+
+        With ``block=True`` this waits for room in the queue instead of dropping.
+        """
+        try:
+            self._queue.put((fn, args, kwargs), block=block)
+        except queue.Full:
+            self._count('dropped')
+            logger.warning(f"Result writer queue full ({self._queue.maxsize}), dropping write")
+            return False
+        self._count('submitted')
+        return True
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            'queue_depth': self.queue_depth(),
+            'queue_capacity': self._queue.maxsize,
+            'workers': len(self._threads),
+            **counters
+        }
+
+    def flush(self):
+        """Block until every queued job has been processed"""
+        self._queue.join()
+
+    def close(self, timeout=None):
+        """Finish queued writes and stop the worker threads"""
+        for _ in self._threads:
+            self._queue.put((None, (), {}))
+        for thread in self._threads:
+            thread.join(timeout)
+
+    def _count(self, key):
+        with self._lock:
+            self._counters[key] += 1
+
+    def _run(self):
+        while True:
+            fn, args, kwargs = self._queue.get()
+            try:
+                if fn is None:
+                    return
+                fn(*args, **kwargs)
+                self._count('written')
+            except Exception as e:
+                self._count('failed')
+                logger.error(f"Background result write failed: {e}")
+            finally:
+                self._queue.task_done()
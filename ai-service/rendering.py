@@ -0,0 +1,127 @@
+import hashlib
+import math
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from imaging import decode_image, decode_image_reduced, image_size
+
+try:
+    import cv2
+except ImportError:  # ultralytics normally pulls in OpenCV
+    cv2 = None
+
+RENDER_VERSION = 1  # Part of every ETag; bump when the drawing changes so clients re-fetch
+
+
+def render_etag(name, timestamp, source_size, max_width, quality):
+    """Strong ETag of one rendered variant, derived without rendering it"""
+    key = f'{RENDER_VERSION}|{name}|{timestamp}|{source_size}|{max_width}|{quality}'
+    return hashlib.sha1(key.encode()).hexdigest()[:20]
+
+
+def _decode_for_width(image_bytes, size, max_width):
+    """Decode at reduced size when only ``max_width`` pixels of width are needed"""
+    if max_width is None or size is None:
+        return decode_image(image_bytes)
+    width, height = size
+    return decode_image_reduced(image_bytes, math.ceil(max_width * max(width, height) / width))[0]
+
+
+def _fit_width(image, max_width):
+    height, width = image.shape[:2]
+    if max_width is None or width <= max_width:
+        return image
+    return cv2.resize(image, (max_width, max(1, round(height * max_width / width))), interpolation=cv2.INTER_AREA)
+
+
+def _encode_jpeg(image, quality):
+    ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+    if not ok:
+        raise ValueError('Could not encode image')
+    return encoded.tobytes()
+
+
+def render_detections(image_bytes, json_data, max_width=None, quality=85):
+    """Draw a result's stored detections on its original upload and JPEG-encode it.
+
+    The image is decoded (at reduced size for thumbnails) and shrunk to
+    ``max_width`` before drawing, so boxes and labels stay legible at any
+    size. Detections are in original-image coordinates (``image_size`` in
+    ``json_data`` when recorded, else the upload's size) and are scaled to
+    the output. Uses ultralytics' own plotting, so the output matches what
+    ``Results.save()`` produced.
+    """
+    import torch
+    from ultralytics.engine.results import Results
+
+    size = image_size(image_bytes)
+    decoded = _decode_for_width(image_bytes, size, max_width)
+    if 'image_size' in json_data:
+        # The stored source may be a downsized copy of the image the boxes refer to
+        original_width, original_height = json_data['image_size']['width'], json_data['image_size']['height']
+    else:
+        original_width, original_height = size or (decoded.shape[1], decoded.shape[0])
+    image = _fit_width(decoded, max_width)
+
+    detections = json_data.get('detections', [])
+    scale = np.array([image.shape[1] / original_width, image.shape[0] / original_height] * 2, dtype=np.float32)
+    boxes = np.zeros((len(detections), 6), dtype=np.float32)
+    for row, detection in zip(boxes, detections):
+        bbox = detection['bbox']
+        row[:4] = np.array([bbox['x1'], bbox['y1'], bbox['x2'], bbox['y2']], dtype=np.float32) * scale
+        row[4:] = detection['confidence'], detection['class_id']
+
+    names = {detection['class_id']: detection['class_name'] for detection in detections}
+    result = Results(image, path='', names=names, boxes=torch.from_numpy(boxes))
+    return _encode_jpeg(result.plot(), quality)
+
+
+def resize_rendered(image_bytes, max_width=None, quality=85):
+    """Thumbnail/re-encode an image that already has its detections drawn on it"""
+    decoded = _decode_for_width(image_bytes, image_size(image_bytes), max_width)
+    return _encode_jpeg(_fit_width(decoded, max_width), quality)
+
+
+class RenderCache:
+    """Byte-bounded LRU cache of rendered JPEGs, keyed by ETag"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = int(max_bytes)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is None:
+                self._counters['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters['hits'] += 1
+            return data
+
+    def put(self, key, data):
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= len(self._entries.pop(key))
+            self._entries[key] = data
+            self._bytes += len(data)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+                self._counters['evictions'] += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                **self._counters
+            }
@@ -0,0 +1,388 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+RESULTS_SUFFIX = '_results.json'
+IMAGE_SUFFIX = '_detected.jpg'  # Pre-rendered annotated image (results saved before lazy rendering)
+SOURCE_SUFFIX = '_source'  # Original upload, followed by its extension; annotated on request
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS results (
+    name TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    json_file TEXT NOT NULL,
+    json_size INTEGER NOT NULL,
+    json_offset INTEGER,
+    image_file TEXT,
+    image_size INTEGER,
+    detection_count INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_timestamp ON results (timestamp);
+CREATE TABLE IF NOT EXISTS result_classes (
+    class_name TEXT NOT NULL,
+    name TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (class_name, name)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS result_classes_name ON result_classes (name);
+CREATE TABLE IF NOT EXISTS detections (
+    name TEXT PRIMARY KEY,
+    timestamp TEXT NOT NULL,
+    boxes BLOB NOT NULL,
+    confidence BLOB NOT NULL,
+    class_id BLOB NOT NULL,
+    class_name TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS detections_timestamp ON detections (timestamp);
+CREATE TABLE IF NOT EXISTS hourly_images (
+    hour TEXT PRIMARY KEY,
+    images INTEGER NOT NULL,
+    detections INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS hourly_classes (
+    hour TEXT NOT NULL,
+    class_name TEXT NOT NULL,
+    images INTEGER NOT NULL,
+    detections INTEGER NOT NULL,
+    confidence_sum REAL NOT NULL,
+    PRIMARY KEY (hour, class_name)
+) WITHOUT ROWID;
+'''
+
+SCHEMA_VERSION = 3  # PRAGMA user_version; 2 added the detections table, 3 the hourly aggregates
+HOUR_CHARS = len('YYYY-MM-DDTHH')  # Aggregate buckets are ISO timestamp prefixes
+
+
+class ResultsIndex:
+    """SQLite index of saved detection results.
+
+    Rows are added as results are written, so listing, paginating and
+    filtering never has to scan or stat ``output_dir``. Results are keyed and
+    ordered by their name (``<timestamp>_<image stem>``), newest first, and the
+    last name on a page is the cursor for the next one.
+
+    File locations are stored relative to ``output_dir``. A result whose JSON
+    has been compacted into a segment log has ``json_file`` pointing at the
+    segment and ``json_offset``/``json_size`` locating its record in it.
+
+    Each result's boxes are also kept in the ``detections`` table as packed
+    arrays (float32 ``x1, y1, x2, y2`` and confidence, int16 class id, and
+    newline-joined class names), so bulk exports read typed columns straight
+    from the index instead of re-parsing every result's JSON.
+
+    Hourly per-class aggregates (images, detections, confidence sum) are
+    updated by ``record_detections()`` for every completed detection, whether
+    or not its result is saved, so ``aggregates()`` answers analytics queries
+    from a handful of rows per hour whatever the history size. They are
+    independent of the stored results: removing a day's results keeps its
+    aggregates, and a rebuild only counts stored results into hours that have
+    no aggregates yet (e.g. after upgrading from an index without them).
+
+    ``needs_backfill`` is set when an existing index predates these tables
+    and should be rebuilt.
+    """
+
+    def __init__(self, db_path, output_dir):
+        self.db_path = str(db_path)
+        self.output_dir = Path(output_dir)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        tables = {row[0] for row in self._conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        self.needs_backfill = 'results' in tables and version < SCHEMA_VERSION
+        self._conn.executescript(SCHEMA)
+        if not self.needs_backfill:
+            self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(results)')}
+        if 'json_offset' not in columns:
+            # Indexes created before results could be compacted into segments
+            self._conn.execute('ALTER TABLE results ADD COLUMN json_offset INTEGER')
+
+    def add(self, name, json_data, json_path, image_path=None):
+        """Record a saved result; replaces any previous entry with the same name"""
+        json_size = os.path.getsize(json_path)
+        image_size = os.path.getsize(image_path) if image_path and os.path.exists(image_path) else None
+        self.add_rows([(name, json_data, self._relative(json_path), None, json_size,
+                        self._relative(image_path) if image_size is not None else None, image_size)])
+
+    def add_rows(self, rows):
+        """Insert or replace ``(name, json_data, json_file, json_offset, json_size, image_file, image_size)`` rows"""
+        with self._lock, self._conn:
+            for name, json_data, json_file, json_offset, json_size, image_file, image_size in rows:
+                detections = json_data.get('detections', [])
+                timestamp = json_data.get('timestamp', '')
+                packed = self._pack_detections(detections)
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO results (name, timestamp, json_file, json_size, json_offset, '
+                    'image_file, image_size, detection_count) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                    (name, timestamp, json_file, json_size, json_offset,
+                     image_file, image_size, len(detections))
+                )
+                self._conn.execute('DELETE FROM result_classes WHERE name = ?', (name,))
+                class_counts = Counter(d['class_name'] for d in detections)
+                self._conn.executemany(
+                    'INSERT INTO result_classes VALUES (?, ?, ?)',
+                    [(class_name, name, count) for class_name, count in class_counts.items()]
+                )
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO detections VALUES (?, ?, ?, ?, ?, ?)',
+                    (name, timestamp, *packed)
+                )
+
+    def query(self, cursor=None, limit=100, since=None, until=None, class_name=None):
+        """Return one page of results (newest first) and the cursor for the next page"""
+        where, params = self._filters(since, until, class_name)
+        # With a class filter, walk result_classes in (class_name, name) order instead of the results table
+        order_column = 'c.name' if class_name else 'r.name'
+        if cursor:
+            where.append(f'{order_column} < ?')
+            params.append(cursor)
+
+        sql = ('SELECT r.name, r.timestamp, r.json_file, r.json_size, r.json_offset, r.image_file, r.image_size, '
+               'r.detection_count FROM results r')
+        if class_name:
+            sql += ' JOIN result_classes c ON c.name = r.name'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY {order_column} DESC LIMIT ?'
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        columns = ('name', 'timestamp', 'json_file', 'json_size', 'json_offset', 'image_file', 'image_size', 'detection_count')
+        return [dict(zip(columns, row)) for row in rows[:limit]], next_cursor
+
+    def record_detections(self, timestamp, detections):
+        """Count one image's detections (list format) into the hourly aggregates of ``timestamp``"""
+        _, confidence, _, class_names = self._pack_detections(detections)
+        with self._lock, self._conn:
+            self._aggregate(timestamp, confidence, class_names)
+
+    def count(self, since=None, until=None, class_name=None):
+        where, params = self._filters(since, until, class_name)
+        sql = 'SELECT COUNT(*) FROM results r'
+        if class_name:
+            sql += ' JOIN result_classes c ON c.name = r.name'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def get(self, name):
+        """One result's index row as a dict, or None"""
+        columns = ('name', 'timestamp', 'json_file', 'json_size', 'json_offset', 'image_file', 'image_size', 'detection_count')
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(columns)} FROM results WHERE name = ?", (name,)).fetchone()
+        return dict(zip(columns, row)) if row is not None else None
+
+    def locate(self, name):
+        """``(json_file, json_offset, json_size)`` of a result, or None if it isn't indexed"""
+        with self._lock:
+            return self._conn.execute('SELECT json_file, json_offset, json_size FROM results WHERE name = ?',
+                                      (name,)).fetchone()
+
+    def day_sizes(self):
+        """``[(day, bytes)]`` of indexed JSON and image data per ``YYYYMMDD`` name prefix, oldest first"""
+        with self._lock:
+            return self._conn.execute(
+                'SELECT substr(name, 1, 8) AS day, SUM(json_size) + SUM(COALESCE(image_size, 0)) '
+                'FROM results GROUP BY day ORDER BY day'
+            ).fetchall()
+
+    def remove_day(self, day):
+        """Drop every result whose name starts with ``day`` (``YYYYMMDD``); returns how many
+
+        The day's hourly aggregates are kept.
+        """
+        bounds = (day, str(int(day) + 1))
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM result_classes WHERE name >= ? AND name < ?', bounds)
+            self._conn.execute('DELETE FROM detections WHERE name >= ? AND name < ?', bounds)
+            return self._conn.execute('DELETE FROM results WHERE name >= ? AND name < ?', bounds).rowcount
+
+    def rebuild(self, entries=None, batch_size=1000):
+        """Re-create the index from ``entries`` (rows as for ``add_rows``)
+
+        By default the ``*_results.json`` files directly in ``output_dir`` are
+        scanned. Existing hourly aggregates are kept (they also count
+        detections that were never saved); stored results are only counted
+        into hours that have none.
+        """
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM result_classes')
+            self._conn.execute('DELETE FROM detections')
+            self._conn.execute('DELETE FROM results')
+
+        indexed = 0
+        rows = []
+        for row in (entries if entries is not None else self._scan_flat()):
+            rows.append(row)
+            if len(rows) >= batch_size:
+                self.add_rows(rows)
+                indexed += len(rows)
+                rows = []
+
+        if rows:
+            self.add_rows(rows)
+            indexed += len(rows)
+        with self._lock, self._conn:
+            counted = {row[0] for row in self._conn.execute('SELECT hour FROM hourly_images')}
+            for timestamp, confidence, class_names in self._conn.execute(
+                    'SELECT timestamp, confidence, class_name FROM detections'):
+                if timestamp[:HOUR_CHARS] not in counted:
+                    self._aggregate(timestamp, confidence, class_names)
+            self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+        self.needs_backfill = False
+        logger.info(f"Results index rebuilt: {indexed} results")
+        return indexed
+
+    @staticmethod
+    def _pack_detections(detections):
+        boxes = np.array([[d['bbox']['x1'], d['bbox']['y1'], d['bbox']['x2'], d['bbox']['y2']] for d in detections],
+                         dtype=np.float32).reshape(-1, 4)
+        return (boxes.tobytes(),
+                np.array([d['confidence'] for d in detections], dtype=np.float32).tobytes(),
+                np.array([d['class_id'] for d in detections], dtype=np.int16).tobytes(),
+                '\n'.join(d['class_name'] for d in detections))
+
+    def _aggregate(self, timestamp, confidence, class_names):
+        """Add one image's packed detections to its hour's aggregates"""
+        hour = timestamp[:HOUR_CHARS]
+        if len(hour) != HOUR_CHARS:
+            return
+        names = class_names.split('\n') if class_names else []
+        self._conn.execute(
+            'INSERT INTO hourly_images VALUES (?, ?, ?) ON CONFLICT (hour) DO UPDATE SET '
+            'images = images + excluded.images, detections = detections + excluded.detections',
+            (hour, 1, len(names))
+        )
+        per_class = {}
+        for class_name, value in zip(names, np.frombuffer(confidence, dtype=np.float32).tolist()):
+            totals = per_class.setdefault(class_name, [0, 0.0])
+            totals[0] += 1
+            totals[1] += value
+        self._conn.executemany(
+            'INSERT INTO hourly_classes VALUES (?, ?, ?, ?, ?) ON CONFLICT (hour, class_name) DO UPDATE SET '
+            'images = images + excluded.images, detections = detections + excluded.detections, '
+            'confidence_sum = confidence_sum + excluded.confidence_sum',
+            [(hour, class_name, 1, count, total) for class_name, (count, total) in per_class.items()]
+        )
+
+    def aggregates(self, since=None, until=None, class_name=None, bucket='hour'):
+        """Image and per-class totals for each ``bucket`` ('hour' or 'day') in ``[since, until)``
+
+        ``since``/``until`` are ISO timestamps, truncated to the hour. Returns
+        ``(images, classes)``: ``{bucket: (images, detections)}`` and
+        ``{bucket: {class_name: (images, detections, confidence_sum)}}``,
+        read from the aggregate tables only.
+        """
+        width = HOUR_CHARS if bucket == 'hour' else len('YYYY-MM-DD')
+        where, params = [], []
+        if since:
+            where.append('hour >= ?')
+            params.append(since[:HOUR_CHARS])
+        if until:
+            where.append('hour < ?')
+            params.append(until[:HOUR_CHARS])
+        class_where = where + ['class_name = ?'] if class_name else where
+        class_params = params + [class_name] if class_name else params
+
+        image_sql = f'SELECT substr(hour, 1, {width}) AS bucket, SUM(images), SUM(detections) FROM hourly_images'
+        class_sql = (f'SELECT substr(hour, 1, {width}) AS bucket, class_name, SUM(images), SUM(detections), '
+                     'SUM(confidence_sum) FROM hourly_classes')
+        if where:
+            image_sql += ' WHERE ' + ' AND '.join(where)
+        if class_where:
+            class_sql += ' WHERE ' + ' AND '.join(class_where)
+        image_sql += ' GROUP BY bucket ORDER BY bucket'
+        class_sql += ' GROUP BY bucket, class_name ORDER BY bucket, class_name'
+
+        with self._lock:
+            image_rows = self._conn.execute(image_sql, params).fetchall()
+            class_rows = self._conn.execute(class_sql, class_params).fetchall()
+        classes = {}
+        for key, name, images, detections, confidence_sum in class_rows:
+            if detections:
+                classes.setdefault(key, {})[name] = (images, detections, confidence_sum)
+        return {key: (images, detections) for key, images, detections in image_rows if images}, classes
+
+    def iter_detections(self, since=None, until=None, class_name=None, chunk_size=4096):
+        """Yield ``(name, timestamp, boxes, confidence, class_id, class_name)`` rows of packed detections
+
+        Rows come in timestamp order, ``chunk_size`` results at a time. With
+        ``class_name`` only results containing that class are returned (their
+        other boxes still need filtering out). Reads through its own
+        connection so a long export never holds the index lock (WAL lets it
+        run alongside writers).
+        """
+        where, params = [], []
+        if since:
+            where.append('timestamp >= ?')
+            params.append(since)
+        if until:
+            where.append('timestamp < ?')
+            params.append(until)
+        if class_name:
+            where.append('name IN (SELECT name FROM result_classes WHERE class_name = ?)')
+            params.append(class_name)
+        sql = 'SELECT name, timestamp, boxes, confidence, class_id, class_name FROM detections'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += ' ORDER BY timestamp, name'
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            conn.close()
+
+    def _scan_flat(self):
+        for entry in os.scandir(self.output_dir):
+            if not entry.name.endswith(RESULTS_SUFFIX) or not entry.is_file():
+                continue
+            try:
+                with open(entry.path, 'r') as f:
+                    json_data = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable result file {entry.name}: {e}")
+                continue
+
+            name = entry.name[:-len(RESULTS_SUFFIX)]
+            image_path = self.output_dir / f'{name}{IMAGE_SUFFIX}'
+            image_size = image_path.stat().st_size if image_path.exists() else None
+            yield (name, json_data, entry.name, None, entry.stat().st_size,
+                   image_path.name if image_size is not None else None, image_size)
+
+    def _relative(self, path):
+        return os.path.relpath(path, self.output_dir)
+
+    @staticmethod
+    def _filters(since, until, class_name):
+        where, params = [], []
+        if since:
+            where.append('r.timestamp >= ?')
+            params.append(since)
+        if until:
+            where.append('r.timestamp < ?')
+            params.append(until)
+        if class_name:
+            where.append('c.class_name = ?')
+            params.append(class_name)
+        return where, params
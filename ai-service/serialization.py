@@ -0,0 +1,135 @@
+import json
+import struct
+from collections import namedtuple
+
+import numpy as np
+
+RESPONSE_FORMATS = ('list', 'columnar')
+
+# Packed binary /detect responses, negotiated with ``Accept: application/vnd.yolo.detections``:
+# a 16-byte header (magic, version, reserved, metadata length, box count), the rest of the
+# response as compact UTF-8 JSON padded to 4 bytes, then little-endian float32 boxes
+# (n x 4, x1 y1 x2 y2), float32 confidences and uint16 class ids. Class names are in the
+# metadata's ``class_names`` table, keyed by class id. ui-service/wire.py mirrors this; keep them in sync.
+BINARY_CONTENT_TYPE = 'application/vnd.yolo.detections'
+BINARY_MAGIC = b'YDET'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHII')
+
+BoxArrays = namedtuple('BoxArrays', ['xyxy', 'conf', 'cls'])
+
+
+def box_arrays(result, scale=None):
+    """Move a result's boxes to numpy in one bulk transfer.
+
+    ``Boxes.data`` holds ``x1, y1, x2, y2, [track_id,] conf, cls`` per row, so a
+    single ``.cpu().numpy()`` replaces the per-box tensor indexing and
+    ``.item()`` syncs. ``scale`` is an optional ``(x, y)`` factor mapping the
+    boxes from a reduced-size decode back to the original image.
+    """
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return BoxArrays(np.zeros((0, 4), dtype=np.float32),
+                         np.zeros(0, dtype=np.float32),
+                         np.zeros(0, dtype=np.int64))
+
+    data = boxes.data
+    if hasattr(data, 'cpu'):
+        data = data.cpu().numpy()
+    xyxy = data[:, :4]
+    if scale is not None:
+        xyxy = xyxy * np.array([scale[0], scale[1], scale[0], scale[1]], dtype=xyxy.dtype)
+    return BoxArrays(xyxy, data[:, -2], data[:, -1].astype(np.int64))
+
+
+def detections_from_arrays(arrays, names):
+    """Build the list-of-dicts detection format from bulk box arrays"""
+    return [
+        {
+            'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+            'confidence': conf,
+            'class_id': cls,
+            'class_name': names[cls]
+        }
+        for (x1, y1, x2, y2), conf, cls in zip(arrays.xyxy.tolist(), arrays.conf.tolist(), arrays.cls.tolist())
+    ]
+
+
+def columnar_from_arrays(arrays, names):
+    """Build the compact columnar format: parallel arrays, one entry per box"""
+    class_ids = arrays.cls.tolist()
+    return {
+        'bbox': arrays.xyxy.tolist(),
+        'confidence': arrays.conf.tolist(),
+        'class_id': class_ids,
+        'class_name': [names[cls] for cls in class_ids]
+    }
+
+
+def columnar_from_detections(detections):
+    """Convert list-format detections (e.g. from the cache) to the columnar format"""
+    return {
+        'bbox': [[d['bbox']['x1'], d['bbox']['y1'], d['bbox']['x2'], d['bbox']['y2']] for d in detections],
+        'confidence': [d['confidence'] for d in detections],
+        'class_id': [d['class_id'] for d in detections],
+        'class_name': [d['class_name'] for d in detections]
+    }
+
+
+def detections_from_columnar(columns):
+    """Convert columnar detections back to the list-of-dicts format"""
+    return [
+        {
+            'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+            'confidence': conf,
+            'class_id': cls,
+            'class_name': name
+        }
+        for (x1, y1, x2, y2), conf, cls, name in zip(
+            columns['bbox'], columns['confidence'], columns['class_id'], columns['class_name'])
+    ]
+
+
+def encode_binary(response):
+    """Pack a /detect response whose ``detections`` are columnar into the binary format"""
+    columns = response['detections']
+    metadata = {key: value for key, value in response.items() if key not in ('detections', 'format')}
+    metadata['class_names'] = {str(cls): name for cls, name in zip(columns['class_id'], columns['class_name'])}
+    encoded = json.dumps(metadata, separators=(',', ':')).encode()
+    encoded += b' ' * (-len(encoded) % 4)
+    count = len(columns['confidence'])
+    return b''.join((
+        BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(encoded), count),
+        encoded,
+        np.asarray(columns['bbox'], dtype='<f4').reshape(count, 4).tobytes(),
+        np.asarray(columns['confidence'], dtype='<f4').tobytes(),
+        np.asarray(columns['class_id'], dtype='<u2').tobytes()
+    ))
+
+
+def decode_binary(data):
+    """Unpack a binary /detect response into a dict with columnar numpy ``detections``
+
+    Raises ValueError if ``data`` is not in the binary format.
+    """
+    if len(data) < BINARY_HEADER.size:
+        raise ValueError('Truncated binary detections')
+    magic, version, _, metadata_size, count = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError('Not a binary detections payload (or an unsupported version)')
+    offset = BINARY_HEADER.size + metadata_size
+    if len(data) != offset + count * 22:
+        raise ValueError('Truncated binary detections')
+    response = json.loads(bytes(data[BINARY_HEADER.size:offset]))
+    class_names = response.pop('class_names')
+    bbox = np.frombuffer(data, dtype='<f4', count=count * 4, offset=offset).reshape(count, 4)
+    confidence = np.frombuffer(data, dtype='<f4', count=count, offset=offset + count * 16)
+    class_id = np.frombuffer(data, dtype='<u2', count=count, offset=offset + count * 20)
+    response['detections'] = {
+        'bbox': bbox,
+        'confidence': confidence,
+        'class_id': class_id,
+        'class_name': [class_names[str(cls)] for cls in class_id.tolist()]
+    }
+    response['format'] = 'columnar'
+    return response
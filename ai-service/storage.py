@@ -0,0 +1,310 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import struct
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from pathlib import Path
+
+from results_index import RESULTS_SUFFIX, IMAGE_SUFFIX, SOURCE_SUFFIX
+from streaming import IMAGE_EXTENSIONS
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = 'results'  # Sharded results live under OUTPUT_DIR/results/YYYY/MM/DD/<hash>/
+SEGMENT_FILE = 'results.seg'  # Compacted JSON of one day, next to its hash shards
+HASH_SHARD_CHARS = 2  # Hex digits of the name hash per shard, i.e. up to 256 directories per day
+
+# Segment record: name length, compressed JSON length, then the name and the zlib-compressed JSON
+_RECORD_HEADER = struct.Struct('<HI')
+
+
+def result_day(name):
+    """``YYYYMMDD`` day a result belongs to (names start with their timestamp), or None"""
+    day = name[:8]
+    return day if len(day) == 8 and day.isdigit() else None
+
+
+class ResultStore:
+    """Date/hash-sharded storage for detection results under ``output_dir``.
+
+    New results are written as compact JSON (plus the original upload) into
+    ``results/YYYY/MM/DD/<hh>/``, where ``hh`` comes from a hash of the result
+    name, so no directory grows without bound. ``maintain()`` - run in the
+    background - moves files left in the old flat layout into their shards,
+    packs the JSON of days older than ``compact_after_days`` into one
+    compressed segment log per day, and enforces retention: whole days older
+    than ``retention_days`` or, oldest first, beyond ``max_bytes`` in total
+    are deleted (today is always kept). ``index`` is updated as results move,
+    and ``read_json()`` finds a result wherever it currently lives.
+    """
+
+    def __init__(self, output_dir, index, retention_days=0, max_bytes=0, compact_after_days=1):
+        self.output_dir = Path(output_dir)
+        self.root = self.output_dir / RESULTS_DIR
+        self.index = index
+        self.retention_days = int(retention_days)
+        self.max_bytes = int(max_bytes)
+        self.compact_after_days = max(1, int(compact_after_days))
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()  # One maintenance run at a time
+        self._stats_lock = threading.Lock()
+        self._counters = {'runs': 0, 'migrated': 0, 'compacted': 0, 'deleted_days': 0, 'deleted_results': 0}
+        self._last_run = None
+
+    def shard_dir(self, name):
+        day = result_day(name)
+        digest = hashlib.md5(name.encode()).hexdigest()[:HASH_SHARD_CHARS]
+        if day is None:
+            return self.root / 'undated' / digest
+        return self.root / day[:4] / day[4:6] / day[6:] / digest
+
+    def json_path(self, name):
+        """Where a new result's JSON is written (directories are not created)"""
+        return str(self.shard_dir(name) / f'{name}{RESULTS_SUFFIX}')
+
+    def source_path(self, name, upload_filename):
+        """Where a new result's original upload is kept, with the upload's extension if it is an image one"""
+        ext = os.path.splitext(upload_filename or '')[1].lower()
+        return str(self.shard_dir(name) / f"{name}{SOURCE_SUFFIX}{ext if ext in IMAGE_EXTENSIONS else '.bin'}")
+
+    def image_path(self, name, directory=None):
+        """Existing annotated image or source upload of a result in ``directory`` (its shard), or None"""
+        directory = Path(directory) if directory is not None else self.shard_dir(name)
+        for suffix in [IMAGE_SUFFIX] + [f'{SOURCE_SUFFIX}{ext}' for ext in sorted(IMAGE_EXTENSIONS) + ['.bin']]:
+            path = directory / f'{name}{suffix}'
+            if path.exists():
+                return path
+        return None
+
+    @staticmethod
+    def write_json(json_data, json_path):
+        Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+        with open(json_path, 'w') as f:
+            json.dump(json_data, f, separators=(',', ':'))
+
+    def read_json(self, name):
+        """Load a result's JSON from its shard, segment or legacy flat file; None if it doesn't exist"""
+        location = self.index.locate(name)
+        if location is not None:
+            json_file, json_offset, json_size = location
+            try:
+                if json_offset is not None:
+                    return self._read_record(self.output_dir / json_file, json_offset, json_size)
+                with open(self.output_dir / json_file, 'r') as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                pass  # Moved by a concurrent maintenance run, or written but not yet re-indexed
+
+        for path in (self.shard_dir(name) / f'{name}{RESULTS_SUFFIX}', self.output_dir / f'{name}{RESULTS_SUFFIX}'):
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except FileNotFoundError:
+                continue
+        return None
+
+    def scan(self):
+        """Yield index rows for every stored result (for ``ResultsIndex.rebuild``)"""
+        yield from self._scan_legacy()
+        for day_dir in sorted(self._day_dirs()):
+            segment = day_dir / SEGMENT_FILE
+            if segment.exists():
+                for name, offset, size, json_data in self._read_segment(segment):
+                    yield self._row(name, json_data, segment, offset, size)
+            for path, name in self._loose_files(day_dir):
+                json_data = self._load(path)
+                if json_data is not None:
+                    yield self._row(name, json_data, path, None, path.stat().st_size)
+
+    def maintain(self, today=None):
+        """Migrate flat files, compact old days and apply retention; returns what was done"""
+        today = today or date.today()
+        with self._lock:
+            start = time.perf_counter()
+            report = {
+                'migrated': self._migrate_legacy(),
+                'compacted': self._compact(today),
+                **self._apply_retention(today)
+            }
+            report['duration_seconds'] = time.perf_counter() - start
+            report['finished_at'] = time.time()
+        with self._stats_lock:
+            self._counters['runs'] += 1
+            for key in ('migrated', 'compacted', 'deleted_days', 'deleted_results'):
+                self._counters[key] += report[key]
+            self._last_run = report
+        if report['migrated'] or report['compacted'] or report['deleted_days']:
+            logger.info(f"Result storage maintenance: {report['migrated']} migrated, {report['compacted']} compacted, "
+                        f"{report['deleted_days']} days ({report['deleted_results']} results) deleted "
+                        f"in {report['duration_seconds']:.2f}s")
+        return report
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'root': str(self.root),
+                'retention_days': self.retention_days,
+                'max_bytes': self.max_bytes,
+                'compact_after_days': self.compact_after_days,
+                **self._counters,
+                'last_run': self._last_run
+            }
+
+    def _day_dirs(self):
+        for year in self._subdirs(self.root):
+            for month in self._subdirs(year):
+                for day in self._subdirs(month):
+                    yield day
+
+    @staticmethod
+    def _subdirs(path):
+        return [Path(entry.path) for entry in os.scandir(path) if entry.is_dir() and entry.name.isdigit()]
+
+    @staticmethod
+    def _loose_files(day_dir):
+        for shard in os.scandir(day_dir):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.endswith(RESULTS_SUFFIX) and entry.is_file():
+                    yield Path(entry.path), entry.name[:-len(RESULTS_SUFFIX)]
+
+    @staticmethod
+    def _load(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping unreadable result file {path}: {e}")
+            return None
+
+    def _row(self, name, json_data, json_path, json_offset, json_size):
+        image_path = self.image_path(name)
+        image_size = image_path.stat().st_size if image_path is not None else None
+        return (name, json_data, os.path.relpath(json_path, self.output_dir), json_offset, json_size,
+                os.path.relpath(image_path, self.output_dir) if image_path is not None else None, image_size)
+
+    def _scan_legacy(self):
+        for entry in os.scandir(self.output_dir):
+            if entry.name.endswith(RESULTS_SUFFIX) and entry.is_file():
+                name = entry.name[:-len(RESULTS_SUFFIX)]
+                json_data = self._load(entry.path)
+                if json_data is not None:
+                    image_path = self.image_path(name, self.output_dir)
+                    yield (name, json_data, entry.name, None, entry.stat().st_size,
+                           image_path.name if image_path is not None else None,
+                           image_path.stat().st_size if image_path is not None else None)
+
+    def _migrate_legacy(self):
+        """Move results written in the old flat OUTPUT_DIR layout into their shards"""
+        rows = []
+        for name, json_data, json_file, _, json_size, image_file, _ in self._scan_legacy():
+            json_path = self.json_path(name)
+            Path(json_path).parent.mkdir(parents=True, exist_ok=True)
+            if image_file is not None:
+                os.replace(self.output_dir / image_file, Path(json_path).parent / image_file)
+            os.replace(self.output_dir / json_file, json_path)
+            rows.append(self._row(name, json_data, Path(json_path), None, json_size))
+        if rows:
+            self.index.add_rows(rows)
+        return len(rows)
+
+    def _compact(self, today):
+        """Append the loose JSON files of each old enough day to that day's segment log"""
+        cutoff = (today - timedelta(days=self.compact_after_days)).strftime('%Y%m%d')
+        compacted = 0
+        for day_dir in sorted(self._day_dirs()):
+            day = ''.join(day_dir.parts[-3:])
+            if day >= cutoff:
+                continue
+            loose = [(path, name, self._load(path)) for path, name in self._loose_files(day_dir)]
+            loose = [(path, name, json_data) for path, name, json_data in loose if json_data is not None]
+            if not loose:
+                continue
+
+            segment = day_dir / SEGMENT_FILE
+            rows = [self._row(name, json_data, segment, offset, size)
+                    for (_, name, json_data), (offset, size) in zip(loose, self._append_records(segment, loose))]
+            self.index.add_rows(rows)
+            for path, _, _ in loose:
+                path.unlink()
+            compacted += len(loose)
+        return compacted
+
+    @staticmethod
+    def _append_records(segment, loose):
+        """Write ``segment`` plus the new records to a temp file and swap it in atomically
+
+        Existing records keep their offsets, so index entries pointing at them
+        stay valid. Returns ``(offset, size)`` of each new record's JSON blob.
+        """
+        tmp_path = segment.with_suffix('.tmp')
+        locations = []
+        with open(tmp_path, 'wb') as out:
+            if segment.exists():
+                with open(segment, 'rb') as existing:
+                    shutil.copyfileobj(existing, out, 1024 * 1024)
+            for _, name, json_data in loose:
+                encoded_name = name.encode()
+                blob = zlib.compress(json.dumps(json_data, separators=(',', ':')).encode(), 6)
+                out.write(_RECORD_HEADER.pack(len(encoded_name), len(blob)) + encoded_name)
+                locations.append((out.tell(), len(blob)))
+                out.write(blob)
+            out.flush()
+            os.fsync(out.fileno())
+        os.replace(tmp_path, segment)
+        return locations
+
+    @staticmethod
+    def _read_record(segment, offset, size):
+        with open(segment, 'rb') as f:
+            f.seek(offset)
+            return json.loads(zlib.decompress(f.read(size)))
+
+    @staticmethod
+    def _read_segment(segment):
+        """Yield ``(name, offset, size, json_data)`` for each record; stops at a truncated tail"""
+        with open(segment, 'rb') as f:
+            while True:
+                header = f.read(_RECORD_HEADER.size)
+                if len(header) < _RECORD_HEADER.size:
+                    return
+                name_length, size = _RECORD_HEADER.unpack(header)
+                name = f.read(name_length).decode()
+                offset = f.tell()
+                blob = f.read(size)
+                if len(blob) < size:
+                    logger.warning(f"Truncated record {name} at the end of {segment}")
+                    return
+                yield name, offset, size, json.loads(zlib.decompress(blob))
+
+    def _apply_retention(self, today):
+        """Delete whole days past the age limit, then the oldest days beyond the size budget"""
+        keep_from = (today - timedelta(days=self.retention_days)).strftime('%Y%m%d') if self.retention_days > 0 else None
+        today_key = today.strftime('%Y%m%d')
+        day_sizes = [(day, size) for day, size in self.index.day_sizes() if result_day(day or '') is not None]
+        total = sum(size for _, size in day_sizes)
+
+        deleted_days = deleted_results = 0
+        for day, size in day_sizes:
+            expired = keep_from is not None and day < keep_from
+            over_budget = self.max_bytes > 0 and total > self.max_bytes
+            if day >= today_key or not (expired or over_budget):
+                break
+            deleted_results += self.index.remove_day(day)
+            day_dir = self.root / day[:4] / day[4:6] / day[6:]
+            shutil.rmtree(day_dir, ignore_errors=True)
+            for parent in (day_dir.parent, day_dir.parent.parent):
+                try:
+                    parent.rmdir()  # Only succeeds once the month/year is empty
+                except OSError:
+                    break
+            total -= size
+            deleted_days += 1
+        return {'deleted_days': deleted_days, 'deleted_results': deleted_results, 'stored_bytes': total}
@@ -0,0 +1,207 @@
+import logging
+import os
+import queue
+import tarfile
+import threading
+import zipfile
+from collections import deque
+from concurrent.futures import Future
+
+from imaging import decode_image
+
+try:
+    import cv2
+except ImportError:  # ultralytics normally pulls in OpenCV
+    cv2 = None
+
+logger = logging.getLogger(__name__)
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp', '.tif', '.tiff'}
+
+_DONE = object()
+
+
+class _ProducerError:
+    """Carries an exception raised in the producer thread over to the consumer"""
+
+    def __init__(self, error):
+        self.error = error
+
+
+def prefetch(iterator, max_queue):
+    """Run ``iterator`` in a background thread, buffering at most ``max_queue`` items.
+
+    This is the producer half of the streaming pipeline: decoding runs ahead
+    of inference but can never hold more than ``max_queue`` decoded items, so
+    memory stays bounded regardless of input length. Closing the returned
+    generator stops the producer.
+    """
+    buffer = queue.Queue(maxsize=max(1, int(max_queue)))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterator:
+                if not put(item):
+                    return
+        except Exception as e:
+            put(_ProducerError(e))
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=produce, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _ProducerError):
+                raise item.error
+            yield item
+    finally:
+        stop.set()
+
+
+def _outcome(future):
+    try:
+        return future.result()
+    except Exception as e:
+        return e
+
+
+def ordered_inference(items, submit, window):
+    """Submit ``(key, image)`` items for inference and yield ``(key, result)`` in input order.
+
+    At most ``window`` submissions are in flight at once, which lets the batch
+    scheduler group consecutive items into shared forward passes while keeping
+    the number of frames held in memory bounded. Failures are per item: an
+    ``image`` that is an exception (e.g. a decode error) or an inference error
+    is yielded in place of that item's result.
+    """
+    pending = deque()
+    for key, image in items:
+        if isinstance(image, Exception):
+            future = Future()
+            future.set_exception(image)
+        else:
+            future = submit(image)
+        pending.append((key, future))
+        if len(pending) >= window:
+            key, future = pending.popleft()
+            yield key, _outcome(future)
+    while pending:
+        key, future = pending.popleft()
+        yield key, _outcome(future)
+
+
+def iter_video_frames(path, stride=1):
+    """Yield ``((frame_index, timestamp_seconds), frame)`` for every ``stride``-th frame of a video file"""
+    if cv2 is None:
+        raise RuntimeError('OpenCV is required for video decoding')
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise ValueError('Could not open video')
+    try:
+        index = 0
+        while True:
+            # grab() skips the decode cost for frames the stride drops
+            if not capture.grab():
+                return
+            if index % stride == 0:
+                ok, frame = capture.retrieve()
+                if not ok:
+                    return
+                timestamp = capture.get(cv2.CAP_PROP_POS_MSEC) / 1000
+                yield (index, timestamp), frame
+            index += 1
+    finally:
+        capture.release()
+
+
+def iter_uploaded_frames(frame_streams, stride=1):
+    """Yield ``((frame_index, None), frame)`` for every ``stride``-th uploaded frame image
+
+    ``frame_streams`` are the uploads' file objects. Each is only read when
+    the producer reaches it and is closed right after, so a long frame
+    sequence is never held in memory at once. A frame that cannot be decoded
+    is yielded as its ``ValueError`` so it only fails that frame.
+    """
+    for index, stream in enumerate(frame_streams):
+        try:
+            data = stream.read() if index % stride == 0 else None
+        finally:
+            stream.close()
+        if data is not None:
+            try:
+                yield (index, None), decode_image(data)
+            except ValueError as e:
+                yield (index, None), e
+
+
+def iter_uploaded_images(named_streams):
+    """Yield ``(name, bytes)`` for uploaded ``(name, file object)`` pairs, reading each only when reached
+
+    Each stream is closed once read, so a large multi-file batch is never
+    held in memory at once.
+    """
+    for name, stream in named_streams:
+        try:
+            data = stream.read()
+        finally:
+            stream.close()
+        yield name, data
+
+
+def iter_decoded_images(named_payloads):
+    """Decode ``(name, bytes)`` pairs, yielding ``((index, name, bytes), image_or_error)``
+
+    The encoded bytes travel along in the key so they can be persisted as the
+    result's source image without re-encoding it.
+    """
+    for index, (name, data) in enumerate(named_payloads):
+        try:
+            yield (index, name, data), decode_image(data)
+        except ValueError as e:
+            yield (index, name, data), e
+
+
+def _is_image_member(name):
+    base = os.path.basename(name)
+    return (not base.startswith('.') and '__MACOSX/' not in name
+            and os.path.splitext(base)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def iter_archive_images(fileobj):
+    """Yield ``(name, bytes)`` for each image in a zip or tar archive, one member at a time.
+
+    Members are read straight from the archive stream into memory; nothing is
+    extracted to disk. Tar archives (optionally compressed) are read in
+    streaming mode so they never need to be seekable.
+    """
+    if zipfile.is_zipfile(fileobj):
+        fileobj.seek(0)
+        with zipfile.ZipFile(fileobj) as archive:
+            for info in archive.infolist():
+                if not info.is_dir() and _is_image_member(info.filename):
+                    yield info.filename, archive.read(info)
+        return
+
+    fileobj.seek(0)
+    try:
+        archive = tarfile.open(fileobj=fileobj, mode='r|*')
+    except tarfile.TarError:
+        raise ValueError('Archive must be a zip or tar file')
+    with archive:
+        for member in archive:
+            if member.isfile() and _is_image_member(member.name):
+                yield member.name, archive.extractfile(member).read()
@@ -0,0 +1,106 @@
+import time
+
+import numpy as np
+
+from streaming import ordered_inference
+
+MAX_DETECTIONS = 1000  # Boxes kept per image after cross-tile NMS
+
+
+def _starts(length, tile, stride):
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, stride))
+    starts.append(length - tile)  # Last tile sits flush with the edge instead of running off it
+    return starts
+
+
+def tile_windows(width, height, tile_size, overlap):
+    """Overlapping ``(x0, y0, x1, y1)`` windows covering a ``width`` x ``height`` image.
+
+    ``overlap`` is the fraction of ``tile_size`` shared by neighbouring tiles,
+    so objects cut by one tile's border are whole in the next. Images smaller
+    than a tile along an axis get a single window spanning that axis.
+    """
+    stride = max(1, int(tile_size * (1 - overlap)))
+    return [
+        (x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+        for y0 in _starts(height, tile_size, stride)
+        for x0 in _starts(width, tile_size, stride)
+    ]
+
+
+def tile_views(image, windows):
+    """Zero-copy views of ``image`` for each window"""
+    return [image[y0:y1, x0:x1] for x0, y0, x1, y1 in windows]
+
+
+def merge_tile_detections(tile_boxes, windows, iou_threshold=0.5, max_det=MAX_DETECTIONS):
+    """Map per-tile detections back to full-image coordinates and merge them.
+
+    ``tile_boxes`` holds one ``N x 6`` (x1, y1, x2, y2, conf, cls) array per
+    window (a window of ``None`` means the boxes are already in full-image
+    coordinates, e.g. from a whole-image pass). Duplicates of the same object
+    found by overlapping tiles are removed with class-aware NMS. Returns an
+    ``M x 6`` float32 array sorted by confidence.
+    """
+    import torch
+    from torchvision.ops import batched_nms
+
+    shifted = []
+    for boxes, window in zip(tile_boxes, windows):
+        if len(boxes) == 0:
+            continue
+        boxes = np.array(boxes, dtype=np.float32)
+        if window is not None:
+            boxes[:, [0, 2]] += window[0]
+            boxes[:, [1, 3]] += window[1]
+        shifted.append(boxes)
+    if not shifted:
+        return np.zeros((0, 6), dtype=np.float32)
+
+    merged = torch.from_numpy(np.concatenate(shifted))
+    keep = batched_nms(merged[:, :4], merged[:, 4], merged[:, 5].long(), iou_threshold)[:max_det]
+    return merged[keep].numpy()
+
+
+def detect_tiled(image, submit, tile_size, overlap, window=8, iou_threshold=0.5, full_image=True):
+    """Detect objects in a large image tile by tile and merge them into one result.
+
+    Each tile is a zero-copy view passed to ``submit(image)`` (a function
+    returning a Future of one ``Results``, e.g. ``BatchScheduler.submit``)
+    with at most ``window`` tiles in flight, so the tiles share forward
+    passes. With ``full_image`` the whole image is also run once (at the
+    model's input size) to catch objects larger than a tile. Returns the
+    merged ``Results`` in full-image coordinates and the number of
+    inferences run.
+    """
+    import torch
+    from ultralytics.engine.results import Results
+
+    height, width = image.shape[:2]
+    windows = tile_windows(width, height, tile_size, overlap)
+    items = list(zip(windows, tile_views(image, windows)))
+    if full_image and len(windows) > 1:
+        items.append((None, image))
+
+    outputs = []
+    for window_box, result in ordered_inference(items, submit, window):
+        if isinstance(result, Exception):
+            raise result
+        outputs.append((window_box, result))
+
+    merge_start = time.perf_counter()
+    boxes = merge_tile_detections([result.boxes.data.cpu().numpy() for _, result in outputs],
+                                  [window_box for window_box, _ in outputs], iou_threshold)
+    merge_ms = (time.perf_counter() - merge_start) * 1000
+
+    merged = Results(image, path='', names=outputs[0][1].names, boxes=torch.from_numpy(boxes))
+    speeds = [result.speed or {} for _, result in outputs]
+    merged.speed = {
+        'queue': max(speed.get('queue', 0.0) for speed in speeds),
+        'preprocess': sum(speed.get('preprocess', 0.0) for speed in speeds),
+        'inference': sum(speed.get('inference', 0.0) for speed in speeds),
+        'postprocess': sum(speed.get('postprocess', 0.0) for speed in speeds) + merge_ms
+    }
+    return merged, len(items)
@@ -0,0 +1,234 @@
+import itertools
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+import numpy as np
+
+from admission import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+
+def partition_cores(num_workers, threads_per_worker):
+    """Split the CPUs this process may use into one contiguous slice per worker.
+
+    Returns None for a worker when there aren't enough CPUs to give it its own
+    slice, in which case it is left unpinned.
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        cpus = sorted(os.sched_getaffinity(0))
+    else:
+        cpus = list(range(os.cpu_count() or 1))
+    slices = []
+    for i in range(num_workers):
+        cores = cpus[i * threads_per_worker:(i + 1) * threads_per_worker]
+        slices.append(cores if len(cores) == threads_per_worker else None)
+    return slices
+
+
+def _worker_main(worker_id, model, cores, threads, tasks, results):
+    """Inference loop run in each forked worker process"""
+    import torch
+
+    if cores and hasattr(os, 'sched_setaffinity'):
+        os.sched_setaffinity(0, cores)
+    torch.set_num_threads(threads)
+    logger.info(f"Inference worker {worker_id} started (pid {os.getpid()}, {threads} threads, cores {cores or 'unpinned'})")
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            return
+        task_id, images, conf, kwargs = task
+        try:
+            outputs = model(images, conf=conf, verbose=False, **kwargs)
+            # Ship back only the box tensors; the parent still holds the images to rebuild Results
+            payload = [(result.boxes.data.cpu().numpy(), result.speed) for result in outputs]
+            results.put((task_id, worker_id, payload, None))
+        except Exception as e:
+            results.put((task_id, worker_id, None, f'{type(e).__name__}: {e}'))
+
+
+class InferenceWorkerPool:
+    """Pool of forked inference processes sharing one loaded model.
+
+    The model is loaded (and its predictor set up) in the parent, then the
+    workers are forked so its weights are shared copy-on-write instead of
+    being loaded N times. Each worker gets ``threads_per_worker`` torch
+    intra-op threads, pinned to its own slice of cores where possible. Each
+    batch goes to the worker with the fewest batches in flight, on that
+    worker's own task queue, so the pool always knows which batches a worker
+    holds.
+
+    A monitor thread watches the worker processes: when one dies (OOM kill,
+    segfault) the batches it held fail with a RuntimeError and a replacement
+    is forked. ``predict`` never waits forever either: it gives up at the
+    caller's deadline, or after ``task_timeout`` seconds without one.
+
+    The parent must not have run multi-threaded torch ops before forking
+    (GNU OpenMP is not fork-safe), so the pool limits the parent to one thread
+    while it warms up the predictor and forks. Replacements are forked later,
+    from a parent that may have run other models in-process by then; should
+    one hang in OpenMP, the timeouts above still bound every request.
+    """
+
+    def __init__(self, model, num_workers, threads_per_worker, warmup_image=None, pin_cores=True, task_timeout=120):
+        import torch
+
+        self.model = model
+        self.num_workers = int(num_workers)
+        self.threads_per_worker = int(threads_per_worker)
+        self.task_timeout = float(task_timeout)
+
+        parent_threads = torch.get_num_threads()
+        torch.set_num_threads(1)
+        if warmup_image is not None:
+            # Set up (and fuse) the predictor once so every worker inherits it
+            model([warmup_image], verbose=False)
+
+        self._context = multiprocessing.get_context('fork')
+        self._results = self._context.Queue()
+        self._pending = {}  # task_id -> (future, images, worker_id)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._completed = [0] * self.num_workers
+        self._restarts = 0
+        self._closing = False
+
+        self._slices = partition_cores(self.num_workers, self.threads_per_worker) if pin_cores else [None] * self.num_workers
+        self._queues = [None] * self.num_workers
+        self._processes = [None] * self.num_workers
+        for worker_id in range(self.num_workers):
+            self._spawn(worker_id)
+        torch.set_num_threads(parent_threads)
+
+        self._dispatcher = threading.Thread(target=self._collect_results, name='inference-pool-results', daemon=True)
+        self._dispatcher.start()
+        self._monitor = threading.Thread(target=self._watch_workers, name='inference-pool-monitor', daemon=True)
+        self._monitor.start()
+
+    def submit(self, images, conf, **kwargs):
+        """Queue a batch for the least busy worker; the Future resolves to a list of Results"""
+        return self._submit(images, conf, kwargs)[1]
+
+    def predict(self, images, conf, deadline=None, **kwargs):
+        """Blocking batch inference with the same call shape as ``model(images, conf=...)``
+
+        ``deadline`` (a ``time.monotonic()`` value) bounds the wait; without
+        one it is ``task_timeout``. Raises DeadlineExceeded or RuntimeError
+        when the batch doesn't come back in time.
+        """
+        task_id, future = self._submit(images, conf, kwargs)
+        timeout = self.task_timeout if deadline is None else max(0.0, deadline - time.monotonic())
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            with self._lock:
+                self._pending.pop(task_id, None)
+            if deadline is not None:
+                raise DeadlineExceeded('Deadline exceeded while waiting for an inference worker')
+            raise RuntimeError(f'No answer from an inference worker within {self.task_timeout:.0f}s')
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def stats(self):
+        with self._lock:
+            pending = len(self._pending)
+            completed = list(self._completed)
+            restarts = self._restarts
+            processes = list(self._processes)
+        return {
+            'workers': self.num_workers,
+            'threads_per_worker': self.threads_per_worker,
+            'alive': sum(process.is_alive() for process in processes),
+            'restarts': restarts,
+            'pending_batches': pending,
+            'completed_batches': completed
+        }
+
+    def close(self, timeout=5):
+        self._closing = True
+        for tasks in self._queues:
+            tasks.put(None)
+        for process in self._processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.terminate()
+
+    def _spawn(self, worker_id):
+        tasks = self._context.Queue()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, self.model, self._slices[worker_id], self.threads_per_worker, tasks, self._results),
+            name=f'inference-worker-{worker_id}',
+            daemon=True
+        )
+        process.start()
+        with self._lock:
+            self._queues[worker_id] = tasks
+            self._processes[worker_id] = process
+
+    def _submit(self, images, conf, kwargs):
+        task_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            in_flight = [0] * self.num_workers
+            for _, _, busy_worker in self._pending.values():
+                in_flight[busy_worker] += 1
+            worker_id = min(range(self.num_workers), key=in_flight.__getitem__)
+            self._pending[task_id] = (future, images, worker_id)
+            tasks = self._queues[worker_id]
+        tasks.put((task_id, images, conf, kwargs))
+        return task_id, future
+
+    def _watch_workers(self):
+        """Fail the batches of workers that die and fork replacements"""
+        while not self._closing:
+            with self._lock:
+                sentinels = {process.sentinel: worker_id for worker_id, process in enumerate(self._processes)}
+            ready = multiprocessing.connection.wait(list(sentinels), timeout=1.0)
+            if self._closing:
+                return
+            for sentinel in ready:
+                worker_id = sentinels[sentinel]
+                process = self._processes[worker_id]
+                process.join()
+                with self._lock:
+                    lost = [task_id for task_id, entry in self._pending.items() if entry[2] == worker_id]
+                    futures = [self._pending.pop(task_id)[0] for task_id in lost]
+                    self._restarts += 1
+                logger.error(f"Inference worker {worker_id} (pid {process.pid}) died with exit code {process.exitcode}, "
+                             f"failing {len(futures)} batches and restarting it")
+                for future in futures:
+                    future.set_exception(RuntimeError(f'Inference worker {worker_id} died (exit code {process.exitcode})'))
+                self._spawn(worker_id)
+
+    def _collect_results(self):
+        import torch
+        from ultralytics.engine.results import Results
+
+        while True:
+            task_id, worker_id, payload, error = self._results.get()
+            with self._lock:
+                entry = self._pending.pop(task_id, None)
+                self._completed[worker_id] += 1
+            if entry is None:
+                continue  # Already failed: its worker died or the caller stopped waiting
+            future, images, _ = entry
+            if error is not None:
+                future.set_exception(RuntimeError(f'Inference worker {worker_id} failed: {error}'))
+                continue
+
+            outputs = []
+            for image, (boxes, speed) in zip(images, payload):
+                result = Results(image, path='', names=self.model.names, boxes=torch.from_numpy(np.ascontiguousarray(boxes)))
+                result.speed = speed
+                outputs.append(result)
+            future.set_result(outputs)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-request inference vs. the micro-batching scheduler
+
+Drives the same concurrent workload through both paths and reports
+requests/sec and p50/p99 latency. The per-request baseline serializes calls
+on a lock, since a single YOLO predictor is not safe to call concurrently.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-service'))
+
+from batching import BatchScheduler  # noqa: E402
+
+
+def percentile(values, pct):
+    return float(np.percentile(values, pct)) if values else 0.0
+
+
+def drive(infer, images, concurrency):
+    """Send every image through ``infer`` from ``concurrency`` threads"""
+    latencies = []
+    lock = threading.Lock()
+
+    def one(image):
+        start = time.perf_counter()
+        infer(image)
+        elapsed = time.perf_counter() - start
+        with lock:
+            latencies.append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, images))
+    wall = time.perf_counter() - start
+
+    return {
+        'requests': len(images),
+        'requests_per_sec': len(images) / wall,
+        'p50_ms': percentile(latencies, 50) * 1000,
+        'p99_ms': percentile(latencies, 99) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='yolo11x.pt')
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--image-size', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.25)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    model = YOLO(args.weights)
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 255, (args.image_size, args.image_size, 3), dtype=np.uint8)
+              for _ in range(args.requests)]
+
+    # Warm up kernels so neither path pays first-call costs
+    model(images[:2], conf=args.conf, verbose=False)
+
+    model_lock = threading.Lock()
+
+    def per_request(image):
+        with model_lock:
+            return model(image, conf=args.conf, verbose=False)
+
+    scheduler = BatchScheduler(
+        lambda batch, conf: model(batch, conf=conf, verbose=False),
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000
+    )
+
+    print(f"🧪 {args.requests} requests, concurrency {args.concurrency}, {args.weights} @ {args.image_size}px\n")
+
+    baseline = drive(per_request, images, args.concurrency)
+    batched = drive(lambda image: scheduler.infer(image, args.conf), images, args.concurrency)
+    scheduler.close()
+
+    for name, row in (('per-request', baseline), ('batched', batched)):
+        print(f"   {name:<12} {row['requests_per_sec']:8.2f} req/s   "
+              f"p50 {row['p50_ms']:8.1f} ms   p99 {row['p99_ms']:8.1f} ms")
+    print(f"\n   avg batch size: {scheduler.stats()['avg_batch_size']:.2f}")
+    print(f"   speedup: {batched['requests_per_sec'] / baseline['requests_per_sec']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk detection export vs. reading every result file
+
+Saves N synthetic results through the ResultStore/ResultsIndex the
+ai-service uses, then times what an analytics job used to do (load each
+result's JSON one by one, as GET /results/<filename> does, and flatten the
+boxes) against the columnar export in each available format.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-service'))
+
+from exporting import available_formats, iter_export  # noqa: E402
+from results_index import ResultsIndex  # noqa: E402
+from storage import ResultStore  # noqa: E402
+
+
+def populate(store, index, count, boxes_per_result):
+    rng = np.random.default_rng(0)
+    start = datetime(2025, 1, 1)
+    rows = []
+    for i in range(count):
+        moment = start + timedelta(seconds=37 * i)
+        name = f"{moment.strftime('%Y%m%d_%H%M%S')}_img{i}"
+        xy = rng.uniform(0, 600, (boxes_per_result, 2))
+        detections = [{
+            'bbox': {'x1': float(x), 'y1': float(y), 'x2': float(x) + 50, 'y2': float(y) + 80},
+            'confidence': float(rng.uniform(0.25, 1)),
+            'class_id': int(j % 80),
+            'class_name': f'class_{j % 80}'
+        } for j, (x, y) in enumerate(xy)]
+        json_data = {'image_filename': f'img{i}.jpg', 'timestamp': moment.isoformat(),
+                     'detections': detections, 'detection_count': len(detections), 'success': True}
+        json_path = store.json_path(name)
+        store.write_json(json_data, json_path)
+        rows.append((name, json_data, os.path.relpath(json_path, store.output_dir), None,
+                     os.path.getsize(json_path), None, None))
+    index.add_rows(rows)
+
+
+def per_file(store, index):
+    names, x1, confidence = [], [], []
+    cursor = None
+    while True:
+        page, cursor = index.query(cursor=cursor, limit=1000)
+        for row in page:
+            for detection in store.read_json(row['name'])['detections']:
+                names.append(row['name'])
+                x1.append(detection['bbox']['x1'])
+                confidence.append(detection['confidence'])
+        if cursor is None:
+            return len(names)
+
+
+def export(index, fmt):
+    return sum(len(chunk) for chunk in iter_export(index, fmt))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--results', type=int, default=20_000)
+    parser.add_argument('--boxes', type=int, default=10, help='Detections per result')
+    args = parser.parse_args()
+
+    scratch = Path(tempfile.mkdtemp(prefix='export-bench-'))
+    try:
+        index = ResultsIndex(scratch / 'results_index.sqlite3', scratch)
+        store = ResultStore(scratch, index)
+        print(f"🧪 Saving {args.results} results x {args.boxes} boxes in {scratch}...")
+        populate(store, index, args.results, args.boxes)
+
+        print()
+        start = time.perf_counter()
+        rows = per_file(store, index)
+        print(f"   {'read every result JSON':<26} {(time.perf_counter() - start) * 1000:10.1f} ms  ({rows} boxes)")
+        for fmt in available_formats():
+            start = time.perf_counter()
+            size = export(index, fmt)
+            print(f"   {'export ' + fmt:<26} {(time.perf_counter() - start) * 1000:10.1f} ms  ({size / 1024 / 1024:.2f} MB)")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
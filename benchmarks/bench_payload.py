@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: /detect response payloads with 10/100/1000/10000 boxes
+
+Builds the same response /detect returns and compares, per encoding, the
+payload size, the time to encode it on the ai-service and the time for a
+client to parse it: JSON with list detections (the default), JSON with
+columnar detections (format=columnar) and the packed float32 binary format
+(Accept: application/vnd.yolo.detections).
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-service'))
+
+from serialization import (BoxArrays, columnar_from_arrays, decode_binary, detections_from_arrays,  # noqa: E402
+                           encode_binary)
+
+NAMES = {i: f'class_{i}' for i in range(80)}
+
+
+def make_response(num_boxes, response_format):
+    rng = np.random.default_rng(num_boxes)
+    xy = rng.uniform(0, 3000, (num_boxes, 2)).astype(np.float32)
+    arrays = BoxArrays(np.hstack([xy, xy + rng.uniform(5, 200, (num_boxes, 2)).astype(np.float32)]),
+                       rng.uniform(0.25, 1, num_boxes).astype(np.float32),
+                       rng.integers(0, 80, num_boxes))
+    if response_format == 'columnar':
+        detections = columnar_from_arrays(arrays, NAMES)
+    else:
+        detections = detections_from_arrays(arrays, NAMES)
+    return {
+        'image_filename': 'bench.jpg',
+        'timestamp': '2025-01-01T12:00:00.000000',
+        'detections': detections,
+        'detection_count': num_boxes,
+        'success': True,
+        'output_files': {'json': 'output/results/2025/01/01/ab/20250101_120000_bench_results.json'},
+        'persist': 'json',
+        'processing_time': 0.123,
+        'decode_time': 0.004,
+        'confidence_threshold': 0.25,
+        'model': 'yolo11x',
+        'imgsz': 640,
+        'cache_hit': False,
+        **({'format': 'columnar'} if response_format == 'columnar' else {})
+    }
+
+
+def encode_json(response):
+    # What Flask's jsonify does outside debug mode
+    return json.dumps(response, separators=(',', ':')).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000, 10000])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print("🧪 /detect payload micro-benchmark\n")
+    print(f"   {'boxes':>6} {'encoding':<14} {'bytes':>10} {'encode':>10} {'parse':>10}")
+
+    for size in args.sizes:
+        list_response = make_response(size, 'list')
+        columnar_response = make_response(size, 'columnar')
+        encodings = (
+            ('json list', lambda: encode_json(list_response), json.loads),
+            ('json columnar', lambda: encode_json(columnar_response), json.loads),
+            ('binary', lambda: encode_binary(columnar_response), decode_binary)
+        )
+
+        number = max(1, 2000 // size)
+        for name, encode, parse in encodings:
+            payload = encode()
+            encode_ms = min(timeit.repeat(encode, number=number, repeat=args.repeat)) / number * 1000
+            parse_ms = min(timeit.repeat(lambda: parse(payload), number=number, repeat=args.repeat)) / number * 1000
+            print(f"   {size:>6} {name:<14} {len(payload):>10} {encode_ms:>8.3f}ms {parse_ms:>8.3f}ms")
+
+        decoded = decode_binary(encode_binary(columnar_response))
+        assert decoded['detections']['class_name'] == columnar_response['detections']['class_name']
+        assert np.allclose(decoded['detections']['bbox'], columnar_response['detections']['bbox'])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /results listing via directory scan vs. the SQLite results index
+
+Generates N synthetic results (JSON plus annotated-image placeholder files)
+in a scratch directory, then times the original iterdir()+stat()+sort
+listing against first-page, deep-page and class-filtered index queries and a
+full index rebuild.
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-service'))
+
+from results_index import ResultsIndex  # noqa: E402
+
+CLASSES = ['person', 'dog', 'cat', 'car', 'bicycle', 'bird']
+
+
+def populate(output_dir, count):
+    start = datetime(2025, 1, 1)
+    for i in range(count):
+        moment = start + timedelta(seconds=37 * i)
+        name = f"{moment.strftime('%Y%m%d_%H%M%S')}_img{i}"
+        detections = [{
+            'bbox': {'x1': 1.0, 'y1': 2.0, 'x2': 3.0, 'y2': 4.0},
+            'confidence': 0.5,
+            'class_id': j,
+            'class_name': CLASSES[(i + j) % len(CLASSES)]
+        } for j in range(i % 4)]
+        with open(output_dir / f'{name}_results.json', 'w') as f:
+            json.dump({'image_filename': f'img{i}.jpg', 'timestamp': moment.isoformat(),
+                       'detections': detections, 'detection_count': len(detections), 'success': True}, f)
+        (output_dir / f'{name}_detected.jpg').touch()
+
+
+def legacy_listing(output_dir):
+    image_files, json_files = [], []
+    for file in Path(output_dir).iterdir():
+        if file.suffix.lower() in ['.jpg', '.jpeg', '.png'] and '_detected' in file.name:
+            image_files.append({'filename': file.name, 'path': str(file), 'size': file.stat().st_size})
+        elif file.suffix.lower() == '.json' and '_results' in file.name:
+            json_files.append({'filename': file.name, 'path': str(file), 'size': file.stat().st_size})
+    return (sorted(image_files, key=lambda x: x['filename'], reverse=True),
+            sorted(json_files, key=lambda x: x['filename'], reverse=True))
+
+
+def timed(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        value = fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--results', type=int, default=100_000)
+    parser.add_argument('--page-size', type=int, default=100)
+    args = parser.parse_args()
+
+    scratch = Path(tempfile.mkdtemp(prefix='results-bench-'))
+    try:
+        print(f"🧪 Generating {args.results} results in {scratch}...")
+        populate(scratch, args.results)
+
+        index = ResultsIndex(scratch / 'index.sqlite3', scratch)
+        rebuild_ms, _ = timed(index.rebuild, repeat=1)
+
+        deep_cursor = None
+        for _ in range(10):
+            _, deep_cursor = index.query(cursor=deep_cursor, limit=args.page_size)
+
+        rows = [
+            ('directory scan (legacy)', timed(lambda: legacy_listing(scratch))[0]),
+            ('index: first page', timed(lambda: index.query(limit=args.page_size))[0]),
+            ('index: page 11 via cursor', timed(lambda: index.query(cursor=deep_cursor, limit=args.page_size))[0]),
+            ('index: class_name=dog', timed(lambda: index.query(limit=args.page_size, class_name='dog'))[0]),
+            ('index: time range', timed(lambda: index.query(limit=args.page_size, since='2025-01-02', until='2025-01-03'))[0]),
+            ('index: total count', timed(index.count)[0]),
+            ('index: full rebuild', rebuild_ms)
+        ]
+
+        print()
+        for name, ms in rows:
+            print(f"   {name:<28} {ms:10.2f} ms")
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: detection serialization with 10/100/1000 boxes
+
+Compares the original per-box loop (tensor indexing plus six ``.item()``
+calls per box) against the bulk numpy transfer used by
+``save_detection_results()``, in both the list and columnar response shapes.
+"""
+
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+import torch
+from ultralytics.engine.results import Results
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-service'))
+
+from serialization import box_arrays, detections_from_arrays, columnar_from_arrays  # noqa: E402
+
+NAMES = {i: f'class_{i}' for i in range(80)}
+
+
+def make_result(num_boxes, device):
+    rng = np.random.default_rng(num_boxes)
+    xy = rng.uniform(0, 600, (num_boxes, 2))
+    wh = rng.uniform(5, 200, (num_boxes, 2))
+    data = np.column_stack([xy, xy + wh, rng.uniform(0.25, 1, num_boxes), rng.integers(0, 80, num_boxes)])
+    boxes = torch.tensor(data, dtype=torch.float32, device=device)
+    return Results(np.zeros((640, 640, 3), dtype=np.uint8), path='bench.jpg', names=NAMES, boxes=boxes)
+
+
+def legacy_loop(result):
+    detections = []
+    boxes = result.boxes
+    for i in range(len(boxes)):
+        box = boxes[i]
+        detections.append({
+            'bbox': {
+                'x1': float(box.xyxy[0][0].item()),
+                'y1': float(box.xyxy[0][1].item()),
+                'x2': float(box.xyxy[0][2].item()),
+                'y2': float(box.xyxy[0][3].item())
+            },
+            'confidence': float(box.conf[0].item()),
+            'class_id': int(box.cls[0].item()),
+            'class_name': result.names[int(box.cls[0].item())]
+        })
+    return detections
+
+
+def vectorized_list(result):
+    return detections_from_arrays(box_arrays(result), result.names)
+
+
+def vectorized_columnar(result):
+    return columnar_from_arrays(box_arrays(result), result.names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--device', default='cpu')
+    args = parser.parse_args()
+
+    print(f"🧪 Serialization micro-benchmark on {args.device}\n")
+    print(f"   {'boxes':>6} {'legacy':>12} {'vectorized':>12} {'columnar':>12} {'speedup':>8}")
+
+    for size in args.sizes:
+        result = make_result(size, args.device)
+        assert legacy_loop(result) == vectorized_list(result)
+
+        number = max(1, 2000 // size)
+        timings = {}
+        for name, fn in (('legacy', legacy_loop), ('vectorized', vectorized_list), ('columnar', vectorized_columnar)):
+            best = min(timeit.repeat(lambda: fn(result), number=number, repeat=args.repeat))
+            timings[name] = best / number * 1000
+
+        print(f"   {size:>6} {timings['legacy']:>10.3f}ms {timings['vectorized']:>10.3f}ms "
+              f"{timings['columnar']:>10.3f}ms {timings['legacy'] / timings['vectorized']:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: tiled (sliced) inference on very high-resolution images
+
+Compares plain whole-image detection (downscaled to the model input size)
+with tiled detection over a grid of tile sizes, overlaps and tile batch
+sizes, going through the same BatchScheduler the ai-service uses. Reports
+per-image latency, inferences per image and detections found - on real
+drone/scanner imagery the detection count shows how many small objects the
+plain pass misses.
+
+Use --image to benchmark a real photo (resized to each --sizes entry);
+otherwise a synthetic image is used. --backend fake runs without weights.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-service'))
+
+from backends import load_model  # noqa: E402
+from batching import BatchScheduler  # noqa: E402
+from imaging import decode_image  # noqa: E402
+from tiling import detect_tiled  # noqa: E402
+
+
+def make_image(path, width, height, seed=0):
+    if path:
+        import cv2
+        with open(path, 'rb') as f:
+            return cv2.resize(decode_image(f.read()), (width, height), interpolation=cv2.INTER_LINEAR)
+    rng = np.random.default_rng(seed)
+    base = rng.integers(0, 255, (height // 64 + 1, width // 64 + 1, 3), dtype=np.uint8)
+    return np.ascontiguousarray(np.repeat(np.repeat(base, 64, axis=0), 64, axis=1)[:height, :width])
+
+
+def timed(fn, repeats):
+    latencies = []
+    output = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        output = fn()
+        latencies.append(time.perf_counter() - start)
+    return output, float(np.mean(latencies)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='yolo11n.pt')
+    parser.add_argument('--backend', default='torch', help='torch, onnx, openvino or fake')
+    parser.add_argument('--image', default=None, help='Real image to resize to each size (default: synthetic)')
+    parser.add_argument('--sizes', default='3840x2160,5472x3648', help='Comma-separated WIDTHxHEIGHT (8 MP and 20 MP by default)')
+    parser.add_argument('--tile-sizes', default='640,960')
+    parser.add_argument('--overlaps', default='0.1,0.2')
+    parser.add_argument('--tile-batch-sizes', default='1,4,8')
+    parser.add_argument('--iou', type=float, default=0.5)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--no-full-image', action='store_true', help='Skip the extra whole-image pass')
+    args = parser.parse_args()
+
+    model = load_model(args.weights, backend=args.backend)
+    schedulers = {}
+
+    def scheduler_for(batch_size):
+        if batch_size not in schedulers:
+            schedulers[batch_size] = BatchScheduler(
+                lambda images, conf: model(images, conf=conf, verbose=False),
+                max_batch_size=batch_size, max_wait=0.005
+            )
+        return schedulers[batch_size]
+
+    print(f"🧪 {args.weights} ({args.backend}), {args.repeats} repeats per configuration\n")
+    print(f"   {'image':>10} {'mode':<28} {'inferences':>10} {'ms/image':>10} {'detections':>10}")
+
+    for size in args.sizes.split(','):
+        width, height = (int(v) for v in size.lower().split('x'))
+        image = make_image(args.image, width, height)
+        scheduler = scheduler_for(1)
+        scheduler.infer(image, args.conf)  # warm up the predictor at this size
+
+        result, ms = timed(lambda: scheduler.infer(image, args.conf), args.repeats)
+        print(f"   {size:>10} {'plain (downscaled)':<28} {1:>10} {ms:>10.1f} {len(result.boxes):>10}")
+
+        for tile_size in (int(v) for v in args.tile_sizes.split(',')):
+            for overlap in (float(v) for v in args.overlaps.split(',')):
+                for batch_size in (int(v) for v in args.tile_batch_sizes.split(',')):
+                    submit = scheduler_for(batch_size).submit
+
+                    def run():
+                        return detect_tiled(image, lambda tile: submit(tile, args.conf), tile_size, overlap,
+                                            window=batch_size, iou_threshold=args.iou,
+                                            full_image=not args.no_full_image)
+
+                    (result, inferences), ms = timed(run, args.repeats)
+                    mode = f"tiles {tile_size} ov {overlap:.2f} batch {batch_size}"
+                    print(f"   {size:>10} {mode:<28} {inferences:>10} {ms:>10.1f} {len(result.boxes):>10}")
+
+    for scheduler in schedulers.values():
+        scheduler.close()
+
+
+if __name__ == "__main__":
+    main()
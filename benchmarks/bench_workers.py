@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Benchmark: sweep inference worker processes x torch threads per worker
+
+For every workers x threads split that fits on the machine, starts an
+InferenceWorkerPool behind a BatchScheduler (as the ai-service does with
+INFERENCE_WORKERS / THREADS_PER_WORKER) and drives the same concurrent
+workload through it, reporting requests/sec and p50/p99 latency so the best
+split can be picked.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-service'))
+
+from batching import BatchScheduler  # noqa: E402
+from workers import InferenceWorkerPool  # noqa: E402
+
+# The parent only forks workers; keeping it single-threaded makes fork safe with GNU OpenMP
+torch.set_num_threads(1)
+
+
+def drive(scheduler, images, concurrency, conf):
+    latencies = []
+    lock = threading.Lock()
+
+    def one(image):
+        start = time.perf_counter()
+        scheduler.infer(image, conf)
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, images))
+    wall = time.perf_counter() - start
+    return len(images) / wall, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000
+
+
+def splits(cores, max_workers):
+    for workers in range(1, max_workers + 1):
+        for threads in sorted({1, 2, 4, 8, 16, cores // workers}):
+            if threads >= 1 and workers * threads <= cores:
+                yield workers, threads
+
+
+def main():
+    cores = len(os.sched_getaffinity(0)) if hasattr(os, 'sched_getaffinity') else os.cpu_count()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='yolo11x.pt')
+    parser.add_argument('--requests', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--max-workers', type=int, default=min(cores, 8))
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=10)
+    parser.add_argument('--image-size', type=int, default=640)
+    parser.add_argument('--conf', type=float, default=0.25)
+    args = parser.parse_args()
+
+    from ultralytics import YOLO
+
+    model = YOLO(args.weights)
+    rng = np.random.default_rng(0)
+    images = [rng.integers(0, 255, (args.image_size, args.image_size, 3), dtype=np.uint8)
+              for _ in range(args.requests)]
+    warmup = np.zeros((args.image_size, args.image_size, 3), dtype=np.uint8)
+
+    print(f"🧪 {args.weights}: {args.requests} requests, concurrency {args.concurrency}, {cores} cores\n")
+    print(f"   {'workers':>7} {'threads':>7} {'req/s':>8} {'p50 ms':>9} {'p99 ms':>9}")
+
+    best = None
+    for workers, threads in splits(cores, args.max_workers):
+        pool = InferenceWorkerPool(model, workers, threads, warmup_image=warmup)
+        scheduler = BatchScheduler(pool.predict, max_batch_size=args.max_batch_size,
+                                   max_wait=args.max_wait_ms / 1000, concurrency=workers)
+        scheduler.infer(warmup, args.conf)  # warm the dispatch path before timing
+        rps, p50, p99 = drive(scheduler, images, args.concurrency, args.conf)
+        scheduler.close()
+        pool.close()
+
+        print(f"   {workers:>7} {threads:>7} {rps:>8.2f} {p50:>9.1f} {p99:>9.1f}")
+        if best is None or rps > best[2]:
+            best = (workers, threads, rps)
+
+    print(f"\n   best: INFERENCE_WORKERS={best[0]} THREADS_PER_WORKER={best[1]} ({best[2]:.2f} req/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Accuracy/latency comparison of the ai-service inference backends
+
+Runs the same images through PyTorch and the exported ONNX Runtime /
+OpenVINO variants (optionally INT8) and reports per-image latency plus the
+drift from the PyTorch output: mAP@0.5 of each backend's detections scored
+against the PyTorch detections as reference boxes. Pass --val-data to also
+run ultralytics validation (true mAP50-95) for every backend.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ai-service'))
+
+from backends import backend_id, load_model  # noqa: E402
+from imaging import decode_image  # noqa: E402
+from serialization import box_arrays  # noqa: E402
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.webp'}
+
+
+def load_images(image_dir, count, size):
+    if image_dir:
+        paths = sorted(p for p in Path(image_dir).iterdir() if p.suffix.lower() in IMAGE_EXTENSIONS)[:count]
+        return [decode_image(p.read_bytes()) for p in paths]
+    rng = np.random.default_rng(0)
+    return [rng.integers(0, 255, (size, size, 3), dtype=np.uint8) for _ in range(count)]
+
+
+def box_iou(a, b):
+    """Pairwise IoU between two sets of xyxy boxes"""
+    lt = np.maximum(a[:, None, :2], b[None, :, :2])
+    rb = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    inter = np.prod(np.clip(rb - lt, 0, None), axis=2)
+    area_a = np.prod(a[:, 2:] - a[:, :2], axis=1)
+    area_b = np.prod(b[:, 2:] - b[:, :2], axis=1)
+    return inter / (area_a[:, None] + area_b[None, :] - inter + 1e-9)
+
+
+def average_precision(predictions, references, iou_threshold=0.5):
+    """mAP of ``predictions`` against ``references`` (lists of BoxArrays, one per image)"""
+    classes = set()
+    for ref in references:
+        classes.update(ref.cls.tolist())
+
+    aps = []
+    for cls in sorted(classes):
+        scores, hits = [], []
+        total = 0
+        for pred, ref in zip(predictions, references):
+            ref_boxes = ref.xyxy[ref.cls == cls]
+            total += len(ref_boxes)
+            mask = pred.cls == cls
+            boxes, conf = pred.xyxy[mask], pred.conf[mask]
+            order = np.argsort(-conf)
+            matched = np.zeros(len(ref_boxes), dtype=bool)
+            ious = box_iou(boxes[order], ref_boxes) if len(ref_boxes) and len(boxes) else None
+            for rank, i in enumerate(order):
+                scores.append(conf[i])
+                hit = False
+                if ious is not None:
+                    candidates = np.where((ious[rank] >= iou_threshold) & ~matched)[0]
+                    if candidates.size:
+                        matched[candidates[np.argmax(ious[rank][candidates])]] = True
+                        hit = True
+                hits.append(hit)
+        if total == 0:
+            continue
+        order = np.argsort(-np.array(scores))
+        tp = np.cumsum(np.array(hits, dtype=float)[order])
+        recall = tp / total
+        precision = tp / np.arange(1, len(tp) + 1)
+        # All-point interpolated area under the precision/recall curve
+        recall = np.concatenate([[0.0], recall, [1.0]])
+        precision = np.concatenate([[1.0], precision, [0.0]])
+        precision = np.maximum.accumulate(precision[::-1])[::-1]
+        aps.append(float(np.sum((recall[1:] - recall[:-1]) * precision[1:])))
+    return float(np.mean(aps)) if aps else 1.0
+
+
+def run_backend(model, images, conf, batch_size):
+    latencies, outputs = [], []
+    for start in range(0, len(images), batch_size):
+        batch = images[start:start + batch_size]
+        begin = time.perf_counter()
+        results = model(batch, conf=conf, verbose=False)
+        latencies.append((time.perf_counter() - begin) / len(batch))
+        outputs.extend(box_arrays(result) for result in results)
+    return np.array(latencies) * 1000, outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--weights', default='yolo11x.pt')
+    parser.add_argument('--images', help='Directory of images to compare on (default: synthetic noise images)')
+    parser.add_argument('--count', type=int, default=32)
+    parser.add_argument('--image-size', type=int, default=640, help='Size of synthetic images')
+    parser.add_argument('--batch-size', type=int, default=1)
+    parser.add_argument('--conf', type=float, default=0.25)
+    parser.add_argument('--backends', nargs='+', default=['torch', 'onnx', 'onnx-int8'],
+                        help='Any of torch, onnx, onnx-int8, openvino, openvino-int8')
+    parser.add_argument('--val-data', help='Dataset YAML for ultralytics validation, e.g. coco128.yaml')
+    args = parser.parse_args()
+
+    images = load_images(args.images, args.count, args.image_size)
+    print(f"🧪 Comparing backends for {args.weights} on {len(images)} images (batch {args.batch_size})\n")
+
+    reference = None
+    rows = []
+    for variant in ['torch'] + [b for b in args.backends if b != 'torch']:
+        backend, _, suffix = variant.partition('-')
+        int8 = suffix == 'int8'
+        model = load_model(args.weights, backend=backend, int8=int8, max_batch=max(args.batch_size, 1),
+                           calibration_data=args.val_data)
+        run_backend(model, images[:2], args.conf, args.batch_size)  # warmup
+        latencies, outputs = run_backend(model, images, args.conf, args.batch_size)
+        if reference is None:
+            reference = outputs
+
+        row = {
+            'backend': backend_id(backend, int8),
+            'mean_ms': float(latencies.mean()),
+            'p95_ms': float(np.percentile(latencies, 95)),
+            'map50_vs_torch': average_precision(outputs, reference),
+            'boxes': int(sum(len(o.conf) for o in outputs))
+        }
+        if args.val_data:
+            row['val_map50_95'] = float(model.val(data=args.val_data, batch=args.batch_size, verbose=False).box.map)
+        rows.append(row)
+
+    baseline = rows[0]['mean_ms']
+    print(f"   {'backend':<14} {'mean ms':>9} {'p95 ms':>9} {'speedup':>8} {'mAP50 vs torch':>15} {'boxes':>7}"
+          + (f" {'val mAP50-95':>13}" if args.val_data else ''))
+    for row in rows:
+        line = (f"   {row['backend']:<14} {row['mean_ms']:>9.2f} {row['p95_ms']:>9.2f} "
+                f"{baseline / row['mean_ms']:>7.2f}x {row['map50_vs_torch']:>15.4f} {row['boxes']:>7}")
+        if args.val_data:
+            line += f" {row['val_map50_95']:>13.4f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Load test: ui-service /detect proxy overhead
+
+Starts a stub AI service (reads the upload, returns a canned detection
+response) and the ui-service in-process, then drives the same concurrent
+upload workload three ways:
+
+  direct   - straight to the stub AI service
+  legacy   - through the original proxy (new connection per request,
+             multipart re-parse, JSON decode + jsonify re-encode)
+  proxy    - through the ui-service /detect streaming, pooled proxy
+
+and reports requests/sec, p50/p99 latency and the added proxy overhead.
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from flask import Flask, jsonify, request
+from PIL import Image
+from werkzeug.serving import make_server
+
+UI_SERVICE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ui-service')
+
+
+def make_stub_ai_service(detections):
+    stub = Flask('stub-ai-service')
+    body = json.dumps({
+        'image_filename': 'bench.jpg',
+        'detections': [{
+            'bbox': {'x1': 168.9383544921875, 'y1': 26.123655319213867, 'x2': 1162.7684326171875, 'y2': 784.5704956054688},
+            'confidence': 0.6072709560394287,
+            'class_id': 16,
+            'class_name': 'dog'
+        }] * detections,
+        'detection_count': detections,
+        'success': True
+    }, indent=2)
+
+    @stub.route('/detect', methods=['POST'])
+    def detect():
+        request.files['image'].read()
+        return stub.response_class(body, mimetype='application/json')
+
+    @stub.route('/health')
+    def health():
+        return jsonify({'status': 'healthy'})
+
+    return stub
+
+
+def add_legacy_route(ui_app, ai_url):
+    """The original ui-service proxy, kept here as the comparison baseline"""
+    @ui_app.route('/legacy-detect', methods=['POST'])
+    def legacy_detect():
+        image_file = request.files['image']
+        files = {'image': (image_file.filename, image_file, image_file.content_type)}
+        response = requests.post(f'{ai_url}/detect', files=files, timeout=30)
+        return jsonify(response.json())
+
+
+def serve(app, port):
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def drive(url, payload, requests_total, concurrency):
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    latencies = []
+    lock = threading.Lock()
+
+    def one(_):
+        start = time.perf_counter()
+        response = session.post(url, files={'image': ('bench.jpg', payload, 'image/jpeg')}, timeout=60)
+        response.raise_for_status()
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests_total)))
+    wall = time.perf_counter() - start
+    return {
+        'requests_per_sec': requests_total / wall,
+        'p50_ms': float(np.percentile(latencies, 50)) * 1000,
+        'p99_ms': float(np.percentile(latencies, 99)) * 1000
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--requests', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--image-size', type=int, default=1280)
+    parser.add_argument('--detections', type=int, default=50, help='Boxes in the stub response')
+    parser.add_argument('--ai-port', type=int, default=15001)
+    parser.add_argument('--ui-port', type=int, default=15000)
+    args = parser.parse_args()
+
+    ai_url = f'http://127.0.0.1:{args.ai_port}'
+    os.environ['AI_SERVICE_URL'] = ai_url
+    sys.path.insert(0, UI_SERVICE_DIR)
+    import app as ui_service  # noqa: E402
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    add_legacy_route(ui_service.app, ai_url)
+    serve(make_stub_ai_service(args.detections), args.ai_port)
+    serve(ui_service.app, args.ui_port)
+
+    rng = np.random.default_rng(0)
+    buffer = io.BytesIO()
+    Image.fromarray(rng.integers(0, 255, (args.image_size, args.image_size, 3), dtype=np.uint8)).save(buffer, 'JPEG')
+    payload = buffer.getvalue()
+
+    print(f"🧪 {args.requests} uploads of {len(payload) / 1024:.0f} KB, concurrency {args.concurrency}\n")
+    rows = {
+        'direct': drive(f'{ai_url}/detect', payload, args.requests, args.concurrency),
+        'legacy': drive(f'http://127.0.0.1:{args.ui_port}/legacy-detect', payload, args.requests, args.concurrency),
+        'proxy': drive(f'http://127.0.0.1:{args.ui_port}/detect', payload, args.requests, args.concurrency)
+    }
+
+    for name, row in rows.items():
+        overhead = row['p50_ms'] - rows['direct']['p50_ms']
+        print(f"   {name:<8} {row['requests_per_sec']:8.1f} req/s   p50 {row['p50_ms']:7.1f} ms   "
+              f"p99 {row['p99_ms']:7.1f} ms   p50 overhead {overhead:+7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite: load-test the ai-service and ui-service /detect endpoints
+
+Drives a configurable mix of image sizes at one or more concurrency levels
+against the AI service directly and/or through the UI service proxy, and
+reports throughput, p50/p95/p99 latency, errors and service memory (RSS).
+Every response is checked for the fields the API actually returns.
+
+By default both services are started locally on spare ports with the
+weight-free 'fake' inference backend (FAKE_LATENCY_MS per 640x640 image), so
+the suite runs offline. Use --backend torch for the real model, or
+--ai-url/--ui-url to benchmark services that are already running.
+
+Results are saved as JSON; pass --compare with an earlier file to print the
+change in throughput and latency per run.
+
+Examples:
+  python benchmarks/run_benchmarks.py
+  python benchmarks/run_benchmarks.py --concurrency 1,8,32 --sizes 640x480:3,1920x1080:1
+  python benchmarks/run_benchmarks.py --ai-url http://localhost:5001 --ui-url http://localhost:5000
+  python benchmarks/run_benchmarks.py --compare benchmarks/results/bench_20250101_120000.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import requests
+from PIL import Image
+
+REPO_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+RESPONSE_FIELDS = ('detections', 'detection_count', 'success')
+
+
+def parse_sizes(spec):
+    """'640x480:3,1280x720:1' -> [((640, 480), 0.75), ((1280, 720), 0.25)]"""
+    sizes = []
+    for part in spec.split(','):
+        size, _, weight = part.partition(':')
+        width, height = (int(v) for v in size.lower().split('x'))
+        sizes.append(((width, height), float(weight or 1)))
+    total = sum(weight for _, weight in sizes)
+    return [(size, weight / total) for size, weight in sizes]
+
+
+def make_images(sizes, distinct, seed=0):
+    """A pool of distinct JPEGs per size, so result caching can't short-circuit the load"""
+    rng = np.random.default_rng(seed)
+    pool = {}
+    for (width, height), _ in sizes:
+        images = []
+        for _ in range(distinct):
+            # Smooth random gradients compress like photos (noise would be far larger)
+            base = rng.integers(0, 255, (height // 32 + 1, width // 32 + 1, 3), dtype=np.uint8)
+            image = Image.fromarray(base).resize((width, height), Image.BILINEAR)
+            buffer = io.BytesIO()
+            image.save(buffer, 'JPEG', quality=90)
+            images.append(buffer.getvalue())
+        pool[(width, height)] = images
+    return pool
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_healthy(url, process, timeout, path='/health'):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{url} exited with code {process.returncode} during startup")
+        try:
+            if requests.get(f'{url}{path}', timeout=2).status_code == 200:
+                return
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.5)
+    raise RuntimeError(f"{url} did not become healthy within {timeout}s")
+
+
+def start_service(name, workdir, port, env, log_dir):
+    log = open(os.path.join(log_dir, f'{name}.log'), 'w')
+    process = subprocess.Popen(
+        [sys.executable, os.path.join(REPO_DIR, name, 'app.py')],
+        cwd=workdir, env={**os.environ, **env, 'PORT': str(port)},
+        stdout=log, stderr=subprocess.STDOUT
+    )
+    return process, log
+
+
+def rss_bytes(pid):
+    """Resident set size of a local process (Linux), or None"""
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return None
+
+
+class MemorySampler:
+    """Samples the RSS of the locally started services while a run is in progress"""
+
+    def __init__(self, pids, interval=0.1):
+        self.pids = pids
+        self.interval = interval
+        self.peak = {name: 0 for name in pids}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for name, pid in self.pids.items():
+                self.peak[name] = max(self.peak[name], rss_bytes(pid) or 0)
+            self._stop.wait(self.interval)
+
+
+def check_response(response):
+    if response.status_code != 200:
+        return f'HTTP {response.status_code}'
+    try:
+        body = response.json()
+    except ValueError:
+        return 'invalid JSON'
+    missing = [field for field in RESPONSE_FIELDS if field not in body]
+    if missing or not body['success']:
+        return f"missing fields {missing}" if missing else 'success=false'
+    return None
+
+
+def run_load(url, pool, sizes, requests_total, concurrency, form, seed):
+    """Send ``requests_total`` uploads with ``concurrency`` clients; returns latencies and errors"""
+    rng = np.random.default_rng(seed)
+    choices = rng.choice(len(sizes), size=requests_total, p=[weight for _, weight in sizes])
+    plan = [(sizes[i][0], pool[sizes[i][0]][n % len(pool[sizes[i][0]])]) for n, i in enumerate(choices)]
+
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    latencies = []
+    errors = {}
+    lock = threading.Lock()
+
+    def one(item):
+        (width, height), payload = item
+        start = time.perf_counter()
+        try:
+            response = session.post(f'{url}/detect', data=form,
+                                    files={'image': (f'bench_{width}x{height}.jpg', payload, 'image/jpeg')}, timeout=300)
+            error = check_response(response)
+        except requests.exceptions.RequestException as e:
+            error = type(e).__name__
+        elapsed = time.perf_counter() - start
+        with lock:
+            if error is None:
+                latencies.append(elapsed)
+            else:
+                errors[error] = errors.get(error, 0) + 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(one, plan))
+    return latencies, errors, time.perf_counter() - start
+
+
+def summarise(latencies, errors, wall):
+    ms = np.array(latencies) * 1000
+    return {
+        'completed': len(latencies),
+        'errors': errors,
+        'wall_seconds': wall,
+        'throughput_rps': len(latencies) / wall if wall else 0.0,
+        'latency_ms': {
+            'mean': float(ms.mean()) if ms.size else None,
+            'p50': float(np.percentile(ms, 50)) if ms.size else None,
+            'p95': float(np.percentile(ms, 95)) if ms.size else None,
+            'p99': float(np.percentile(ms, 99)) if ms.size else None,
+            'max': float(ms.max()) if ms.size else None
+        }
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_comparison(report, baseline_path):
+    with open(baseline_path) as f:
+        baseline = {(run['target'], run['concurrency']): run for run in json.load(f)['runs']}
+    print(f"\n📈 Compared with {baseline_path}")
+    print(f"   {'target':<6} {'conc':>5} {'req/s':>16} {'p95 ms':>18}")
+    for run in report['runs']:
+        old = baseline.get((run['target'], run['concurrency']))
+        if old is None or not old['latency_ms']['p95'] or not run['latency_ms']['p95']:
+            continue
+        rps_change = (run['throughput_rps'] / old['throughput_rps'] - 1) * 100 if old['throughput_rps'] else 0.0
+        p95_change = (run['latency_ms']['p95'] / old['latency_ms']['p95'] - 1) * 100
+        print(f"   {run['target']:<6} {run['concurrency']:>5} {run['throughput_rps']:>8.2f} ({rps_change:+6.1f}%) "
+              f"{run['latency_ms']['p95']:>9.1f} ({p95_change:+6.1f}%)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--targets', default='ai,ui', help='Comma-separated: ai (direct), ui (through the proxy)')
+    parser.add_argument('--concurrency', default='1,4,16', help='Comma-separated client concurrency levels')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per run')
+    parser.add_argument('--warmup', type=int, default=8, help='Untimed requests before each target')
+    parser.add_argument('--sizes', default='640x480:3,1280x720:2,1920x1080:1', help='Image size mix WIDTHxHEIGHT:weight,...')
+    parser.add_argument('--distinct-images', type=int, default=16, help='Distinct images generated per size')
+    parser.add_argument('--confidence', type=float, default=0.25)
+    parser.add_argument('--persist', default='none', choices=('none', 'json', 'full'))
+    parser.add_argument('--model', default=None, help='model= form field (default: the service default)')
+    parser.add_argument('--backend', default='fake', help='INFERENCE_BACKEND for locally started services')
+    parser.add_argument('--ai-url', default=None, help='Use a running AI service instead of starting one')
+    parser.add_argument('--ui-url', default=None, help='Use a running UI service instead of starting one')
+    parser.add_argument('--startup-timeout', type=float, default=300)
+    parser.add_argument('--output', default=None, help='JSON report path (default: benchmarks/results/bench_<time>.json)')
+    parser.add_argument('--compare', default=None, help='Earlier JSON report to compare against')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    targets = [target.strip() for target in args.targets.split(',') if target.strip()]
+    concurrency_levels = [int(c) for c in args.concurrency.split(',')]
+    sizes = parse_sizes(args.sizes)
+    form = {'confidence': str(args.confidence), 'persist': args.persist}
+    if args.model:
+        form['model'] = args.model
+
+    processes, logs, pids = [], [], {}
+    workdir = tempfile.mkdtemp(prefix='detect-bench-')
+    ai_url, ui_url = args.ai_url, args.ui_url
+    try:
+        if ai_url is None:
+            port = free_port()
+            # Cache off so repeated images still exercise inference
+            process, log = start_service('ai-service', workdir, port, {
+                'INFERENCE_BACKEND': args.backend, 'CACHE_MAX_MB': '0'
+            }, workdir)
+            processes.append(process)
+            logs.append(log)
+            pids['ai-service'] = process.pid
+            ai_url = f'http://127.0.0.1:{port}'
+            print(f"🚀 Starting ai-service ({args.backend} backend) on {ai_url}")
+            wait_healthy(ai_url, process, args.startup_timeout, path='/readyz')
+        if 'ui' in targets and ui_url is None:
+            port = free_port()
+            process, log = start_service('ui-service', workdir, port, {'AI_SERVICE_URL': ai_url, 'DEBUG': 'false'}, workdir)
+            processes.append(process)
+            logs.append(log)
+            pids['ui-service'] = process.pid
+            ui_url = f'http://127.0.0.1:{port}'
+            print(f"🚀 Starting ui-service on {ui_url}")
+            wait_healthy(ui_url, process, args.startup_timeout)
+
+        urls = {'ai': ai_url, 'ui': ui_url}
+        pool = make_images(sizes, args.distinct_images, args.seed)
+        mix = ', '.join(f"{w}x{h} {weight:.0%}" for (w, h), weight in sizes)
+        print(f"🧪 {args.requests} requests per run, image mix {mix}, persist={args.persist}\n")
+        print(f"   {'target':<6} {'conc':>5} {'req/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7} {'peak RSS':>20}")
+
+        runs = []
+        for target in targets:
+            url = urls[target]
+            run_load(url, pool, sizes, args.warmup, 1, form, args.seed)
+            for concurrency in concurrency_levels:
+                with MemorySampler(pids) as sampler:
+                    latencies, errors, wall = run_load(url, pool, sizes, args.requests, concurrency, form, args.seed + concurrency)
+                run = {
+                    'target': target,
+                    'url': url,
+                    'concurrency': concurrency,
+                    'requests': args.requests,
+                    **summarise(latencies, errors, wall),
+                    'service_rss_bytes': {name: {'peak': peak, 'end': rss_bytes(pids[name])} for name, peak in sampler.peak.items()}
+                }
+                runs.append(run)
+
+                latency = run['latency_ms']
+                memory = ' '.join(f"{name[:2]}={usage['peak'] / 1024 / 1024:.0f}MB" for name, usage in run['service_rss_bytes'].items())
+                print(f"   {target:<6} {concurrency:>5} {run['throughput_rps']:>8.2f} {latency['p50'] or 0:>9.1f} "
+                      f"{latency['p95'] or 0:>9.1f} {latency['p99'] or 0:>9.1f} {sum(errors.values()):>7} {memory:>20}")
+
+        report = {
+            'meta': {
+                'timestamp': datetime.now().isoformat(),
+                'commit': git_commit(),
+                'host': {'platform': platform.platform(), 'python': platform.python_version(), 'cpus': os.cpu_count()},
+                'services_started': sorted(pids),
+                'client_peak_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+                'args': vars(args)
+            },
+            'runs': runs
+        }
+        output = args.output or os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"\n💾 Saved {output}")
+
+        if args.compare:
+            print_comparison(report, args.compare)
+    finally:
+        for process in processes:
+            process.terminate()
+            try:
+                process.wait(10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+        for log in logs:
+            log.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -65,4 +65,5 @@ echo "   docker-compose down             # Stop services"
 echo "   docker-compose up -d            # Start services"
 echo "   docker-compose restart          # Restart services"
 echo ""
-echo "📝 To test the API directly, run: python test_api.py"
+echo "📝 To load-test the running services, run:"
+echo "   python benchmarks/run_benchmarks.py --ai-url http://localhost:5001 --ui-url http://localhost:5000"
@@ -1,10 +1,20 @@
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, g, request, jsonify, render_template_string
+from werkzeug.http import parse_options_header
 import requests
+from requests.adapters import HTTPAdapter
+import atexit
 import base64
 from PIL import Image
 import io
+import math
 import os
 import logging
+import time
+
+from health import CircuitBreaker, HealthProber
+from metrics import MetricsRegistry, StageTimer
+from normalization import UploadNormalizer
+from wire import BINARY_CONTENT_TYPE, decode_binary, detections_from_columnar, encode_binary
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -14,6 +24,89 @@ app = Flask(__name__)
 
 # AI service URL (will be set via environment variable in Docker)
 AI_SERVICE_URL = os.getenv('AI_SERVICE_URL', 'http://localhost:5001')
+AI_POOL_SIZE = int(os.getenv('AI_POOL_SIZE', 16))  # Keep-alive connections kept open to the AI service
+AI_CONNECT_TIMEOUT = float(os.getenv('AI_CONNECT_TIMEOUT', 3.05))
+AI_READ_TIMEOUT = float(os.getenv('AI_READ_TIMEOUT', 30))
+PROXY_CHUNK_SIZE = 64 * 1024
+UPLOAD_PEEK_SIZE = 64 * 1024  # Start of a proxied multipart body searched for the image part's headers
+PRIORITY_HEADER = 'X-Request-Priority'  # Lane the AI service queues the request in; UI uploads are interactive
+DEADLINE_HEADER = 'X-Request-Timeout-Ms'  # Time the proxy will wait, so the AI service can drop work nobody is waiting for
+
+# One pooled session for all calls to the AI service so connections are reused
+ai_session = requests.Session()
+ai_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=AI_POOL_SIZE)
+ai_session.mount('http://', ai_adapter)
+ai_session.mount('https://', ai_adapter)
+
+# Background health probing and the /detect circuit breaker
+HEALTH_PROBE_INTERVAL = float(os.getenv('HEALTH_PROBE_INTERVAL', 5))
+HEALTH_PROBE_TIMEOUT = float(os.getenv('HEALTH_PROBE_TIMEOUT', 2))
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', 5))  # Consecutive failures before failing fast
+BREAKER_RESET_TIMEOUT = float(os.getenv('BREAKER_RESET_TIMEOUT', 10))  # Seconds open before a half-open trial
+
+def probe_ai_service():
+    response = ai_session.get(f'{AI_SERVICE_URL}/health', timeout=HEALTH_PROBE_TIMEOUT)
+    response.raise_for_status()
+    status = response.json()
+    if not status.get('ready', True):
+        # Up but still loading/warming the model: treat as unavailable so /detect fails fast
+        raise RuntimeError(f"AI service is not ready ({status.get('startup', {}).get('state', 'starting')})")
+    return status
+
+ai_breaker = CircuitBreaker(BREAKER_FAILURE_THRESHOLD, BREAKER_RESET_TIMEOUT)
+ai_health = HealthProber(probe_ai_service, HEALTH_PROBE_INTERVAL, breaker=ai_breaker).start()
+atexit.register(ai_health.stop)
+
+# Optional upload normalization: downsize, strip metadata and re-encode uploads before forwarding them
+UPLOAD_NORMALIZE = os.getenv('UPLOAD_NORMALIZE', 'false').lower() == 'true'
+UPLOAD_MAX_SIDE = int(os.getenv('UPLOAD_MAX_SIDE', 640))  # Longer side sent to the AI service when imgsz isn't given (its default imgsz)
+UPLOAD_JPEG_QUALITY = int(os.getenv('UPLOAD_JPEG_QUALITY', 90))
+UPLOAD_NORMALIZE_WORKERS = int(os.getenv('UPLOAD_NORMALIZE_WORKERS', 2))  # Uploads decoded/re-encoded at once
+
+upload_normalizer = None
+if UPLOAD_NORMALIZE:
+    upload_normalizer = UploadNormalizer(UPLOAD_MAX_SIDE, UPLOAD_JPEG_QUALITY, UPLOAD_NORMALIZE_WORKERS)
+
+# Prometheus metrics served on /metrics
+SERVER_TIMING = os.getenv('SERVER_TIMING', 'false').lower() == 'true'  # Add the proxy's stage timings to a Server-Timing header
+BREAKER_STATES = {CircuitBreaker.CLOSED: 0, CircuitBreaker.HALF_OPEN: 1, CircuitBreaker.OPEN: 2}
+
+metrics = MetricsRegistry()
+request_latency = metrics.histogram('ui_http_request_duration_seconds', 'Time to response headers by endpoint', ('endpoint', 'method', 'status'))
+stage_latency = metrics.histogram('ui_proxy_stage_duration_seconds', 'Latency of each /detect proxy stage', ('stage',))
+requests_in_flight = metrics.gauge('ui_requests_in_flight', 'Requests currently being handled')
+metrics.gauge('ui_ai_service_up', 'Whether the last background probe of the AI service succeeded',
+              callback=lambda: {True: 1, False: 0}.get(ai_health.snapshot()['healthy']))
+metrics.gauge('ui_ai_probe_latency_seconds', 'Latency of the last AI service health probe',
+              callback=lambda: (ai_health.snapshot()['probe_latency_ms'] or 0) / 1000)
+metrics.gauge('ui_circuit_breaker_state', 'AI service circuit breaker (0 closed, 1 half-open, 2 open)',
+              callback=lambda: BREAKER_STATES[ai_breaker.state])
+metrics.counter('ui_circuit_breaker_rejected_total', 'Uploads rejected while the circuit was open',
+                callback=lambda: ai_breaker.stats()['rejected'])
+metrics.counter('ui_upload_bytes_saved_total', 'Upload bytes not sent to the AI service thanks to normalization',
+                callback=lambda: upload_normalizer.bytes_saved() if upload_normalizer is not None else 0)
+
+@app.before_request
+def start_request_metrics():
+    g.request_start = time.perf_counter()
+    g.stage_timer = StageTimer(stage_latency)
+    requests_in_flight.inc()
+
+@app.after_request
+def record_request_metrics(response):
+    elapsed = time.perf_counter() - g.request_start
+    endpoint = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+    request_latency.observe(elapsed, endpoint=endpoint, method=request.method, status=response.status_code)
+    if SERVER_TIMING and g.stage_timer.stages:
+        # Appended to any Server-Timing the AI service already returned
+        timing = f"{g.stage_timer.server_timing()}, proxy_total;dur={elapsed * 1000:.2f}"
+        upstream = response.headers.get('Server-Timing')
+        response.headers['Server-Timing'] = f"{upstream}, {timing}" if upstream else timing
+    return response
+
+@app.teardown_request
+def finish_request_metrics(exc):
+    requests_in_flight.dec()
 
 # HTML template for the UI
 HTML_TEMPLATE = '''
@@ -290,6 +383,11 @@ HTML_TEMPLATE = '''
             try {
                 const response = await fetch('/health');
                 const data = await response.json();
+                if (data.ai_probe && data.ai_probe.healthy === false) {
+                    statusElement.textContent = '❌ AI service is unavailable';
+                    statusElement.className = 'service-status status-offline';
+                    return;
+                }
                 statusElement.textContent = '✅ Services are online and ready';
                 statusElement.className = 'service-status status-online';
             } catch (error) {
@@ -413,39 +511,252 @@ HTML_TEMPLATE = '''
 def home():
     return render_template_string(HTML_TEMPLATE)
 
+class UploadStream:
+    """Wraps the incoming request body so requests streams it upstream with a known Content-Length
+    
+    ``head`` is the start of the body, already read from ``stream`` to check
+    the upload, and is sent first.
+    """
+    def __init__(self, stream, length, head=b''):
+        self.stream = stream
+        self.length = length
+        self.head = head
+    
+    def __len__(self):
+        return self.length
+    
+    def read(self, size=-1):
+        if not self.head:
+            return self.stream.read(size)
+        if size is None or size < 0:
+            data, self.head = self.head + self.stream.read(), b''
+        else:
+            data, self.head = self.head[:size], self.head[size:]
+        return data
+
+def upload_error(filename, content_type):
+    """The error message for an image part without a file name or with a non-image Content-Type, else None"""
+    if not filename:
+        return 'No selected file'
+    if not (content_type or '').startswith('image/'):
+        return 'File must be an image'
+    return None
+
+def multipart_upload_error(head, boundary, complete):
+    """Check the ``image`` part's headers in the start of a multipart body, without parsing the rest
+    
+    Returns an error message, or None when the part looks like an image or
+    its headers are not in ``head`` (the AI service then checks it).
+    ``complete`` means ``head`` is the whole body.
+    """
+    delimiter = b'--' + boundary.encode()
+    for part in head.split(delimiter)[1:]:
+        headers, separator, _ = part.partition(b'\r\n\r\n')
+        if not separator:
+            break
+        fields = {}
+        for line in headers.decode('utf-8', 'replace').split('\r\n'):
+            name, _, value = line.partition(':')
+            fields[name.strip().lower()] = value.strip()
+        _, disposition = parse_options_header(fields.get('content-disposition', ''))
+        if disposition.get('name') == 'image':
+            return upload_error(disposition.get('filename'), fields.get('content-type'))
+    return 'No image file provided' if complete else None
+
+def read_head(stream, size):
+    """Read up to ``size`` bytes (less only at the end of the body)"""
+    chunks, remaining = [], size
+    while remaining > 0:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b''.join(chunks)
+
+# Hop-by-hop and framing headers that must not be copied from the AI service response
+EXCLUDED_RESPONSE_HEADERS = {'connection', 'keep-alive', 'transfer-encoding', 'content-length', 'server', 'date'}
+
+def post_detect(headers, **kwargs):
+    """POST to the AI service's /detect, feeding the circuit breaker
+    
+    Returns ``(response, None)``, with the response body not read yet, or
+    ``(None, error_response)`` when the AI service is unreachable, timed out
+    or failed.
+    """
+    try:
+        # Upload plus AI service processing, up to the response headers
+        with g.stage_timer.stage('upstream'):
+            response = ai_session.post(
+                f'{AI_SERVICE_URL}/detect',
+                headers={
+                    PRIORITY_HEADER: request.headers.get(PRIORITY_HEADER, 'interactive'),
+                    DEADLINE_HEADER: str(int(AI_READ_TIMEOUT * 1000)),
+                    **headers
+                },
+                timeout=(AI_CONNECT_TIMEOUT, AI_READ_TIMEOUT),
+                stream=True,
+                **kwargs
+            )
+    except requests.exceptions.ConnectionError:
+        ai_breaker.record_failure()
+        logger.error("Cannot connect to AI service")
+        return None, (jsonify({'error': 'AI service is unavailable'}), 503)
+    except requests.exceptions.Timeout:
+        ai_breaker.record_failure()
+        logger.error("AI service request timeout")
+        return None, (jsonify({'error': 'AI service timeout'}), 504)
+    except requests.exceptions.RequestException:
+        ai_breaker.record_failure()
+        raise
+    
+    if response.status_code == 504:
+        # The AI service dropped the request because its deadline passed while queued
+        ai_breaker.record_failure()
+        logger.error("AI service deadline exceeded")
+        response.close()
+        return None, (jsonify({'error': 'AI service timeout'}), 504)
+    if response.status_code >= 500:
+        ai_breaker.record_failure()
+        logger.error(f"AI service error: {response.status_code} - {response.text}")
+        response.close()
+        return None, (jsonify({'error': 'AI service error'}), 500)
+    ai_breaker.record_success()
+    return response, None
+
+def passthrough_response(response):
+    """Stream an AI service response back unchanged"""
+    def passthrough():
+        # Runs after the headers are sent, so it is only recorded in the histogram
+        start = time.perf_counter()
+        try:
+            for chunk in response.raw.stream(PROXY_CHUNK_SIZE, decode_content=False):
+                yield chunk
+        finally:
+            response.close()
+            stage_latency.observe(time.perf_counter() - start, stage='stream_response')
+    
+    headers = [(name, value) for name, value in response.headers.items()
+               if name.lower() not in EXCLUDED_RESPONSE_HEADERS]
+    if 'Content-Length' in response.headers:
+        headers.append(('Content-Length', response.headers['Content-Length']))
+    return Response(passthrough(), status=response.status_code, headers=headers)
+
+def detect_normalized():
+    """Normalize the upload before forwarding it, keeping boxes in the original image's coordinates
+    
+    The image is downsized to the model's working resolution (imgsz, or
+    UPLOAD_MAX_SIDE), stripped of metadata and re-encoded as JPEG on the
+    normalizer's thread pool. The original size is forwarded as
+    source_width/source_height, so the AI service returns and stores boxes in
+    original coordinates (a persisted result keeps the downsized JPEG as its
+    source). Detections are fetched in the packed binary format and returned
+    in the shape the caller asked for. Tiled requests, which need full
+    resolution, and uploads that would not shrink are forwarded as they are.
+    """
+    image_file = request.files['image']
+    error = upload_error(image_file.filename, image_file.mimetype)
+    if error is not None:
+        return jsonify({'error': error}), 400
+    form = request.form.to_dict(flat=False)
+    original = image_file.read()
+    
+    normalized = None
+    max_side = request.form.get('imgsz', UPLOAD_MAX_SIDE)
+    if request.form.get('tiled', 'false').lower() != 'true' and str(max_side).isdigit():
+        with g.stage_timer.stage('normalize'):
+            normalized = upload_normalizer.normalize(original, int(max_side))
+    
+    if normalized is None:
+        response, error = post_detect({'Accept': request.headers.get('Accept', 'application/json')},
+                                      files={'image': (image_file.filename, original, image_file.mimetype)}, data=form)
+        return error if error is not None else passthrough_response(response)
+    
+    bytes_saved = len(original) - len(normalized.data)
+    logger.info(f"Normalized upload {image_file.filename}: {len(original)} -> {len(normalized.data)} bytes, "
+                f"{normalized.original_size[0]}x{normalized.original_size[1]} -> {normalized.size[0]}x{normalized.size[1]}")
+    
+    filename = f"{os.path.splitext(image_file.filename or 'upload')[0]}.jpg"
+    form['source_width'], form['source_height'] = [str(side) for side in normalized.original_size]
+    response, error = post_detect({'Accept': BINARY_CONTENT_TYPE},
+                                  files={'image': (filename, normalized.data, 'image/jpeg')}, data=form)
+    if error is not None:
+        return error
+    if response.status_code != 200:
+        return passthrough_response(response)
+    
+    with g.stage_timer.stage('decode'):
+        result = decode_binary(response.content)
+        response.close()
+        result['image_filename'] = image_file.filename
+        result['normalization'] = {
+            'original_bytes': len(original),
+            'forwarded_bytes': len(normalized.data),
+            'bytes_saved': bytes_saved,
+            'forwarded_size': {'width': normalized.size[0], 'height': normalized.size[1]},
+            'time': normalized.seconds
+        }
+    
+    accept = request.accept_mimetypes.best_match(['application/json', BINARY_CONTENT_TYPE])
+    if accept == BINARY_CONTENT_TYPE:
+        encoded = Response(encode_binary(result), content_type=BINARY_CONTENT_TYPE)
+    else:
+        if request.form.get('format', 'list') != 'columnar':
+            result['detections'] = detections_from_columnar(result['detections'])
+            del result['format']
+        encoded = jsonify(result)
+    encoded.vary.add('Accept')
+    return encoded
+
 @app.route('/detect', methods=['POST'])
 def detect():
+    """Proxy an upload to the AI service without re-parsing it
+    
+    The multipart body is streamed straight through to the AI service over a
+    pooled keep-alive connection, and the AI service's response bytes are
+    streamed back unchanged (no JSON decode/re-encode). Only the image part's
+    headers are checked here (a file name and an image Content-Type, found in
+    the first UPLOAD_PEEK_SIZE bytes); the AI service validates the image
+    itself. The caller's Accept header is forwarded, so clients
+    that ask for packed binary detections get them through the proxy
+    untouched. With UPLOAD_NORMALIZE the upload is downsized and re-encoded
+    first (see detect_normalized). While the circuit breaker is open the
+    request is rejected with 503 without contacting the AI service.
+    """
     try:
-        if 'image' not in request.files:
+        if not (request.content_type or '').startswith('multipart/form-data'):
+            return jsonify({'error': 'No image file provided'}), 400
+        if upload_normalizer is not None and 'image' not in request.files:
             return jsonify({'error': 'No image file provided'}), 400
         
-        image_file = request.files['image']
-        if image_file.filename == '':
-            return jsonify({'error': 'No selected file'}), 400
-        
-        # Validate file type
-        if not image_file.content_type.startswith('image/'):
-            return jsonify({'error': 'File must be an image'}), 400
-        
-        logger.info(f"Processing image: {image_file.filename}")
+        if not ai_breaker.allow():
+            retry_after = max(1, math.ceil(ai_breaker.retry_after()))
+            return jsonify({'error': 'AI service is unavailable'}), 503, {'Retry-After': str(retry_after)}
         
-        # Send image to AI service
-        files = {'image': (image_file.filename, image_file, image_file.content_type)}
+        if upload_normalizer is not None:
+            return detect_normalized()
         
-        try:
-            response = requests.post(f'{AI_SERVICE_URL}/detect', files=files, timeout=30)
-        except requests.exceptions.ConnectionError:
-            logger.error("Cannot connect to AI service")
-            return jsonify({'error': 'AI service is unavailable'}), 503
-        except requests.exceptions.Timeout:
-            logger.error("AI service request timeout")
-            return jsonify({'error': 'AI service timeout'}), 504
-        
-        if response.status_code == 200:
-            return jsonify(response.json())
+        boundary = request.mimetype_params.get('boundary', '')
+        if request.content_length:
+            head = read_head(request.stream, min(UPLOAD_PEEK_SIZE, request.content_length))
+            error = multipart_upload_error(head, boundary, len(head) == request.content_length)
+            body = UploadStream(request.stream, request.content_length, head)
         else:
-            logger.error(f"AI service error: {response.status_code} - {response.text}")
-            return jsonify({'error': 'AI service error'}), 500
+            # Chunked uploads have no length to forward, so buffer them
+            body = request.get_data()
+            error = multipart_upload_error(body, boundary, True)
+        if error is not None:
+            return jsonify({'error': error}), 400
+        
+        logger.info(f"Proxying upload ({request.content_length or len(body)} bytes)")
+        
+        response, error = post_detect({
+            'Content-Type': request.content_type,
+            'Accept': request.headers.get('Accept', 'application/json')
+        }, data=body)
+        if error is not None:
+            return error
+        return passthrough_response(response)
             
     except Exception as e:
         logger.error(f"UI service error: {str(e)}")
@@ -453,18 +764,20 @@ def detect():
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    try:
-        # Check if AI service is responsive
-        ai_response = requests.get(f'{AI_SERVICE_URL}/health', timeout=5)
-        ai_status = ai_response.json() if ai_response.status_code == 200 else {'status': 'unavailable'}
-    except:
-        ai_status = {'status': 'unavailable'}
-    
+    # Served from the background prober's cache; never waits on the AI service
+    ai_probe = ai_health.snapshot()
     return jsonify({
         'status': 'UI service is running',
-        'ai_service': ai_status
+        'ai_service': ai_probe.pop('status'),
+        'ai_probe': ai_probe,
+        'circuit_breaker': ai_breaker.stats(),
+        'normalization': upload_normalizer.stats() if upload_normalizer is not None else {'enabled': False}
     })
 
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    return Response(metrics.render(), content_type=MetricsRegistry.CONTENT_TYPE)
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     debug = os.getenv('DEBUG', 'False').lower() == 'true'
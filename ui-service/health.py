@@ -0,0 +1,165 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """Fail-fast guard for calls to a backend that may be down.
+
+    Closed: calls go through; ``failure_threshold`` consecutive failures open
+    the circuit. Open: calls are rejected until ``reset_timeout`` seconds have
+    passed, then the circuit goes half-open. Half-open: a single trial call is
+    let through; its success closes the circuit again, its failure re-opens it
+    for another ``reset_timeout``.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=10.0):
+        self.failure_threshold = max(1, int(failure_threshold))
+        self.reset_timeout = float(reset_timeout)
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._counters = {'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state()
+
+    def allow(self):
+        """Return True if a call may be made now (and claim the half-open trial slot)"""
+        with self._lock:
+            state = self._current_state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._trial_in_flight:
+                self._state = self.HALF_OPEN
+                self._trial_in_flight = True
+                return True
+            self._counters['rejected'] += 1
+            return False
+
+    def retry_after(self):
+        """Seconds until the circuit will let a trial call through"""
+        with self._lock:
+            if self._state != self.OPEN:
+                return 0
+            return max(0.0, self._opened_at + self.reset_timeout - time.monotonic())
+
+    def record_success(self):
+        with self._lock:
+            if self._state != self.CLOSED:
+                logger.info("AI service recovered, closing circuit")
+            self._state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._state != self.CLOSED or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._counters['opened'] += 1
+                    logger.warning(f"AI service failing ({self._failures} consecutive failures), opening circuit for {self.reset_timeout:.0f}s")
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'state': self._current_state(),
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'reset_timeout': self.reset_timeout,
+                **self._counters
+            }
+
+    def _current_state(self):
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self._state
+
+
+class HealthProber:
+    """Polls a backend's health in a background thread and caches the result.
+
+    ``probe()`` returns the backend's status dict or raises; every
+    ``interval`` seconds the latest outcome replaces the cached status, so
+    readers never wait on the network. Outcomes are also reported to
+    ``breaker`` (if given), which lets a healthy probe close an open circuit.
+    """
+
+    def __init__(self, probe, interval=5.0, breaker=None):
+        self.probe = probe
+        self.interval = float(interval)
+        self.breaker = breaker
+
+        self._lock = threading.Lock()
+        self._status = {'status': 'unknown'}
+        self._healthy = None
+        self._checked_at = None
+        self._latency = None
+        self._failures = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='health-prober', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def check_now(self):
+        """Run one probe synchronously and update the cached status"""
+        start = time.perf_counter()
+        try:
+            status = self.probe()
+            healthy = True
+        except Exception as e:
+            status = {'status': 'unavailable', 'error': str(e)}
+            healthy = False
+        latency = time.perf_counter() - start
+
+        with self._lock:
+            if healthy != self._healthy:
+                logger.info(f"AI service is now {'healthy' if healthy else 'unavailable'}")
+            self._status = status
+            self._healthy = healthy
+            self._checked_at = time.time()
+            self._latency = latency
+            self._failures = 0 if healthy else self._failures + 1
+
+        if self.breaker is not None:
+            if healthy:
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+        return healthy
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'healthy': self._healthy,
+                'status': self._status,
+                'checked_at': self._checked_at,
+                'age_seconds': time.time() - self._checked_at if self._checked_at else None,
+                'probe_latency_ms': self._latency * 1000 if self._latency is not None else None,
+                'consecutive_failures': self._failures,
+                'interval': self.interval
+            }
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check_now()
+            self._stop.wait(self.interval)
@@ -0,0 +1,85 @@
+import io
+import logging
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+EXIF_ORIENTATION = 0x0112
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}  # EXIF orientations that swap width and height
+
+NormalizedUpload = namedtuple('NormalizedUpload', ['data', 'original_size', 'size', 'seconds'])
+
+
+def normalize_image(data, max_side, quality=90):
+    """Downsize an image to ``max_side`` (longer side), drop its metadata and re-encode it as JPEG
+
+    The EXIF orientation is applied to the pixels, so sizes and boxes are in
+    the upright image either way. Returns None when the result would not be
+    smaller than ``data`` (already small, nothing to strip) or the image
+    can't be decoded - the AI service reports bad uploads itself.
+    """
+    start = time.perf_counter()
+    try:
+        image = Image.open(io.BytesIO(data))
+        width, height = image.size
+        if image.getexif().get(EXIF_ORIENTATION) in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        # JPEGs are decoded at a reduced DCT scale when that still covers max_side
+        image.draft('RGB', (max_side, max_side))
+        image = ImageOps.exif_transpose(image).convert('RGB')
+        image.thumbnail((max_side, max_side))
+        output = io.BytesIO()
+        image.save(output, 'JPEG', quality=quality)
+    except Exception as e:  # Any decoder failure: forward the upload unchanged
+        logger.warning(f"Not normalizing upload: {e}")
+        return None
+
+    if image.size == (width, height) and output.tell() >= len(data):
+        return None
+    return NormalizedUpload(output.getvalue(), (width, height), image.size, time.perf_counter() - start)
+
+
+class UploadNormalizer:
+    """Runs ``normalize_image`` on a bounded thread pool and counts the bytes it saves
+
+    The pool caps how many large uploads are decoded at once (a 24 MP photo
+    is ~70 MB of pixels) independently of the number of request threads;
+    Pillow releases the GIL while decoding, resizing and encoding.
+    """
+
+    def __init__(self, max_side=640, quality=90, workers=2):
+        self.max_side = int(max_side)
+        self.quality = int(quality)
+        self._pool = ThreadPoolExecutor(max_workers=max(1, int(workers)), thread_name_prefix='normalize')
+        self._lock = threading.Lock()
+        self._counters = {'normalized': 0, 'skipped': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+    def normalize(self, data, max_side=None):
+        """Return a ``NormalizedUpload`` for ``data``, or None to forward it unchanged"""
+        normalized = self._pool.submit(normalize_image, data, max_side or self.max_side, self.quality).result()
+        with self._lock:
+            if normalized is None:
+                self._counters['skipped'] += 1
+            else:
+                self._counters['normalized'] += 1
+                self._counters['bytes_in'] += len(data)
+                self._counters['bytes_out'] += len(normalized.data)
+        return normalized
+
+    def bytes_saved(self):
+        with self._lock:
+            return self._counters['bytes_in'] - self._counters['bytes_out']
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_side': self.max_side,
+                'quality': self.quality,
+                **self._counters,
+                'bytes_saved': self._counters['bytes_in'] - self._counters['bytes_out']
+            }
@@ -0,0 +1,88 @@
+"""
+Packed binary detections, as the AI service returns them for
+``Accept: application/vnd.yolo.detections``.
+
+Same layout as encode_binary/decode_binary in ai-service/serialization.py
+(a 16-byte header, compact JSON metadata padded to 4 bytes, then
+little-endian float32 boxes and confidences and uint16 class ids), written
+with the standard library because the ui-service does not install numpy.
+Keep the two in sync.
+"""
+
+import json
+import struct
+import sys
+from array import array
+
+BINARY_CONTENT_TYPE = 'application/vnd.yolo.detections'
+BINARY_MAGIC = b'YDET'
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct('<4sHHII')
+
+
+def _unpack(typecode, data):
+    values = array(typecode, data)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _pack(typecode, values):
+    packed = array(typecode, values)
+    if sys.byteorder == 'big':
+        packed.byteswap()
+    return packed.tobytes()
+
+
+def decode_binary(data):
+    """Unpack a binary /detect response into a dict with columnar (list) ``detections``"""
+    if len(data) < BINARY_HEADER.size:
+        raise ValueError('Truncated binary detections')
+    magic, version, _, metadata_size, count = BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError('Not a binary detections payload (or an unsupported version)')
+    offset = BINARY_HEADER.size + metadata_size
+    if len(data) != offset + count * 22:
+        raise ValueError('Truncated binary detections')
+    response = json.loads(bytes(data[BINARY_HEADER.size:offset]))
+    class_names = response.pop('class_names')
+    coordinates = _unpack('f', data[offset:offset + count * 16])
+    class_ids = _unpack('H', data[offset + count * 20:]).tolist()
+    response['detections'] = {
+        'bbox': [coordinates[i:i + 4].tolist() for i in range(0, count * 4, 4)],
+        'confidence': _unpack('f', data[offset + count * 16:offset + count * 20]).tolist(),
+        'class_id': class_ids,
+        'class_name': [class_names[str(cls)] for cls in class_ids]
+    }
+    response['format'] = 'columnar'
+    return response
+
+
+def encode_binary(response):
+    """Pack a response whose ``detections`` are columnar into the binary format"""
+    columns = response['detections']
+    metadata = {key: value for key, value in response.items() if key not in ('detections', 'format')}
+    metadata['class_names'] = {str(cls): name for cls, name in zip(columns['class_id'], columns['class_name'])}
+    encoded = json.dumps(metadata, separators=(',', ':')).encode()
+    encoded += b' ' * (-len(encoded) % 4)
+    return b''.join((
+        BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, len(encoded), len(columns['confidence'])),
+        encoded,
+        _pack('f', [value for box in columns['bbox'] for value in box]),
+        _pack('f', columns['confidence']),
+        _pack('H', columns['class_id'])
+    ))
+
+
+def detections_from_columnar(columns):
+    """Convert columnar detections to the list-of-dicts format"""
+    return [
+        {
+            'bbox': {'x1': x1, 'y1': y1, 'x2': x2, 'y2': y2},
+            'confidence': conf,
+            'class_id': cls,
+            'class_name': name
+        }
+        for (x1, y1, x2, y2), conf, cls, name in zip(
+            columns['bbox'], columns['confidence'], columns['class_id'], columns['class_name'])
+    ]